@@ -1,7 +1,7 @@
-import whisper
 import argparse
 import sys
 from pathlib import Path
+from app.services.whisper_engine import whisper_pool, transcription_options
 
 def validate_audio_file(audio_path):
     path = Path(audio_path)
@@ -11,13 +11,13 @@ def validate_audio_file(audio_path):
         raise ValueError(f"Path is not a file: {audio_path}")
     return path
 
-def transcribe_audio(audio_path, model_type="base"):
+def transcribe_audio(audio_path, model_type=None, compute_type=None):
     try:
-        print(f"Loading {model_type} model...")
-        model = whisper.load_model(model_type)
+        # The pool loads each model configuration once, however often this is called
+        model = whisper_pool.get(size=model_type, compute_type=compute_type)
         print(f"Processing {audio_path}...")
-        result = model.transcribe(str(audio_path))
-        return result["text"]
+        segments, _ = model.transcribe(str(audio_path), **transcription_options())
+        return " ".join(segment.text.strip() for segment in segments if segment.text.strip())
     except Exception as e:
         print(f"Error during transcription: {str(e)}", file=sys.stderr)
         sys.exit(1)
@@ -26,6 +26,7 @@ def main():
     parser = argparse.ArgumentParser(description="Audio Transcription using Whisper")
     parser.add_argument("audio_file", help="Path to audio file")
     parser.add_argument("--model", default="base", help="Whisper model size")
+    parser.add_argument("--compute-type", default=None, help="int8, int8_float32, float32 (default: WHISPER_COMPUTE_TYPE)")
     args = parser.parse_args()
 
     try:
@@ -34,7 +35,7 @@ def main():
         print(f"Error: {str(e)}", file=sys.stderr)
         sys.exit(1)
 
-    transcription = transcribe_audio(audio_path, args.model)
+    transcription = transcribe_audio(audio_path, args.model, args.compute_type)
     print("\nTranscription Result:")
     print(transcription)
 
@@ -1,11 +1,4 @@
-from flask import Flask
-from flask_cors import CORS
 import logging
-import os
-from app.routes.document_routes import upload_bp
-from app.routes.main_routes import main_bp
-from app.routes.links_routes import links_bp
-from app.routes.api_routes import api_bp
 from app.config import Config
 
 def setup_logging(app):
@@ -40,6 +33,15 @@ def setup_logging(app):
 
 def create_app():
     """Create and configure Flask application"""
+    # Flask and the routes are imported here so that standalone scripts can use
+    # app.services (e.g. the Whisper pool) without installing the web stack
+    from flask import Flask
+    from flask_cors import CORS
+    from app.routes.document_routes import upload_bp
+    from app.routes.main_routes import main_bp
+    from app.routes.links_routes import links_bp
+    from app.routes.api_routes import api_bp
+
     app = Flask(__name__)
     app.config.from_object(Config)
 
@@ -68,4 +70,20 @@ def create_app():
 
     app.logger.info(f"Registered blueprints: {list(app.blueprints.keys())}")
 
+    if Config.METRICS_ENABLED:
+        from app.services import metrics
+        metrics.init_app(app)
+
+    # Sampling profiler for live traffic (registers nothing unless PROFILER_ENABLED)
+    from app.services import profiler
+    profiler.init_app(app)
+
+    # Optionally load and warm up models now instead of on the first request
+    # (in remote inference mode only the knowledge base; the models live in the inference server)
+    if Config.PRELOAD_MODELS:
+        from app.services.preload_service import start_preload, local_preload_names
+        names = local_preload_names(Config.PRELOAD_MODEL_NAMES)
+        if names:
+            start_preload(names, blocking=Config.PRELOAD_BLOCKING)
+
     return app
\ No newline at end of file
@@ -33,6 +33,48 @@ class Config:
     AI_MODEL_TRANSLATION = os.environ.get('AI_MODEL_TRANSLATION', 'facebook/nllb-200-distilled-600M')
     AI_MODEL_QA = os.environ.get('AI_MODEL_QA', 'deepset/roberta-base-squad2')
     WHISPER_MODEL = os.environ.get('WHISPER_MODEL', 'tiny')
+    # faster-whisper engine: 'int8' is fastest on CPU, 'int8_float32' / 'float32' trade speed for accuracy
+    WHISPER_COMPUTE_TYPE = os.environ.get('WHISPER_COMPUTE_TYPE', 'int8')
+    WHISPER_DEVICE = os.environ.get('WHISPER_DEVICE', 'auto')
+    # Threads per model (0 = ctranslate2 default) and parallel transcriptions per model
+    WHISPER_CPU_THREADS = int(os.environ.get('WHISPER_CPU_THREADS', 0))
+    WHISPER_NUM_WORKERS = int(os.environ.get('WHISPER_NUM_WORKERS', 1))
+    WHISPER_BEAM_SIZE = int(os.environ.get('WHISPER_BEAM_SIZE', 5))
+    # Distinct model configurations kept loaded (least recently used is dropped)
+    WHISPER_POOL_SIZE = int(os.environ.get('WHISPER_POOL_SIZE', 2))
+    # 'sequential' (decode the whole file in order) or 'batched' (VAD speech chunks decoded in batches);
+    # the upload and links forms can override it per request
+    WHISPER_TRANSCRIBE_MODE = os.environ.get('WHISPER_TRANSCRIBE_MODE', 'sequential').lower()
+    WHISPER_BATCH_SIZE = int(os.environ.get('WHISPER_BATCH_SIZE', 8))
+    # Pauses shorter than this do not split speech chunks
+    WHISPER_VAD_MIN_SILENCE_MS = int(os.environ.get('WHISPER_VAD_MIN_SILENCE_MS', 500))
+
+    # QA model precision on CPU: 'fp32', 'int8' (dynamic quantization), 'bf16' or 'onnx' (ONNX Runtime)
+    QA_PRECISION = os.environ.get('QA_PRECISION', 'fp32').lower()
+    # Only use the reduced-precision model if it matches fp32 on a fixed question set
+    QA_PRECISION_CHECK = os.environ.get('QA_PRECISION_CHECK', 'True').lower() == 'true'
+    QA_PRECISION_MIN_AGREEMENT = float(os.environ.get('QA_PRECISION_MIN_AGREEMENT', 0.8))
+    # Exported ONNX model location (defaults to data/models/onnx-<model>)
+    QA_ONNX_MODEL_DIR = os.environ.get('QA_ONNX_MODEL_DIR', '')
+
+    # Translation backend: 'transformers' (full precision pipeline) or 'ctranslate2' (quantized)
+    TRANSLATION_BACKEND = os.environ.get('TRANSLATION_BACKEND', 'transformers').lower()
+    # Converted model location (defaults to data/models/ct2-<model>-<compute type>)
+    TRANSLATION_CT2_MODEL_DIR = os.environ.get('TRANSLATION_CT2_MODEL_DIR', '')
+    TRANSLATION_CT2_COMPUTE_TYPE = os.environ.get('TRANSLATION_CT2_COMPUTE_TYPE', 'int8')
+    TRANSLATION_CT2_INTER_THREADS = int(os.environ.get('TRANSLATION_CT2_INTER_THREADS', 1))
+    TRANSLATION_CT2_INTRA_THREADS = int(os.environ.get('TRANSLATION_CT2_INTRA_THREADS', 0))
+    TRANSLATION_CT2_BEAM_SIZE = int(os.environ.get('TRANSLATION_CT2_BEAM_SIZE', 2))
+    TRANSLATION_CT2_AUTO_CONVERT = os.environ.get('TRANSLATION_CT2_AUTO_CONVERT', 'True').lower() == 'true'
+
+    # Model preloading: load and warm up models at startup instead of on first use
+    PRELOAD_MODELS = os.environ.get('PRELOAD_MODELS', 'False').lower() == 'true'
+    PRELOAD_MODEL_NAMES = [
+        name.strip() for name in os.environ.get('PRELOAD_MODEL_NAMES', 'context,qa,translation,whisper').split(',')
+        if name.strip()
+    ]
+    # Block create_app() until preloading finishes (otherwise it runs in the background)
+    PRELOAD_BLOCKING = os.environ.get('PRELOAD_BLOCKING', 'False').lower() == 'true'
 
     # AI behavior tuning (env-overridable)
     AI_QA_TOP_K_PRIMARY = int(os.environ.get('AI_QA_TOP_K_PRIMARY', 3))
@@ -42,6 +84,135 @@ class Config:
     REPETITION_HISTORY_WINDOW = int(os.environ.get('REPETITION_HISTORY_WINDOW', 5))
     REPETITION_SIMILARITY_THRESHOLD = float(os.environ.get('REPETITION_SIMILARITY_THRESHOLD', 0.7))
 
+    # Answer cache: QA candidates keyed by normalized question, context version and history window
+    ANSWER_CACHE_ENABLED = os.environ.get('ANSWER_CACHE_ENABLED', 'True').lower() == 'true'
+    ANSWER_CACHE_SIZE = int(os.environ.get('ANSWER_CACHE_SIZE', 1024))
+
+    # Translation cache: in-process LRU (bounded by bytes) backed by an SQLite store
+    TRANSLATION_CACHE_ENABLED = os.environ.get('TRANSLATION_CACHE_ENABLED', 'True').lower() == 'true'
+    TRANSLATION_CACHE_MAX_BYTES = int(os.environ.get('TRANSLATION_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+    # Empty string keeps the cache in memory only
+    TRANSLATION_CACHE_DB = os.environ.get('TRANSLATION_CACHE_DB', os.path.join(BASE_DIR, 'data', 'cache', 'translations.sqlite3'))
+    # Translations kept in the SQLite store (oldest dropped first; 0 = unbounded)
+    TRANSLATION_CACHE_DB_MAX_ROWS = int(os.environ.get('TRANSLATION_CACHE_DB_MAX_ROWS', 200000))
+
+    # Translation batching: pending translations are grouped by language pair and run as one batch
+    TRANSLATION_BATCH_ENABLED = os.environ.get('TRANSLATION_BATCH_ENABLED', 'False').lower() == 'true'
+    TRANSLATION_BATCH_MAX_SIZE = int(os.environ.get('TRANSLATION_BATCH_MAX_SIZE', 16))
+    TRANSLATION_BATCH_MAX_WAIT_MS = float(os.environ.get('TRANSLATION_BATCH_MAX_WAIT_MS', 10))
+    TRANSLATION_BATCH_TIMEOUT = float(os.environ.get('TRANSLATION_BATCH_TIMEOUT', 60))
+
+    # Language detection in front of translation (English input skips the inbound translation)
+    LANGUAGE_DETECTION_ENABLED = os.environ.get('LANGUAGE_DETECTION_ENABLED', 'True').lower() == 'true'
+    LANGUAGE_DETECTION_MIN_CONFIDENCE = float(os.environ.get('LANGUAGE_DETECTION_MIN_CONFIDENCE', 0.9))
+    # Shorter messages are not classified (detection is unreliable on a few words)
+    LANGUAGE_DETECTION_MIN_CHARS = int(os.environ.get('LANGUAGE_DETECTION_MIN_CHARS', 12))
+    LANGUAGE_DETECTION_CACHE_SIZE = int(os.environ.get('LANGUAGE_DETECTION_CACHE_SIZE', 4096))
+    # Reply in the detected language instead of the one selected in the UI
+    LANGUAGE_AUTO_TARGET = os.environ.get('LANGUAGE_AUTO_TARGET', 'False').lower() == 'true'
+
+    # QA encoding cache (context segments are tokenized once, then reused). Answers match the
+    # transformers QA pipeline's, which is also given QA_MAX_SEQ_LEN and QA_DOC_STRIDE
+    QA_CACHED_ENCODING = os.environ.get('QA_CACHED_ENCODING', 'True').lower() == 'true'
+    QA_MAX_SEQ_LEN = int(os.environ.get('QA_MAX_SEQ_LEN', 384))
+    QA_DOC_STRIDE = int(os.environ.get('QA_DOC_STRIDE', 128))
+    QA_BATCH_SIZE = int(os.environ.get('QA_BATCH_SIZE', 8))
+    QA_ENCODING_CACHE_SIZE = int(os.environ.get('QA_ENCODING_CACHE_SIZE', 2048))
+
+    # QA micro-batching: concurrent requests arriving within the wait window share one forward pass
+    QA_MICROBATCH_ENABLED = os.environ.get('QA_MICROBATCH_ENABLED', 'False').lower() == 'true'
+    QA_MICROBATCH_MAX_REQUESTS = int(os.environ.get('QA_MICROBATCH_MAX_REQUESTS', 8))
+    QA_MICROBATCH_MAX_WAIT_MS = float(os.environ.get('QA_MICROBATCH_MAX_WAIT_MS', 5))
+    QA_MICROBATCH_TIMEOUT = float(os.environ.get('QA_MICROBATCH_TIMEOUT', 60))
+
+    # Knowledge store for uploaded transcripts and PDF texts (SQLite, WAL mode)
+    DOCUMENT_STORE_PATH = os.environ.get('DOCUMENT_STORE_PATH', os.path.join(BASE_DIR, 'data', 'knowledge.sqlite3'))
+    # Concurrent writes are committed together: up to BATCH_SIZE documents, waiting at most COMMIT_WAIT_MS for more
+    DOCUMENT_STORE_BATCH_SIZE = int(os.environ.get('DOCUMENT_STORE_BATCH_SIZE', 64))
+    DOCUMENT_STORE_COMMIT_WAIT_MS = float(os.environ.get('DOCUMENT_STORE_COMMIT_WAIT_MS', 2))
+    # Seconds an upload waits for its document to be committed before giving up
+    DOCUMENT_STORE_WRITE_TIMEOUT = float(os.environ.get('DOCUMENT_STORE_WRITE_TIMEOUT', 30))
+    # Imported into the store once, the first time it is opened
+    LEGACY_TRANSCRIPTS_PATH = os.environ.get('LEGACY_TRANSCRIPTS_PATH', os.path.join(BASE_DIR, 'data', 'train.jsonl'))
+
+    # Seconds between checks for knowledge base changes written by other workers (0 = every request)
+    CONTEXT_CHECK_INTERVAL = float(os.environ.get('CONTEXT_CHECK_INTERVAL', 2))
+
+    # Passage retrieval (QA runs over the top-k passages instead of the whole context)
+    RETRIEVAL_ENABLED = os.environ.get('RETRIEVAL_ENABLED', 'True').lower() == 'true'
+    RETRIEVAL_TOP_K = int(os.environ.get('RETRIEVAL_TOP_K', 4))
+    RETRIEVAL_CHUNK_CHARS = int(os.environ.get('RETRIEVAL_CHUNK_CHARS', 800))
+    RETRIEVAL_CHUNK_OVERLAP = int(os.environ.get('RETRIEVAL_CHUNK_OVERLAP', 150))
+    RETRIEVAL_BM25_K1 = float(os.environ.get('RETRIEVAL_BM25_K1', 1.5))
+    RETRIEVAL_BM25_B = float(os.environ.get('RETRIEVAL_BM25_B', 0.75))
+    # 'bm25' (lexical) or 'dense' (sentence embeddings, falls back to bm25 if unavailable)
+    RETRIEVAL_MODE = os.environ.get('RETRIEVAL_MODE', 'bm25').lower()
+    EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+    # 'float32' or 'int8' (per-row scaled, 4x smaller on disk and in page cache)
+    EMBEDDING_DTYPE = os.environ.get('EMBEDDING_DTYPE', 'float32').lower()
+    EMBEDDING_BATCH_SIZE = int(os.environ.get('EMBEDDING_BATCH_SIZE', 32))
+    EMBEDDING_MAX_TOKENS = int(os.environ.get('EMBEDDING_MAX_TOKENS', 256))
+    # Corpus versions whose embedding manifests stay on disk, so workers still on an older one can reopen it
+    EMBEDDING_KEEP_VERSIONS = int(os.environ.get('EMBEDDING_KEEP_VERSIONS', 3))
+    INDEX_DIR = os.environ.get('INDEX_DIR', os.path.join(BASE_DIR, 'data', 'index'))
+    # Compiled knowledge base (python -m app.services.corpus_artifact build), mapped at startup when current
+    CORPUS_ARTIFACT_ENABLED = os.environ.get('CORPUS_ARTIFACT_ENABLED', 'True').lower() == 'true'
+    CORPUS_ARTIFACT_PATH = os.environ.get('CORPUS_ARTIFACT_PATH', os.path.join(INDEX_DIR, 'corpus.bin'))
+
+    # Inference placement: 'local' (models in the web process) or 'remote' (inference server over a Unix socket)
+    INFERENCE_MODE = os.environ.get('INFERENCE_MODE', 'local').lower()
+    INFERENCE_SOCKET = os.environ.get('INFERENCE_SOCKET', os.path.join(BASE_DIR, 'data', 'run', 'inference.sock'))
+    # Shared secret for the socket (the server unpickles what clients send). When unset, the
+    # server generates a random key into INFERENCE_AUTHKEY_FILE (mode 0600) and clients read it
+    INFERENCE_AUTHKEY = os.environ.get('INFERENCE_AUTHKEY', '')
+    INFERENCE_AUTHKEY_FILE = os.environ.get('INFERENCE_AUTHKEY_FILE', f"{INFERENCE_SOCKET}.key")
+    INFERENCE_TIMEOUT = float(os.environ.get('INFERENCE_TIMEOUT', 30))
+    # Health checks ping the server; a short timeout keeps /health responsive when it is down
+    INFERENCE_PING_TIMEOUT = float(os.environ.get('INFERENCE_PING_TIMEOUT', 2))
+    INFERENCE_TRANSCRIBE_TIMEOUT = float(os.environ.get('INFERENCE_TRANSCRIBE_TIMEOUT', 1800))
+
+    # Preforking server (serve.py)
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', 2))
+    # Torch threads per worker; 0 divides the CPU cores evenly between workers
+    SERVER_TORCH_THREADS = int(os.environ.get('SERVER_TORCH_THREADS', 0))
+    SERVER_BACKLOG = int(os.environ.get('SERVER_BACKLOG', 128))
+    # Seconds between per-worker memory reports in the log (0 disables)
+    SERVER_MEMORY_REPORT_INTERVAL = float(os.environ.get('SERVER_MEMORY_REPORT_INTERVAL', 300))
+    SERVER_SHUTDOWN_TIMEOUT = float(os.environ.get('SERVER_SHUTDOWN_TIMEOUT', 10))
+    # A worker exiting within this many seconds of starting counts as a fast failure
+    SERVER_FAST_FAILURE_SECONDS = float(os.environ.get('SERVER_FAST_FAILURE_SECONDS', 30))
+    # Respawn delay after the first fast failure, doubled for each further one up to the maximum
+    SERVER_RESPAWN_BACKOFF = float(os.environ.get('SERVER_RESPAWN_BACKOFF', 1))
+    SERVER_RESPAWN_BACKOFF_MAX = float(os.environ.get('SERVER_RESPAWN_BACKOFF_MAX', 60))
+    # The master shuts down after this many consecutive fast failures (0 never gives up)
+    SERVER_MAX_FAST_FAILURES = int(os.environ.get('SERVER_MAX_FAST_FAILURES', 10))
+
+    # Prometheus metrics at /api/v1/metrics (per-stage latency, cache hits, queue depths)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+
+    # Structured query log (one JSON line per chat turn, written by a background thread)
+    QUERY_LOG_ENABLED = os.environ.get('QUERY_LOG_ENABLED', 'False').lower() == 'true'
+    QUERY_LOG_PATH = os.environ.get('QUERY_LOG_PATH', os.path.join(BASE_DIR, 'data', 'logs', 'queries.jsonl'))
+    QUERY_LOG_MAX_BYTES = int(os.environ.get('QUERY_LOG_MAX_BYTES', 50 * 1024 * 1024))
+    QUERY_LOG_BACKUPS = int(os.environ.get('QUERY_LOG_BACKUPS', 5))
+    QUERY_LOG_QUEUE_SIZE = int(os.environ.get('QUERY_LOG_QUEUE_SIZE', 10000))
+    # Store the question text too (needed for replay; off by default for privacy)
+    QUERY_LOG_INCLUDE_TEXT = os.environ.get('QUERY_LOG_INCLUDE_TEXT', 'False').lower() == 'true'
+
+    # Sampling request profiler (no hooks are registered when disabled)
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'False').lower() == 'true'
+    # Profile 1-in-N watched requests (0 disables rate sampling)
+    PROFILER_SAMPLE_RATE = int(os.environ.get('PROFILER_SAMPLE_RATE', 100))
+    # Also keep profiles of requests slower than this (0 disables)
+    PROFILER_SLOW_MS = float(os.environ.get('PROFILER_SLOW_MS', 0))
+    PROFILER_INTERVAL_MS = float(os.environ.get('PROFILER_INTERVAL_MS', 5))
+    PROFILER_DIR = os.environ.get('PROFILER_DIR', os.path.join(BASE_DIR, 'data', 'profiles'))
+    PROFILER_MAX_FILES = int(os.environ.get('PROFILER_MAX_FILES', 200))
+    PROFILER_ROUTES = [
+        route.strip() for route in os.environ.get('PROFILER_ROUTES', '/,/api/v1/chat,/upload,/links/submit-link').split(',')
+        if route.strip()
+    ]
+
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     LOG_FILE = os.environ.get('LOG_FILE', os.path.join(BASE_DIR, 'app.log'))
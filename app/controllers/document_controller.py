@@ -1,6 +1,8 @@
 from flask import render_template, current_app
 from app.services.file_service import save_file, allowed_file
-from app.services.transcribe_service import extract_audio, transcribe_audio
+from app.services.transcribe_service import extract_audio, transcribe_with_stats
+from app.services.document_store import document_store
+from app.config import Config
 import os
 import logging
 
@@ -9,7 +11,7 @@ logger = logging.getLogger(__name__)
 
 def handle_upload(request):
     """
-    Handle file upload, extract audio, transcribe, and save to train.jsonl.
+    Handle file upload, extract audio, transcribe, and save to the knowledge store.
     Supports video, audio, and PDF files.
     """
     file = request.files.get('file')
@@ -25,13 +27,14 @@ def handle_upload(request):
         file_ext = filename.rsplit('.', 1)[1].lower()
 
         transcript = ""
+        transcription = None
 
         # Handle PDF files
         if file_ext == 'pdf':
             logger.info(f"Processing PDF file: {filename}")
             transcript = extract_text_from_pdf(file_path)
             if transcript:
-                save_pdf_text_to_jsonl(file_path, transcript)
+                save_pdf_text(file_path, transcript)
                 logger.info(f"PDF text extracted and saved ({len(transcript)} chars)")
             else:
                 logger.warning(f"No text extracted from PDF: {filename}")
@@ -42,20 +45,22 @@ def handle_upload(request):
             logger.info(f"Processing media file: {filename}")
             audio_path = file_path.rsplit('.', 1)[0] + ".wav"
             extract_audio(file_path, audio_path)
-            transcript = transcribe_audio(audio_path)
+            # 'batched' (VAD + batched decoding) suits long recordings; chosen on the upload form
+            transcription = transcribe_with_stats(audio_path, mode=request.form.get('transcription_mode'))
+            transcript = transcription["text"] if transcription else None
 
         allowed_exts = current_app.config['ALLOWED_EXTENSIONS']
         
-        # Auto-refresh context after successful upload
+        # Auto-refresh context after successful upload (ingests only the new document)
         try:
-            from app.services.context_loader import reload_context
-            import app.routes.main_routes as main_routes
-            main_routes._base_context = reload_context(include_transcripts=True)
+            from app.routes.main_routes import refresh_active_context
+            refresh_active_context()
             logger.info("Context automatically refreshed after upload")
         except Exception as e:
             logger.warning(f"Failed to auto-refresh context: {e}")
         
-        return render_template("upload.html", filename=filename, transcript=transcript, allowed_extensions=allowed_exts)
+        return render_template("upload.html", filename=filename, transcript=transcript,
+                               transcription=transcription, allowed_extensions=allowed_exts)
     
     except Exception as e:
         logger.error(f"Upload error: {e}", exc_info=True)
@@ -115,34 +120,21 @@ def extract_text_from_pdf(pdf_path):
     return text.strip()
 
 
-def save_pdf_text_to_jsonl(pdf_path, text):
+def save_pdf_text(pdf_path, text):
     """
-    Save extracted PDF text to data/train.jsonl in the same format as transcripts.
-    
+    Save extracted PDF text to the knowledge store alongside the transcripts.
+
     Args:
         pdf_path: Path to the original PDF file
         text: Extracted text content
     """
-    import json
-    from datetime import datetime
-    
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
-    data_dir = os.path.join(base_dir, "data")
-    os.makedirs(data_dir, exist_ok=True)
-    
-    train_file = os.path.join(data_dir, "train.jsonl")
-    
-    entry = {
-        "text": text,
-        "source": os.path.basename(pdf_path),
-        "type": "pdf",
-        "timestamp": datetime.now().isoformat()
-    }
-    
     try:
-        with open(train_file, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
-        logger.info(f"PDF text saved to {train_file}")
+        document_id, created = document_store.add(text, source=os.path.basename(pdf_path), doc_type="pdf",
+                                                   timeout=Config.DOCUMENT_STORE_WRITE_TIMEOUT)
+        if created:
+            logger.info(f"PDF text saved to the knowledge store (document {document_id})")
+        else:
+            logger.info(f"PDF text already in the knowledge store (document {document_id})")
     except Exception as e:
         logger.error(f"Failed to save PDF text: {e}")
 
@@ -1,34 +1,45 @@
 from flask import render_template, current_app
 import subprocess
 from app.services.file_service import download_audio_from_url
-from app.services.transcribe_service import transcribe_audio
+from app.services.transcribe_service import transcribe_audio, transcribe_with_stats
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
-def handle_links(urls, link_type='single'):
+def handle_links(urls, link_type='single', mode=None):
     """
     Handles the submission of links for audio transcription.
     Supports both single and batch link submissions.
+
+    mode selects sequential or batched (VAD-chunked) transcription.
     """
     try:
         transcript = ''
+        transcription = None
 
         if link_type == 'single':
-            transcript = handle_single_link(urls[0])
+            transcription = handle_single_link(urls[0], mode)
+            transcript = transcription["text"] if transcription else None
         elif link_type == 'playlist':
-            transcript = handle_playlist_link(urls[0])
+            transcript = handle_playlist_link(urls[0], mode)
         elif link_type == 'batch':
             logger.info(f"Processing batch links: {len(urls)} URLs")
-            transcript = handle_links_batch_sync(urls)
+            transcript = handle_links_batch_sync(urls, mode)
+
+        # Make the new transcripts answerable (ingests only what was appended)
+        try:
+            from app.routes.main_routes import refresh_active_context
+            refresh_active_context()
+        except Exception as e:
+            logger.warning(f"Failed to refresh context after link transcription: {e}")
 
-        return render_template('links.html', transcript=transcript)
+        return render_template('links.html', transcript=transcript, transcription=transcription)
     except Exception as e:
         logger.error(f"Error handling links: {e}")
         return render_template('links.html', error=str(e))
     
-def handle_links_batch_sync(urls):
+def handle_links_batch_sync(urls, mode=None):
     """Process multiple URLs synchronously"""
     results = []
     for idx, url in enumerate(urls, 1):
@@ -41,7 +52,7 @@ def handle_links_batch_sync(urls):
                 results.append(f"[Error: audio file invalid for {url}]")
                 continue
 
-            text = transcribe_audio(audio_path)
+            text = transcribe_audio(audio_path, mode=mode)
             if not text:
                 logger.warning(f"Transcription failed for {url}")
                 results.append(f"[Error: transcription failed for {url}]")
@@ -56,19 +67,19 @@ def handle_links_batch_sync(urls):
     return "\n\n".join(results)
 
 
-def handle_single_link(url):
-    """Process a single link"""
+def handle_single_link(url, mode=None):
+    """Process a single link; returns the transcription with its timing stats"""
     try:
         logger.info(f"Processing single link: {url}")
         audio_path = download_audio_from_url(url)
-        transcript = transcribe_audio(audio_path)
+        transcription = transcribe_with_stats(audio_path, mode=mode)
         logger.info("Successfully processed single link")
-        return transcript
+        return transcription
     except Exception as e:
         logger.error(f"Error processing single link: {e}")
         raise Exception(str(e))
 
-def handle_playlist_link(channel_url):
+def handle_playlist_link(channel_url, mode=None):
     """Process a playlist of videos"""
     max_videos = current_app.config['MAX_VIDEOS']
 
@@ -97,7 +108,7 @@ def handle_playlist_link(channel_url):
             try:
                 logger.info(f"Processing video {idx}/{len(video_ids)}: {url}")
                 audio_path = download_audio_from_url(url)
-                text = transcribe_audio(audio_path)
+                text = transcribe_audio(audio_path, mode=mode)
                 if text:
                     transcripts.append(text)
             except Exception as e:
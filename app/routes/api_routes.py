@@ -1,7 +1,12 @@
 """API routes for mobile app integration"""
-from flask import Blueprint, request, jsonify, session
-from app.services.context_loader import load_context
-from app.services.ai_service import answer_question_with_context, translate
+from flask import Blueprint, request, jsonify, session, Response, abort, g
+from app.routes.main_routes import get_active_context
+from app.services.ai_service import ai_service, answer_question_with_context, translate
+from app.services import model_status, metrics, query_log
+from app.services.language_detection import resolve_languages
+from app.services.preload_service import local_preload_names
+from app.services.context_loader import context_corpus
+from app.config import Config
 from datetime import datetime
 import logging
 
@@ -12,13 +17,60 @@ api_bp = Blueprint('api', __name__)
 
 @api_bp.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint for mobile app"""
+    """
+    Health check endpoint for mobile app and load balancers.
+
+    When PRELOAD_MODELS is on, returns 503 until every preloaded model is
+    loaded and warmed up, so traffic is only routed to warm instances. With
+    INFERENCE_MODE=remote the model states come from the inference server's
+    ping, and the instance is not ready while the server is unreachable.
+    """
+    required = Config.PRELOAD_MODEL_NAMES if Config.PRELOAD_MODELS else []
+    models = model_status.snapshot()
+    inference = {'mode': Config.INFERENCE_MODE}
+    if Config.INFERENCE_MODE == 'remote':
+        from app.services.inference_client import remote_ping
+        local_required = local_preload_names(required)
+        server = remote_ping()
+        inference['reachable'] = server is not None
+        if server is not None:
+            inference['pid'] = server['pid']
+            models = {**server['models'], **models}
+        ready = (server is not None and model_status.is_ready(local_required)
+                 and model_status.is_ready([name for name in required if name not in local_required],
+                                           server['models']))
+    else:
+        ready = model_status.is_ready(required)
     return jsonify({
-        'status': 'healthy',
+        'status': 'healthy' if ready else 'starting',
+        'ready': ready,
         'version': '2.0',
         'timestamp': datetime.now().isoformat(),
-        'service': 'VirtualClone API'
-    })
+        'service': 'VirtualClone API',
+        'models': models,
+        'inference': inference,
+        'caches': ai_service.cache_stats(),
+        'context': {
+            'version': context_corpus.version,
+            'characters': len(context_corpus.text),
+            'documents': context_corpus.document_count,
+            'artifact': context_corpus.artifact.version if context_corpus.artifact is not None else None,
+        }
+    }), 200 if ready else 503
+
+
+@api_bp.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Prometheus scrape endpoint.
+
+    Per-stage latency histograms, request counts, Whisper real-time factor,
+    model load times, cache hit counts and batching queue depths for this
+    worker process.
+    """
+    if not Config.METRICS_ENABLED:
+        abort(404)
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 
 @api_bp.route('/chat', methods=['POST'])
@@ -40,6 +92,10 @@ def chat():
         "timestamp": "ISO timestamp"
     }
     """
+    turn_started = None
+    user_message = language = None
+    src_lang = tgt_lang = detected = None
+    recent_history = []
     try:
         data = request.get_json()
 
@@ -51,33 +107,56 @@ def chat():
 
         user_message = data['message']
         language = data.get('language', 'eng_Latn')
+        turn_started = query_log.start_turn()
 
         # Get conversation history from session
         conversation_history = session.get('conversation_history', [])
         recent_history = conversation_history[-5:] if conversation_history else []
 
         # Get context and process question
-        context = load_context()
+        context = get_active_context()
 
-        # Handle translation if needed
+        # Skip translations the detected input language makes unnecessary
+        with metrics.timed('detect_language'):
+            src_lang, tgt_lang, detected = resolve_languages(user_message, language)
+        g.language_pair = (src_lang, tgt_lang)
         if language != 'eng_Latn':
+            if src_lang == 'eng_Latn':
+                metrics.TRANSLATIONS_SKIPPED.inc(leg='in')
+            if tgt_lang == 'eng_Latn':
+                metrics.TRANSLATIONS_SKIPPED.inc(leg='out')
+
+        # Handle translation if needed
+        if src_lang != 'eng_Latn' or tgt_lang != 'eng_Latn':
             try:
                 # Translate question to English
-                eng_question = translate(user_message, src_lang=language, tgt_lang='eng_Latn')
+                eng_question = user_message
+                if src_lang != 'eng_Latn':
+                    with metrics.timed('translate_in'):
+                        eng_question = translate(user_message, src_lang=src_lang, tgt_lang='eng_Latn')
                 # Get answer in English
-                eng_response = answer_question_with_context(eng_question, context, recent_history)
+                with metrics.timed('answer'):
+                    eng_response = answer_question_with_context(eng_question, context, recent_history)
                 # Translate response back to target language
-                response = translate(eng_response, src_lang='eng_Latn', tgt_lang=language)
+                response = eng_response
+                if tgt_lang != 'eng_Latn':
+                    with metrics.timed('translate_out'):
+                        response = translate(eng_response, src_lang='eng_Latn', tgt_lang=tgt_lang)
             except Exception as e:
                 logger.error(f"Translation error: {e}")
                 # Fallback to English
-                response = answer_question_with_context(user_message, context, recent_history)
+                with metrics.timed('answer'):
+                    response = answer_question_with_context(user_message, context, recent_history)
         else:
-            response = answer_question_with_context(user_message, context, recent_history)
+            with metrics.timed('answer'):
+                response = answer_question_with_context(user_message, context, recent_history)
 
         # Update conversation history
         conversation_history.append((user_message, response))
         session['conversation_history'] = conversation_history[-10:]  # Keep last 10
+        query_log.finish_turn(turn_started, 'api', user_message, language, len(recent_history), response,
+                              session_id=query_log.session_id(session),
+                              src_lang=src_lang, tgt_lang=tgt_lang, detected_language=detected)
 
         return jsonify({
             'success': True,
@@ -88,6 +167,11 @@ def chat():
 
     except Exception as e:
         logger.error(f"Chat error: {e}", exc_info=True)
+        # Log the failed turn like the web route does, so API errors count in the error rate
+        query_log.finish_turn(turn_started, 'api', user_message, language, len(recent_history), None,
+                              ok=False, session_id=query_log.session_id(session),
+                              src_lang=src_lang, tgt_lang=tgt_lang, detected_language=detected)
+        metrics.end_trace()
         return jsonify({
             'success': False,
             'error': 'An error occurred processing your message',
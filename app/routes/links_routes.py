@@ -19,7 +19,7 @@ def submit_link():
             raise Exception('Missing URL')
     
         try:
-            return handle_links(urls, link_type)
+            return handle_links(urls, link_type, request.form.get('transcription_mode'))
         except Exception as e:
             return render_template('links.html', error=str(e))
     
@@ -1,24 +1,92 @@
-from flask import Blueprint, request, render_template, session, jsonify, current_app
-from app.services.context_loader import load_context, reload_context
-from app.services.ai_service import translate, answer_question, answer_question_with_context
+from flask import Blueprint, request, render_template, session, jsonify, current_app, g
+from app.services.context_loader import context_corpus, reload_context
+from app.services.retrieval_service import context_retriever
+from app.config import Config
+from app.services.ai_service import ai_service, translate, answer_question, answer_question_with_context
+from app.services import metrics, query_log
+from app.services.language_detection import resolve_languages
 from app.constants.languages import languages
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 main_bp = Blueprint("main", __name__)
 
-# Load initial context at startup
-_base_context = load_context(include_transcripts=True)
+# Loaded by init_context() (preload, the preforking master, or the first chat request), not at import
+_base_context = None
+_init_lock = threading.Lock()
+
+
+def init_context():
+    """
+    Load the knowledge base once per process (mapping a compiled corpus artifact when current).
+
+    Returns:
+        str: The active context
+    """
+    global _base_context
+    if _base_context is None:
+        with _init_lock:
+            if _base_context is None:
+                context = context_corpus.load(include_transcripts=True)
+                if context_corpus.artifact is not None:
+                    # Mapping the compiled indexes is cheap; the other workers share the same pages
+                    _index_context(context)
+                _base_context = context
+    return _base_context
 
 
 def get_active_context():
     """
-    Get the current active context, optionally reloading transcripts.
-    For now, we cache the context but this can be extended to reload dynamically.
+    Get the current active context.
+
+    Picks up documents other worker processes have ingested (or an edited
+    llm-script.txt) since the last check; between checks this is a plain
+    attribute read.
     """
+    if _base_context is None:
+        return init_context()
+    if context_corpus.sync():
+        _publish_context(context_corpus.text)
     return _base_context
 
 
+def _publish_context(context):
+    """Make a new context active and bring the derived caches and indexes up to date"""
+    global _base_context
+    _base_context = context
+    ai_service.set_context_version(context, context_corpus.version)
+    ai_service.invalidate_answer_cache()
+    _index_context(context)
+
+
+def _index_context(context):
+    """Point the QA engine and the passage index at the context, reusing a mapped corpus artifact"""
+    ai_service.use_corpus_artifact(context_corpus.artifact)
+    if Config.RETRIEVAL_ENABLED:
+        # Extends the passage index with just the appended text
+        context_retriever.update(context, artifact=context_corpus.artifact)
+
+
+def refresh_active_context():
+    """
+    Ingest documents added to the knowledge store since the last refresh.
+
+    Only the new documents are read and indexed, so the cost is proportional to
+    the new content rather than the whole knowledge base.
+
+    Returns:
+        int: Number of documents ingested (-1 if a full reload was needed)
+    """
+    if _base_context is None:
+        init_context()
+        return -1
+    added = context_corpus.refresh()
+    if added:
+        _publish_context(context_corpus.text)
+    return added
+
+
 @main_bp.route("/hello")
 def hello():
     return "Hello from main route!"
@@ -45,31 +113,52 @@ def index():
             logger.info(f"Processing question: {user_input[:50]}...")
 
             recent_history = conversation_history[-5:] if conversation_history else []
+            turn_started = query_log.start_turn()
+            src_lang = tgt_lang = detected = None
 
             try:
                 # Get fresh context (includes transcripts if available)
                 context = get_active_context()
                 
-                if selected_language != "eng_Latn":
-                    logger.debug(f"Translating from {selected_language} to English")
-                    eng_question = translate(user_input, src_lang=selected_language, tgt_lang="eng_Latn")
+                with metrics.timed("detect_language"):
+                    src_lang, tgt_lang, detected = resolve_languages(user_input, selected_language)
+                g.language_pair = (src_lang, tgt_lang)
+
+                if src_lang != "eng_Latn":
+                    logger.debug(f"Translating from {src_lang} to English")
+                    with metrics.timed("translate_in"):
+                        eng_question = translate(user_input, src_lang=src_lang, tgt_lang="eng_Latn")
+                else:
+                    if selected_language != "eng_Latn":
+                        metrics.TRANSLATIONS_SKIPPED.inc(leg="in")
+                    eng_question = user_input
 
+                with metrics.timed("answer"):
                     eng_answer = answer_question_with_context(eng_question, context, recent_history)
 
-                    logger.debug(f"Translating response back to {selected_language}")
-                    translated_answer = translate(eng_answer, src_lang="eng_Latn", tgt_lang=selected_language)
-                    response = translated_answer
+                if tgt_lang != "eng_Latn":
+                    logger.debug(f"Translating response back to {tgt_lang}")
+                    with metrics.timed("translate_out"):
+                        response = translate(eng_answer, src_lang="eng_Latn", tgt_lang=tgt_lang)
                 else:
-                    response = answer_question_with_context(user_input, context, recent_history)
+                    if selected_language != "eng_Latn":
+                        metrics.TRANSLATIONS_SKIPPED.inc(leg="out")
+                    response = eng_answer
 
                 conversation_history.append((user_input, response))
                 session["conversation_history"] = conversation_history[-10:]
 
                 logger.info(f"Response generated successfully (length: {len(response)})")
+                query_log.finish_turn(turn_started, "web", user_input, selected_language, len(recent_history),
+                                      response, session_id=query_log.session_id(session),
+                                      src_lang=src_lang, tgt_lang=tgt_lang, detected_language=detected)
                 return jsonify({"user_input": user_input, "answer": response})
 
             except Exception as e:
                 logger.error(f"Error processing question: {e}", exc_info=True)
+                query_log.finish_turn(turn_started, "web", user_input, selected_language, len(recent_history),
+                                      None, ok=False, session_id=query_log.session_id(session),
+                                      src_lang=src_lang, tgt_lang=tgt_lang, detected_language=detected)
                 error_response = "I apologize, but I'm having trouble processing your question right now. Please try again."
                 return jsonify({"user_input": user_input, "answer": error_response}), 500
 
@@ -83,9 +172,8 @@ def refresh_context():
     """
     Endpoint to manually refresh the context (useful after uploading new content).
     """
-    global _base_context
     try:
-        _base_context = reload_context(include_transcripts=True)
+        _publish_context(reload_context(include_transcripts=True))
         logger.info("Context refreshed successfully")
         return jsonify({"status": "success", "message": "Context refreshed", "context_length": len(_base_context)})
     except Exception as e:
@@ -0,0 +1,373 @@
+"""
+Preforking production server.
+
+The master process creates the app, loads the knowledge base, the BM25
+retrieval index and the QA weights, then forks workers that share those
+pages copy-on-write and accept connections on one shared listening socket.
+
+Only state whose loading starts no threads is built before fork(): threads
+do not survive it, so a model that started a thread pool in the master (the
+CTranslate2 Whisper and translation models start theirs in the constructor,
+and any torch forward pass starts the intra-op pool) can hang in a worker.
+Those models, and all warm-up passes, are loaded by each worker after forking.
+"""
+import os
+import gc
+import sys
+import time
+import errno
+import signal
+import socket
+import logging
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Preloadable models the master may load before forking (no threads, no forward pass)
+FORK_SAFE_MODELS = ("context", "qa")
+
+
+def read_memory_kb(pid):
+    """
+    Resident and proportional set size of a process, from /proc.
+
+    PSS splits shared copy-on-write pages between the processes mapping them,
+    so summing PSS over workers gives the real memory footprint.
+
+    Returns:
+        dict: {'rss_kb': int, 'pss_kb': int}, with None for unavailable values
+    """
+    memory = {"rss_kb": None, "pss_kb": None}
+    for path, field, key in ((f"/proc/{pid}/status", "VmRSS:", "rss_kb"),
+                             (f"/proc/{pid}/smaps_rollup", "Pss:", "pss_kb")):
+        try:
+            with open(path, "r") as f:
+                for line in f:
+                    if line.startswith(field):
+                        memory[key] = int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            pass
+    return memory
+
+
+def worker_thread_count(workers):
+    """Torch threads per worker, so workers together do not oversubscribe the cores"""
+    if Config.SERVER_TORCH_THREADS > 0:
+        return Config.SERVER_TORCH_THREADS
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def _set_torch_threads(threads):
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except Exception as e:
+        logger.debug(f"Could not set torch threads: {e}")
+
+
+def split_preload(names):
+    """
+    Divide preloading between the master and the workers.
+
+    The QA weights are only fork-safe at fp32: the reduced-precision modes
+    run forward passes to check agreement with fp32 (or start ONNX Runtime).
+
+    Args:
+        names: Model names to preload
+
+    Returns:
+        tuple: (names the master loads before forking, names each worker preloads after forking)
+    """
+    master = [name for name in names if name in FORK_SAFE_MODELS
+              and (name != "qa" or Config.QA_PRECISION.lower() == "fp32")]
+    # Workers still warm up the QA model; the pass starts torch threads, so it cannot run in the master
+    workers = [name for name in names if name not in master or name == "qa"]
+    return master, workers
+
+
+def _prepare_master(preload):
+    """Create the app and load the fork-safe state workers should share"""
+    # The master loads inline; a background preload thread would not survive fork()
+    Config.PRELOAD_MODELS = False
+    from app import create_app
+    app = create_app()
+
+    if preload:
+        from app.services.preload_service import PRELOADERS, local_preload_names
+        from app.services.ai_service import ai_service
+        master_names, _ = split_preload(local_preload_names(Config.PRELOAD_MODEL_NAMES))
+        logger.info(f"Loading before fork: {master_names}")
+        for name in master_names:
+            try:
+                if name == "qa":
+                    # Weights only; the warm-up pass runs in the workers
+                    ai_service.qa_pipeline
+                else:
+                    PRELOADERS[name]()
+            except Exception as e:
+                logger.error(f"Failed to load {name} before forking: {e}")
+
+    # Dense retrieval embeds passages with a torch model, so only the BM25 index is built here
+    if Config.RETRIEVAL_MODE != "dense":
+        try:
+            from app.routes.main_routes import get_active_context
+            from app.services.retrieval_service import context_retriever
+            context_retriever.update(get_active_context())
+        except Exception as e:
+            logger.warning(f"Could not build the retrieval index before forking: {e}")
+    return app
+
+
+def _after_fork(threads, preload):
+    """Per-worker setup: thread counts and the models that cannot be loaded before fork()"""
+    _set_torch_threads(threads)
+    if preload:
+        # Health reports 503 in this worker until its own models are loaded and warm
+        Config.PRELOAD_MODELS = True
+        from app.services.preload_service import start_preload, local_preload_names
+        _, worker_names = split_preload(local_preload_names(Config.PRELOAD_MODEL_NAMES))
+        if worker_names:
+            start_preload(worker_names, blocking=False)
+
+
+def _run_worker(app, listener, threads, preload):
+    """Serve requests on the shared socket until terminated"""
+    from werkzeug.serving import make_server
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _after_fork(threads, preload)
+
+    host, port = listener.getsockname()[:2]
+    server = make_server(host, port, app, threaded=True, fd=listener.fileno())
+    logger.info(f"Worker {os.getpid()} serving with {threads} torch thread(s)")
+    server.serve_forever()
+
+
+def _spawn(app, listener, threads, preload):
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            _run_worker(app, listener, threads, preload)
+        except SystemExit as e:
+            exit_code = e.code or 0
+        except Exception as e:
+            logger.error(f"Worker {os.getpid()} crashed: {e}", exc_info=True)
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+    return pid
+
+
+def respawn_delay(fast_failures):
+    """
+    Seconds to wait before replacing a worker that exited.
+
+    Args:
+        fast_failures: Consecutive workers that exited within SERVER_FAST_FAILURE_SECONDS of starting
+
+    Returns:
+        float: 0 for a worker that ran normally, else an exponentially growing, capped delay
+    """
+    if fast_failures <= 0:
+        return 0.0
+    return min(Config.SERVER_RESPAWN_BACKOFF * 2 ** (fast_failures - 1), Config.SERVER_RESPAWN_BACKOFF_MAX)
+
+
+def _report_memory(worker_pids):
+    master = read_memory_kb(os.getpid())
+    lines = [f"master {os.getpid()}: rss={master['rss_kb']}kB pss={master['pss_kb']}kB"]
+    total_pss = master["pss_kb"] or 0
+    for pid in sorted(worker_pids):
+        memory = read_memory_kb(pid)
+        total_pss += memory["pss_kb"] or 0
+        lines.append(f"worker {pid}: rss={memory['rss_kb']}kB pss={memory['pss_kb']}kB")
+    logger.info(f"Memory usage (total pss={total_pss}kB): " + "; ".join(lines))
+
+
+def serve(host=None, port=None, workers=None, preload=True):
+    """
+    Run the app with a preforking master and N workers.
+
+    Args:
+        host: Bind address (defaults to FLASK_HOST)
+        port: Bind port (defaults to FLASK_PORT)
+        workers: Number of worker processes (defaults to SERVER_WORKERS)
+        preload: Load the fork-safe models in the master and the rest in each worker
+
+    Raises:
+        RuntimeError: If workers kept failing on startup (SERVER_MAX_FAST_FAILURES in a row)
+    """
+    host = host or os.environ.get('FLASK_HOST', '0.0.0.0')
+    port = int(port or os.environ.get('FLASK_PORT', 5050))
+    workers = workers or Config.SERVER_WORKERS
+    threads = worker_thread_count(workers)
+
+    # Keep the master's own torch pool small; workers set their share after forking
+    _set_torch_threads(threads)
+    app = _prepare_master(preload)
+
+    listener = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(Config.SERVER_BACKLOG)
+    listener.set_inheritable(True)
+
+    # Move everything allocated so far out of the GC's reach, so collections in
+    # the workers do not touch (and un-share) the preloaded objects
+    gc.collect()
+    gc.freeze()
+
+    # Worker pid -> monotonic start time, to tell crashes on startup from normal exits
+    worker_pids = {_spawn(app, listener, threads, preload): time.monotonic() for _ in range(workers)}
+    # Monotonic times at which replacement workers are due
+    pending_spawns = []
+    fast_failures = 0
+    gave_up = False
+    app.logger.info(f"Serving on {host}:{port} with {workers} worker(s), {threads} torch thread(s) each")
+
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    next_report = time.monotonic()
+    while not stopping:
+        if Config.SERVER_MEMORY_REPORT_INTERVAL > 0 and time.monotonic() >= next_report:
+            _report_memory(worker_pids)
+            next_report = time.monotonic() + Config.SERVER_MEMORY_REPORT_INTERVAL
+
+        now = time.monotonic()
+        while pending_spawns and pending_spawns[0] <= now:
+            pending_spawns.pop(0)
+            worker_pids[_spawn(app, listener, threads, preload)] = time.monotonic()
+
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid and pid in worker_pids:
+            uptime = time.monotonic() - worker_pids.pop(pid)
+            if stopping:
+                continue
+            fast_failures = fast_failures + 1 if uptime < Config.SERVER_FAST_FAILURE_SECONDS else 0
+            if 0 < Config.SERVER_MAX_FAST_FAILURES <= fast_failures:
+                logger.error(f"Worker {pid} exited with status {status} after {uptime:.1f}s; "
+                             f"{fast_failures} workers failed on startup in a row, shutting down")
+                gave_up = stopping = True
+                continue
+            delay = respawn_delay(fast_failures)
+            logger.warning(f"Worker {pid} exited with status {status} after {uptime:.1f}s; "
+                           f"restarting in {delay:.1f}s")
+            pending_spawns.append(time.monotonic() + delay)
+            pending_spawns.sort()
+            continue
+        time.sleep(0.5)
+
+    logger.info("Shutting down workers...")
+    for pid in worker_pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+    deadline = time.monotonic() + Config.SERVER_SHUTDOWN_TIMEOUT
+    while worker_pids and time.monotonic() < deadline:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            worker_pids.pop(pid, None)
+        else:
+            time.sleep(0.1)
+    for pid in worker_pids:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+    listener.close()
+    if gave_up:
+        raise RuntimeError(f"Workers exited within {Config.SERVER_FAST_FAILURE_SECONDS}s of starting "
+                           f"{Config.SERVER_MAX_FAST_FAILURES} times in a row; see the log for details")
+
+
+def _smoke_worker(threads, write_fd):
+    """Body of the smoke check's forked worker: one translation and one transcription"""
+    import json
+    import numpy as np
+    from app.services.ai_service import ai_service
+    from app.services.whisper_engine import whisper_pool
+
+    _after_fork(threads, preload=False)
+    started = time.perf_counter()
+    translated = ai_service._translate_batch([("Hello", "eng_Latn", "fra_Latn")])[0]
+    segments, _ = whisper_pool.get().transcribe(np.zeros(16000, dtype=np.float32))
+    list(segments)
+    result = {"translation": translated, "seconds": round(time.perf_counter() - started, 2)}
+    os.write(write_fd, json.dumps(result).encode("utf-8"))
+
+
+def smoke_check(timeout=600, preload=True):
+    """
+    Prepare the master as serve() does, fork one worker and run one translation and one transcription in it.
+
+    Catches models whose state does not survive fork() (a worker that hangs
+    instead of answering).
+
+    Args:
+        timeout: Seconds to wait for the worker before treating it as hung
+        preload: Load the fork-safe models in the master first, as serve() does
+
+    Returns:
+        dict: The worker's results ('translation', 'seconds')
+
+    Raises:
+        RuntimeError: If the worker failed or did not finish within the timeout
+    """
+    import json
+
+    threads = worker_thread_count(1)
+    _set_torch_threads(threads)
+    _prepare_master(preload)
+    gc.collect()
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        exit_code = 0
+        try:
+            _smoke_worker(threads, write_fd)
+        except Exception as e:
+            logger.error(f"Smoke check worker failed: {e}", exc_info=True)
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    os.close(write_fd)
+    deadline = time.monotonic() + timeout
+    status = None
+    while time.monotonic() < deadline:
+        waited, status = os.waitpid(pid, os.WNOHANG)
+        if waited:
+            break
+        time.sleep(0.2)
+    else:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        os.close(read_fd)
+        raise RuntimeError(f"Forked worker did not finish a translation and a transcription within {timeout}s")
+
+    with os.fdopen(read_fd, "rb") as f:
+        output = f.read()
+    if os.WEXITSTATUS(status) != 0 or not output:
+        raise RuntimeError(f"Forked worker failed (status {status}); see the log for details")
+    return json.loads(output.decode("utf-8"))
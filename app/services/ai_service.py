@@ -1,79 +1,280 @@
-from transformers import pipeline
-try:
-    import torch  
-    _TORCH_AVAILABLE = True
-except Exception: 
-    torch = None
-    _TORCH_AVAILABLE = False
 import random
+import threading
+import time
 import hashlib
-from transformers.utils.logging import set_verbosity_error
 from typing import List, Tuple, Optional
-from collections import OrderedDict
 import logging
 from app.config import Config
+from app.services.cache import LRUCache, AnswerCache
+from app.services.retrieval_service import retrieve_passages
+from app.services.qa_engine import CachedQAEngine, PASSAGE_SEPARATOR
+from app.services.batching import MicroBatcher
+from app.services.translation_cache import TranslationCache
+from app.services import model_status, metrics
+from app.services.translation_backends import create_translation_backend
+from app.services.qa_precision import apply_qa_precision
+from app.services.text_utils import question_hash
 
-set_verbosity_error()
 logger = logging.getLogger(__name__)
 
-class LRUCache(OrderedDict):
-    """LRU Cache with maximum size"""
-    def __init__(self, maxsize=100):
-        self.maxsize = maxsize
-        super().__init__()
 
-    def __setitem__(self, key, value):
-        if key in self:
-            self.move_to_end(key)
-        super().__setitem__(key, value)
-        if len(self) > self.maxsize:
-            oldest = next(iter(self))
-            del self[oldest]
+def _import_transformers():
+    """
+    Import transformers (and with it torch) on first model load, not when the app is imported.
+
+    Returns:
+        tuple: (transformers.pipeline, torch module or None)
+    """
+    from transformers import pipeline
+    from transformers.utils.logging import set_verbosity_error
+    set_verbosity_error()
+    try:
+        import torch
+    except Exception:
+        torch = None
+    return pipeline, torch
+
 
 class AIService:
     def __init__(self, cache_size=100):
         """Initialize AI service with lazy model loading"""
-        self._translate_pipe = None
+        self._translation_backend = None
         self._qa_pipeline = None
+        # One lock per model, so the parallel preload loads QA and translation concurrently
+        self._translation_lock = threading.Lock()
+        self._qa_lock = threading.Lock()
+        self._qa_engine = None
+        self._qa_engine_disabled = not Config.QA_CACHED_ENCODING
+        self._qa_batcher = None
+        self._translation_batcher = None
+        self._translation_cache = None
+        self.answer_cache = AnswerCache(maxsize=Config.ANSWER_CACHE_SIZE) if Config.ANSWER_CACHE_ENABLED else None
+        self._context_version = (None, None)
+        self._corpus_artifact = None
         self.response_cache = LRUCache(maxsize=cache_size)
         self.conversation_patterns = {}
+        if Config.QA_MICROBATCH_ENABLED and not Config.QA_CACHED_ENCODING:
+            logger.error("QA_MICROBATCH_ENABLED needs QA_CACHED_ENCODING=True; QA requests will not be batched")
         logger.info("AI Service initialized (models will load on first use)")
 
     @property
-    def translate_pipe(self):
-        """Lazy load translation pipeline"""
-        if self._translate_pipe is None:
-            logger.info("Loading translation model...")
-            self._translate_pipe = pipeline(
-                "translation",
-                model=Config.AI_MODEL_TRANSLATION,
-            )
-            logger.info("Translation model loaded")
-        return self._translate_pipe
+    def translation_backend(self):
+        """Lazy load the translation backend selected by Config.TRANSLATION_BACKEND"""
+        if self._translation_backend is None:
+            with self._translation_lock:
+                if self._translation_backend is None:
+                    logger.info("Loading translation model...")
+                    model_status.mark_loading("translation")
+                    started = time.perf_counter()
+                    try:
+                        _import_transformers()
+                        self._translation_backend = create_translation_backend()
+                    except Exception as e:
+                        model_status.mark_failed("translation", e)
+                        raise
+                    model_status.mark_ready("translation", time.perf_counter() - started)
+                    logger.info(f"Translation model loaded ({self._translation_backend.name} backend)")
+                    # The configured backend may have fallen back to another one
+                    if self._translation_cache is not None:
+                        self._translation_cache.use_backend(self._translation_backend.cache_tag)
+        return self._translation_backend
 
     @property
     def qa_pipeline(self):
         """Lazy load QA pipeline"""
         if self._qa_pipeline is None:
-            logger.info("Loading QA model...")
-            device = 0 if (torch is not None and hasattr(torch, "cuda") and torch.cuda.is_available()) else -1
-            self._qa_pipeline = pipeline(
-                "question-answering",
-                model=Config.AI_MODEL_QA,
-                device=device,
-            )
-            logger.info("QA model loaded")
+            with self._qa_lock:
+                if self._qa_pipeline is None:
+                    logger.info("Loading QA model...")
+                    model_status.mark_loading("qa")
+                    started = time.perf_counter()
+                    try:
+                        pipeline, torch = _import_transformers()
+                        device = 0 if (torch is not None and hasattr(torch, "cuda") and torch.cuda.is_available()) else -1
+                        qa = pipeline(
+                            "question-answering",
+                            model=Config.AI_MODEL_QA,
+                            device=device,
+                        )
+                        qa, precision = apply_qa_precision(qa)
+                        self._qa_pipeline = qa
+                    except Exception as e:
+                        model_status.mark_failed("qa", e)
+                        raise
+                    model_status.mark_ready("qa", time.perf_counter() - started, precision=precision)
+                    logger.info(f"QA model loaded ({precision})")
         return self._qa_pipeline
 
+    @property
+    def qa_engine(self):
+        """Lazy build the cached-encoding QA engine on top of the QA pipeline's model"""
+        if self._qa_engine is None and not self._qa_engine_disabled:
+            try:
+                qa = self.qa_pipeline
+                engine = CachedQAEngine(qa.model, qa.tokenizer)
+                engine.segment_source = self._corpus_artifact
+                self._qa_engine = engine
+            except Exception as e:
+                logger.warning(f"Cached QA encoding unavailable, using the QA pipeline: {e}")
+                if Config.QA_MICROBATCH_ENABLED:
+                    logger.error("QA micro-batching is off: it runs on the cached-encoding engine")
+                self._qa_engine_disabled = True
+        return self._qa_engine
+
+    @property
+    def qa_batcher(self):
+        """Lazy create the scheduler that coalesces concurrent QA requests into one forward pass"""
+        if self._qa_batcher is None and Config.QA_MICROBATCH_ENABLED:
+            engine = self.qa_engine
+            if engine is not None:
+                self._qa_batcher = MicroBatcher(
+                    engine.answer_batch,
+                    max_batch_size=Config.QA_MICROBATCH_MAX_REQUESTS,
+                    max_wait_ms=Config.QA_MICROBATCH_MAX_WAIT_MS,
+                    name="qa-batcher",
+                )
+        return self._qa_batcher
+
+    @property
+    def translation_batcher(self):
+        """Lazy create the scheduler that groups pending translations by language pair"""
+        if self._translation_batcher is None and Config.TRANSLATION_BATCH_ENABLED:
+            self._translation_batcher = MicroBatcher(
+                self._translate_batch,
+                max_batch_size=Config.TRANSLATION_BATCH_MAX_SIZE,
+                max_wait_ms=Config.TRANSLATION_BATCH_MAX_WAIT_MS,
+                key_fn=lambda item: (item[1], item[2]),
+                name="translation-batcher",
+            )
+        return self._translation_batcher
+
+    @property
+    def translation_cache(self):
+        """Lazy open the two-tier translation cache"""
+        if self._translation_cache is None and Config.TRANSLATION_CACHE_ENABLED:
+            backend = self._translation_backend
+            self._translation_cache = TranslationCache(backend_tag=getattr(backend, "cache_tag", None))
+        return self._translation_cache
+
     def translate(self, text, src_lang, tgt_lang):
         """Translate text from source to target language"""
+        # English is the pivot language, so translating into it is the inbound leg of a turn
+        leg = "translation_cache_in" if tgt_lang == "eng_Latn" else "translation_cache_out"
         try:
-            result = self.translate_pipe(text, src_lang=src_lang, tgt_lang=tgt_lang)
-            return result[0]['translation_text']
+            cache = self.translation_cache
+            if cache is not None:
+                cached = cache.get(text, src_lang, tgt_lang)
+                if cached is not None:
+                    metrics.annotate(leg, "hit")
+                    return cached
+                metrics.annotate(leg, "miss")
+
+            batcher = self.translation_batcher
+            if batcher is not None:
+                translated = batcher.run((text, src_lang, tgt_lang), timeout=Config.TRANSLATION_BATCH_TIMEOUT)
+            else:
+                translated = self._translate_batch([(text, src_lang, tgt_lang)])[0]
+
+            if cache is not None:
+                cache.put(text, src_lang, tgt_lang, translated)
+            return translated
         except Exception as e:
             logger.error(f"Translation error: {e}")
             return text  # Return original text on error
 
+    def _translate_batch(self, items):
+        """
+        Translate several texts sharing one language pair in a single padded batch.
+
+        Args:
+            items: List of (text, src_lang, tgt_lang) tuples with identical languages
+
+        Returns:
+            list: Translated strings, in input order
+        """
+        texts = [text for text, _, _ in items]
+        _, src_lang, tgt_lang = items[0]
+        return self.translation_backend.translate_batch(texts, src_lang, tgt_lang)
+
+    def warm_up_qa(self):
+        """Load the QA model and run a dummy question through the full QA path"""
+        model_status.mark_warming("qa")
+        self.qa_pipeline
+        started = time.perf_counter()
+        try:
+            self._run_qa("What is this?", ["This is a warm-up passage."], 1)
+        except Exception as e:
+            logger.warning(f"QA warm-up failed: {e}")
+            model_status.mark_warm_failed("qa", e)
+            return
+        model_status.mark_warm("qa", time.perf_counter() - started)
+
+    def warm_up_translation(self):
+        """Load the translation model and run a dummy translation (bypassing the cache)"""
+        model_status.mark_warming("translation")
+        self.translation_backend
+        started = time.perf_counter()
+        try:
+            self._translate_batch([("Hello", "eng_Latn", "fra_Latn")])
+        except Exception as e:
+            logger.warning(f"Translation warm-up failed: {e}")
+            model_status.mark_warm_failed("translation", e)
+            return
+        model_status.mark_warm("translation", time.perf_counter() - started)
+
+    def cache_stats(self):
+        """
+        Hit/miss statistics for the service's caches.
+
+        Returns:
+            dict: Stats per cache, keyed by cache name
+        """
+        stats = {}
+        if self._translation_cache is not None:
+            stats['translation'] = self._translation_cache.stats()
+        if self.answer_cache is not None:
+            stats['answer'] = self.answer_cache.stats()
+        return stats
+
+    def invalidate_answer_cache(self):
+        """Drop cached answers (called when the knowledge base is reloaded)"""
+        if self.answer_cache is not None:
+            self.answer_cache.clear()
+            logger.info("Answer cache invalidated")
+
+    def context_version(self, base_context):
+        """
+        Version hash of a context string, memoized for the current context object.
+
+        Args:
+            base_context: The knowledge base text
+
+        Returns:
+            str: MD5 hex digest of the context
+        """
+        cached_context, version = self._context_version
+        if base_context is cached_context:
+            return version
+        version = hashlib.md5((base_context or "").encode("utf-8")).hexdigest()
+        self._context_version = (base_context, version)
+        return version
+
+    def set_context_version(self, base_context, version):
+        """Record a version already computed for a context (e.g. incrementally, while ingesting)"""
+        self._context_version = (base_context, version)
+
+    def use_corpus_artifact(self, artifact):
+        """Take the pre-tokenized knowledge base passages from a compiled corpus artifact (None to stop)"""
+        self._corpus_artifact = artifact
+        if self._qa_engine is not None:
+            self._qa_engine.segment_source = artifact
+
+    def _answer_cache_key(self, question_hash, base_context, conversation_history):
+        """Key covering everything that determines the QA candidates for a question"""
+        history_window = conversation_history[-Config.CONVERSATION_RECENT_EXCHANGES:] if conversation_history else []
+        history_hash = hashlib.md5(repr(history_window).encode("utf-8")).hexdigest()
+        return (question_hash, self.context_version(base_context), history_hash, Config.AI_QA_TOP_K_PRIMARY)
+
     def answer_question(self, question, context):
         """Answer question based on context"""
         try:
@@ -100,47 +301,138 @@ class AIService:
         Returns:
             str: The generated answer
         """
-        enhanced_context = self._build_enhanced_context(base_context, conversation_history)
-
         question_hash = self._get_question_hash(question)
         if self._is_repetitive_question(question, conversation_history):
-            return self._generate_diverse_response(question, enhanced_context, question_hash)
+            metrics.annotate("answer_cache", "repetitive")
+            with metrics.timed("retrieve"):
+                passages = self._retrieve_passages(question, base_context, conversation_history)
+            segments = self._build_context_segments(passages, conversation_history)
+            with metrics.timed("qa"):
+                return self._generate_diverse_response(question, segments, question_hash)
 
         try:
-            result = self.qa_pipeline(
-                question=question,
-                context=enhanced_context,
-                top_k=Config.AI_QA_TOP_K_PRIMARY,
-                max_answer_len=Config.AI_MAX_ANSWER_LEN,
-            )
+            cache_key = None
+            result = None
+            if self.answer_cache is not None:
+                cache_key = self._answer_cache_key(question_hash, base_context, conversation_history)
+                result = self.answer_cache.get(cache_key)
+                metrics.annotate("answer_cache", "hit" if result is not None else "miss")
+
+            if result is None:
+                with metrics.timed("retrieve"):
+                    passages = self._retrieve_passages(question, base_context, conversation_history)
+                segments = self._build_context_segments(passages, conversation_history)
+                with metrics.timed("qa"):
+                    result = self._run_qa(question, segments, Config.AI_QA_TOP_K_PRIMARY)
+                # An empty candidate list means no answer; do not pin it in the cache
+                if cache_key is not None and result:
+                    self.answer_cache.put(cache_key, result)
 
             response = self._select_diverse_response(result, question, question_hash)
             return response
         except Exception as e:
             logger.error(f"Error in QA pipeline: {e}")
             return "I apologize, but I'm having trouble processing your question right now."
-    
-    def _build_enhanced_context(self, base_context, conversation_history):
+
+    def _run_qa(self, question, segments, top_k):
         """
-        Build enhanced context by combining base context with recent conversation.
+        Run extractive QA over context segments.
+
+        Goes through the micro-batching scheduler when enabled, otherwise the
+        cached-encoding engine when available, otherwise the plain pipeline.
 
         Args:
-            base_context: The base context string
+            question: The question to answer
+            segments: Context strings, concatenated verbatim
+            top_k: Number of answer candidates
+
+        Returns:
+            QA result (list of answer dicts, or a dict from the pipeline when top_k is 1)
+        """
+        batcher = self.qa_batcher
+        if batcher is not None:
+            return batcher.run(
+                (question, segments, top_k, Config.AI_MAX_ANSWER_LEN),
+                timeout=Config.QA_MICROBATCH_TIMEOUT,
+            )
+        engine = self.qa_engine
+        if engine is not None:
+            return engine.answer(question, segments, top_k=top_k, max_answer_len=Config.AI_MAX_ANSWER_LEN)
+        return self.qa_pipeline(
+            question=question,
+            context="".join(segments),
+            top_k=top_k,
+            max_answer_len=Config.AI_MAX_ANSWER_LEN,
+            max_seq_len=Config.QA_MAX_SEQ_LEN,
+            doc_stride=Config.QA_DOC_STRIDE,
+        )
+
+    def _retrieve_passages(self, question, base_context, conversation_history=None):
+        """
+        Narrow the base context down to the passages relevant to the question.
+
+        Args:
+            question: The question to answer
+            base_context: The full knowledge base text
             conversation_history: List of (question, answer) tuples
 
         Returns:
-            str: Enhanced context with conversation history
+            list: The top-k passages, or [base_context] if retrieval is disabled
+        """
+        if not Config.RETRIEVAL_ENABLED or not base_context:
+            return [base_context] if base_context else []
+
+        # Follow-up questions ("what did he do next?") borrow terms from the previous question
+        query = question
+        if conversation_history:
+            query = f"{question} {conversation_history[-1][0]}"
+
+        try:
+            return retrieve_passages(query, base_context)
+        except Exception as e:
+            logger.error(f"Retrieval error: {e}")
+            return [base_context]
+
+    def _build_context_segments(self, passages, conversation_history):
         """
+        Lay out passages and recent conversation as separately cacheable segments.
+
+        Concatenating the segments gives the same text as _build_enhanced_context.
+
+        Args:
+            passages: List of context passages
+            conversation_history: List of (question, answer) tuples
+
+        Returns:
+            list: Context segments, to be concatenated verbatim
+        """
+        # Separators open the following segment: with byte-level BPE a boundary just before
+        # whitespace tokenizes as in the joined text, one just after it often does not (the
+        # QA engine would then have to tokenize the two segments together)
+        segments = [passage if not i else PASSAGE_SEPARATOR + passage for i, passage in enumerate(passages)]
+
         if not conversation_history:
-            return base_context
+            return segments
 
+        segments.append("\n\nRecent Conversation Context:\n")
         recent_exchanges = conversation_history[-Config.CONVERSATION_RECENT_EXCHANGES:]
-        conversation_context = "\n".join([
-            f"Previous Question: {q}\nPrevious Answer: {a}\n"
-            for q, a in recent_exchanges
-        ])
+        for i, (q, a) in enumerate(recent_exchanges):
+            separator = "\n" if i else ""
+            segments.append(f"{separator}Previous Question: {q}\nPrevious Answer: {a}\n")
+        return segments
+
+    def _build_enhanced_context(self, base_context, conversation_history):
+        """
+        Build enhanced context by combining base context with recent conversation.
+
+        Args:
+            base_context: The base context string
+            conversation_history: List of (question, answer) tuples
 
-        return f"{base_context}\n\nRecent Conversation Context:\n{conversation_context}"
+        Returns:
+            str: Enhanced context with conversation history
+        """
+        return "".join(self._build_context_segments([base_context], conversation_history))
     
     def _get_question_hash(self, question):
         """
@@ -152,8 +444,7 @@ class AIService:
         Returns:
             str: MD5 hash of the normalized question
         """
-        normalized = question.lower().strip()
-        return hashlib.md5(normalized.encode()).hexdigest()
+        return question_hash(question)
     
     def _is_repetitive_question(self, question, conversation_history):
         """
@@ -200,13 +491,13 @@ class AIService:
 
         return len(intersection) / len(union)
     
-    def _generate_diverse_response(self, question, context, question_hash):
+    def _generate_diverse_response(self, question, segments, question_hash):
         """
         Generate a diverse response for repetitive questions.
 
         Args:
             question: The question string
-            context: The context for answering
+            segments: The context segments for answering
             question_hash: MD5 hash of the question
 
         Returns:
@@ -218,14 +509,9 @@ class AIService:
                 return random.choice([r for r in cached_responses if r != cached_responses[-1]])
 
         try:
-            result = self.qa_pipeline(
-                question=question,
-                context=context,
-                top_k=Config.AI_QA_TOP_K_DIVERSE,
-                max_answer_len=Config.AI_MAX_ANSWER_LEN,
-            )
+            result = self._run_qa(question, segments, Config.AI_QA_TOP_K_DIVERSE)
 
-            if isinstance(result, list):
+            if isinstance(result, list) and result:
                 slice_end = min(len(result), 3)
                 response = random.choice(result[:slice_end])['answer']
             else:
@@ -257,7 +543,7 @@ class AIService:
         Returns:
             str: The selected response
         """
-        if isinstance(result, list):
+        if isinstance(result, list) and result:
             candidates = [r['answer'] for r in result]
             unique_candidates = list(dict.fromkeys(candidates))
 
@@ -283,10 +569,16 @@ class AIService:
 ai_service = AIService()
 
 def translate(text, src_lang, tgt_lang):
+    if Config.INFERENCE_MODE == "remote":
+        from app.services.inference_client import remote_translate
+        return remote_translate(text, src_lang, tgt_lang)
     return ai_service.translate(text, src_lang, tgt_lang)
 
 def answer_question(question, context):
     return ai_service.answer_question(question, context)
 
 def answer_question_with_context(question, context, conversation_history=None):
+    if Config.INFERENCE_MODE == "remote":
+        from app.services.inference_client import remote_answer_question_with_context
+        return remote_answer_question_with_context(question, context, conversation_history)
     return ai_service.answer_question_with_context(question, context, conversation_history)
@@ -16,7 +16,11 @@ class AITrainingService:
         self.tokenized = None
         self.trainer = None
 
-    def load_ds(self):
+    def load_ds(self, export_from_store=True):
+        if export_from_store:
+            # The knowledge store is the source of truth; refresh the JSONL snapshot the dataset loader reads
+            from app.services.document_store import document_store
+            document_store.export_jsonl(self.data_file)
         self.dataset = load_dataset("json", data_files=self.data_file)["train"]
 
     def load_tokenizer_and_model(self):
@@ -0,0 +1,143 @@
+import os
+import time
+import weakref
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Every live batcher, so a forked child can reset them (see MicroBatcher._after_fork)
+_batchers = weakref.WeakSet()
+
+
+def _reset_after_fork():
+    for batcher in list(_batchers):
+        batcher._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class MicroBatcher:
+    """
+    Coalesces calls from concurrent threads into batches.
+
+    Callers submit single items and wait on a Future. A background thread
+    collects items that arrive within max_wait_ms of the first one (up to
+    max_batch_size), passes them to process_batch as one list and fans the
+    results back out. When key_fn is given, a batch only ever contains items
+    with the same key; other items stay queued, in order, for the next batch.
+    """
+    def __init__(self, process_batch, max_batch_size=8, max_wait_ms=5, key_fn=None, name="batcher"):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self.key_fn = key_fn
+        self.name = name
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        _batchers.add(self)
+
+    @property
+    def queue_depth(self):
+        """Number of submitted items not yet picked up by the worker"""
+        return len(self._pending)
+
+    def submit(self, item):
+        """
+        Queue an item for batched processing.
+
+        Args:
+            item: A single input for process_batch
+
+        Returns:
+            Future: Resolves to this item's result
+        """
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"{self.name} is closed")
+            self._pending.append((item, future))
+            # Threads do not survive fork(): a forked worker starts its own
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def run(self, item, timeout=None):
+        """Submit an item and block until its result is ready"""
+        return self.submit(item).result(timeout=timeout)
+
+    def close(self):
+        """Stop the worker once the queue is drained"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _after_fork(self):
+        """
+        Start over in a forked child: the parent's worker thread may have held the
+        lock at fork time, and queued items belong to callers that only exist in the parent
+        """
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._thread = None
+        self._pid = None
+
+    def _key(self, entry):
+        return self.key_fn(entry[0]) if self.key_fn else None
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return None
+
+            # Give concurrent callers a short window to join the batch
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closed:
+                    break
+                self._cond.wait(remaining)
+
+            key = self._key(self._pending[0])
+            batch = []
+            skipped = []
+            while self._pending and len(batch) < self.max_batch_size:
+                entry = self._pending.popleft()
+                if self._key(entry) == key:
+                    batch.append(entry)
+                else:
+                    skipped.append(entry)
+            self._pending.extendleft(reversed(skipped))
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            items = [item for item, _ in batch]
+            try:
+                results = self.process_batch(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: expected {len(items)} results, got {len(results)}")
+            except Exception as e:
+                logger.error(f"{self.name} batch of {len(items)} failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
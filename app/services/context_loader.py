@@ -1,22 +1,29 @@
 import os
 import logging
-import json
+import hashlib
+import time
+import threading
+from app.config import Config
+from app.services import metrics
+from app.services.document_store import document_store
+from app.services.corpus_artifact import open_artifact
 
 logger = logging.getLogger(__name__)
 
-def load_context(include_transcripts=True):
+TRANSCRIPTS_HEADER = "=== Uploaded Content Transcripts ==="
+
+
+def load_base_context(with_path=False):
     """
-    Load context from llm-script.txt file and optionally include transcripts.
-    
+    Load the base knowledge text from llm-script.txt.
+
     Args:
-        include_transcripts: If True, also load transcripts from data/train.jsonl
-    
+        with_path: Also return the path the text was read from
+
     Returns:
-        Combined context string from llm-script.txt and transcripts
+        str: File content, or an empty string if not found
+        (or a (content, path) tuple when with_path is set; path is None if not found)
     """
-    context_parts = []
-    
-    # Load base context from llm-script.txt
     possible_paths = [
         "llm-script.txt",  # Current directory
         os.path.join(os.path.dirname(__file__), "..", "..", "llm-script.txt"),  # Project root
@@ -30,71 +37,284 @@ def load_context(include_transcripts=True):
                 with open(abs_path, "r", encoding="utf-8") as f:
                     content = f.read()
                     if content.strip():
-                        context_parts.append(content)
                         logger.info(f"Base context loaded from: {abs_path} ({len(content)} characters)")
-                        break
+                        return (content, abs_path) if with_path else content
         except Exception as e:
             logger.warning(f"Failed to load context from {context_path}: {e}")
             continue
-    
-    if not context_parts:
-        logger.warning("Base context file (llm-script.txt) not found")
-    
-    # Load transcripts if requested
+
+    logger.warning("Base context file (llm-script.txt) not found")
+    return ("", None) if with_path else ""
+
+
+def compose_context(base, transcripts):
+    """Join the base text and transcript texts the way the QA context is laid out"""
+    context_parts = [base] if base else []
+    if transcripts:
+        context_parts.append(f"{TRANSCRIPTS_HEADER}\n\n" + "\n\n".join(transcripts))
+    return "\n\n".join(context_parts)
+
+
+def load_context(include_transcripts=True):
+    """
+    Load context from llm-script.txt file and optionally include transcripts.
+
+    Args:
+        include_transcripts: If True, also load the documents of the knowledge store
+
+    Returns:
+        Combined context string from llm-script.txt and transcripts
+    """
+    transcripts = []
     if include_transcripts:
-        transcripts = load_transcripts()
+        transcripts, _ = read_transcripts()
         if transcripts:
-            context_parts.append(transcripts)
-            logger.info(f"Transcripts added to context ({len(transcripts)} characters)")
-    
-    return "\n\n".join(context_parts) if context_parts else ""
+            logger.info(f"Transcripts added to context ({len(transcripts)} documents)")
+    return compose_context(load_base_context(), transcripts)
 
 
-def load_transcripts():
+def read_transcripts(after_id=0):
     """
-    Load all transcripts from data/train.jsonl.
-    
+    Read document texts from the knowledge store, in insertion order.
+
+    Args:
+        after_id: Only documents stored after this id
+
     Returns:
-        Combined transcript text or empty string if none found
+        tuple: (list of texts, id of the last document read, or after_id if none)
     """
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
-    transcript_file = os.path.join(base_dir, "data", "train.jsonl")
-    
-    if not os.path.exists(transcript_file):
-        logger.debug(f"No transcript file found at {transcript_file}")
-        return ""
-    
-    transcripts = []
+    texts = []
+    last_id = after_id
     try:
-        with open(transcript_file, "r", encoding="utf-8") as f:
-            for line_num, line in enumerate(f, 1):
-                try:
-                    data = json.loads(line.strip())
-                    if "text" in data and data["text"].strip():
-                        transcripts.append(data["text"].strip())
-                except json.JSONDecodeError:
-                    logger.warning(f"Skipping malformed JSON at line {line_num} in {transcript_file}")
-                    continue
-        
-        if transcripts:
-            combined = "\n\n".join(transcripts)
-            logger.info(f"Loaded {len(transcripts)} transcript(s) from {transcript_file}")
-            return f"=== Uploaded Content Transcripts ===\n\n{combined}"
-        
+        for document in document_store.iter_documents(after_id=after_id):
+            texts.append(document["text"])
+            last_id = document["id"]
     except Exception as e:
         logger.error(f"Error loading transcripts: {e}")
-    
+    return texts, last_id
+
+
+def load_transcripts():
+    """
+    Load all transcripts from the knowledge store.
+
+    Returns:
+        Combined transcript text or empty string if none found
+    """
+    transcripts, _ = read_transcripts()
+    if transcripts:
+        logger.info(f"Loaded {len(transcripts)} transcript(s) from {document_store.path}")
+        return compose_context("", transcripts)
     return ""
 
 
+class ContextCorpus:
+    """
+    The in-memory knowledge base, grown incrementally as documents are ingested.
+
+    Remembers the id of the last document read from the knowledge store, so a
+    refresh only fetches the documents stored since and extends the text (and
+    its MD5 version) with them. The result is identical to a full load_context().
+
+    When a compiled corpus artifact (see corpus_artifact) matches llm-script.txt,
+    a load maps it and only reads the documents stored after it was built.
+
+    sync() keeps worker processes converged: it compares the size/mtime of
+    llm-script.txt and the newest document id with what was loaded (at most
+    every CONTEXT_CHECK_INTERVAL seconds) and ingests what another process wrote.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.text = ""
+        self.version = hashlib.md5(b"").hexdigest()
+        self._hasher = hashlib.md5()
+        self._include_transcripts = True
+        self._base = ""
+        self._base_path = None
+        self._base_signature = None
+        self._base_hash = None
+        self._transcript_count = 0
+        self._last_id = 0
+        self._next_check = 0.0
+        self.artifact = None
+
+    @staticmethod
+    def _stat(path):
+        try:
+            return os.stat(path)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _signature(stat):
+        return None if stat is None else (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    @property
+    def document_count(self):
+        return self._transcript_count
+
+    def _set_text(self, text):
+        self.text = text
+        self._hasher = hashlib.md5(text.encode("utf-8"))
+        self.version = self._hasher.hexdigest()
+
+    def _load_locked(self, include_transcripts):
+        self._include_transcripts = include_transcripts
+        self._base, self._base_path = load_base_context(with_path=True)
+        self._base_signature = self._signature(self._stat(self._base_path)) if self._base_path else None
+        self._base_hash = hashlib.md5(self._base.encode("utf-8")).hexdigest()
+        self.artifact = None
+        if include_transcripts and self._load_artifact_locked():
+            return self.text
+
+        transcripts = []
+        self._last_id = 0
+        if include_transcripts:
+            transcripts, self._last_id = read_transcripts()
+        self._transcript_count = len(transcripts)
+        self._set_text(compose_context(self._base, transcripts))
+        return self.text
+
+    def _load_artifact_locked(self):
+        """Start from the compiled corpus artifact if it is current; returns False if there is none"""
+        artifact = open_artifact()
+        if artifact is None:
+            return False
+        if not artifact.is_current(self._base_hash):
+            logger.info(f"Corpus artifact {artifact.version} is stale (llm-script.txt or chunking changed); "
+                        "rebuild it with python -m app.services.corpus_artifact build")
+            return False
+        try:
+            if document_store.max_document_id() < artifact.last_document_id:
+                logger.info(f"Corpus artifact {artifact.version} has documents no longer in the store; ignoring it")
+                return False
+        except Exception as e:
+            logger.error(f"Could not query the knowledge store: {e}")
+            return False
+
+        with metrics.timed("load_artifact"):
+            self.artifact = artifact
+            self._last_id = artifact.last_document_id
+            self._transcript_count = artifact.document_count
+            self._set_text(artifact.context)
+            texts, self._last_id = read_transcripts(self._last_id)
+            if texts:
+                self._append_locked(texts)
+        logger.info(f"Context mapped from corpus artifact {artifact.version} "
+                    f"(+{len(texts)} newer document(s), {len(self.text)} characters)")
+        return True
+
+    def load(self, include_transcripts=True):
+        """
+        Read the whole knowledge base from disk.
+
+        Returns:
+            str: The context text
+        """
+        with self._lock:
+            return self._load_locked(include_transcripts)
+
+    def _append_locked(self, texts):
+        addition = "\n\n".join(texts)
+        if self._transcript_count == 0:
+            addition = f"{TRANSCRIPTS_HEADER}\n\n{addition}"
+        if self.text:
+            addition = "\n\n" + addition
+        self._transcript_count += len(texts)
+        self.text = self.text + addition
+        self._hasher.update(addition.encode("utf-8"))
+        self.version = self._hasher.hexdigest()
+
+    def refresh(self):
+        """
+        Ingest documents stored since the last load or refresh.
+
+        Falls back to a full load if documents were removed from the store.
+
+        Returns:
+            int: Number of new documents ingested (-1 after a full reload)
+        """
+        with self._lock:
+            if not self._include_transcripts:
+                return 0
+            try:
+                newest = document_store.max_document_id()
+            except Exception as e:
+                logger.error(f"Could not query the knowledge store: {e}")
+                return 0
+            if newest < self._last_id:
+                logger.info("Documents were removed from the knowledge store; reloading the full context")
+                self._load_locked(True)
+                return -1
+            if newest == self._last_id:
+                return 0
+
+            with metrics.timed("ingest_context"):
+                texts, self._last_id = read_transcripts(self._last_id)
+                if texts:
+                    self._append_locked(texts)
+            if texts:
+                logger.info(f"Ingested {len(texts)} new document(s) into the context ({len(self.text)} characters)")
+            return len(texts)
+
+    def _base_changed(self):
+        """True if llm-script.txt now has different content than what was loaded"""
+        if self._base_path is None:
+            return False
+        signature = self._signature(self._stat(self._base_path))
+        if signature == self._base_signature:
+            return False
+        try:
+            with open(self._base_path, "r", encoding="utf-8") as f:
+                content_hash = hashlib.md5(f.read().encode("utf-8")).hexdigest()
+        except OSError:
+            content_hash = None
+        if content_hash == self._base_hash:
+            # Touched or rewritten with the same content
+            self._base_signature = signature
+            return False
+        return True
+
+    def sync(self, force=False):
+        """
+        Pick up changes made on disk, possibly by other worker processes.
+
+        Costs one stat() call and one indexed query when nothing changed, and
+        nothing at all within CONTEXT_CHECK_INTERVAL of the previous check.
+
+        Args:
+            force: Check now regardless of the interval
+
+        Returns:
+            int: Number of documents ingested, -1 after a full reload, 0 if unchanged
+        """
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return 0
+        self._next_check = now + Config.CONTEXT_CHECK_INTERVAL
+
+        with self._lock:
+            base_changed = self._base_changed()
+            if base_changed:
+                logger.info("llm-script.txt changed on disk; reloading the full context")
+                self._load_locked(self._include_transcripts)
+        if base_changed:
+            return -1
+        return self.refresh()
+
+
+context_corpus = ContextCorpus()
+
+
+@metrics.timed_function("reload_context")
 def reload_context(include_transcripts=True):
     """
     Reload context dynamically (useful for refreshing after uploads).
-    
+
     Args:
         include_transcripts: If True, also reload transcripts
-    
+
     Returns:
         Fresh combined context string
     """
-    return load_context(include_transcripts=include_transcripts)
+    return context_corpus.load(include_transcripts=include_transcripts)
@@ -0,0 +1,432 @@
+"""
+Compiled knowledge base artifact.
+
+    python -m app.services.corpus_artifact build
+    python -m app.services.corpus_artifact info
+
+`build` compiles llm-script.txt and the knowledge store into one versioned file
+(CORPUS_ARTIFACT_PATH) holding the context text, its retrieval chunks with
+their offsets, the BM25 postings, the chunks pre-tokenized for the QA model and,
+in dense retrieval mode, the chunk embeddings. Workers memory-map it at startup
+instead of chunking, indexing and tokenizing the corpus themselves; the mapping
+is read-only, so all workers share one page-cache copy.
+
+Documents stored after the artifact was built are ingested incrementally on
+top of it. An edited llm-script.txt or changed chunking settings make it stale;
+it is then ignored until rebuilt.
+"""
+import os
+import sys
+import json
+import mmap
+import time
+import array
+import bisect
+import struct
+import hashlib
+import argparse
+import logging
+from app.config import Config
+from app.services.retrieval_service import BM25Index, chunk_text
+from app.services.qa_engine import PASSAGE_SEPARATOR
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"VCCORPUS"
+FORMAT_VERSION = 2
+# magic, format version, header length; the JSON header follows, then the sections
+_PREAMBLE = struct.Struct("<8sII")
+_ALIGN = 8
+
+
+def _align(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def chunk_digest(text):
+    """64-bit hash used to look up a passage's pre-tokenized ids"""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _packed(typecode, values):
+    packed = array.array(typecode, values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _bounds(lengths):
+    """Cumulative start offsets (len(lengths) + 1 of them)"""
+    bounds = [0]
+    for length in lengths:
+        bounds.append(bounds[-1] + length)
+    return bounds
+
+
+def _tokenize_chunks(chunks, model_id):
+    """Tokenize chunks as CachedQAEngine receives them: as passage segments, behind the passage separator"""
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    if not getattr(tokenizer, "is_fast", False):
+        raise ValueError(f"{model_id} has no fast tokenizer (offset mappings are required)")
+    ids = array.array("i")
+    spans = array.array("i")
+    words = array.array("i")
+    counts = []
+    for start in range(0, len(chunks), 256):
+        batch = [PASSAGE_SEPARATOR + chunk for chunk in chunks[start:start + 256]]
+        encoded = tokenizer(batch, add_special_tokens=False, return_offsets_mapping=True)
+        for index, (input_ids, offsets) in enumerate(zip(encoded["input_ids"], encoded["offset_mapping"])):
+            ids.extend(input_ids)
+            for span in offsets:
+                spans.extend(span)
+            words.extend(-1 if word is None else word for word in encoded.word_ids(index))
+            counts.append(len(input_ids))
+    info = {"name": getattr(tokenizer, "name_or_path", model_id), "size": len(tokenizer),
+            "prefix": PASSAGE_SEPARATOR}
+    return info, ids, spans, words, counts
+
+
+def _embed_chunks(chunks):
+    from app.services.embedding_service import EmbeddingEncoder, quantize_int8
+
+    encoder = EmbeddingEncoder()
+    vectors = encoder.encode(chunks)
+    scales = None
+    if Config.EMBEDDING_DTYPE == "int8":
+        vectors, scales = quantize_int8(vectors)
+    info = {"model": encoder.model_id, "dtype": Config.EMBEDDING_DTYPE,
+            "rows": int(vectors.shape[0]), "dim": int(vectors.shape[1])}
+    return info, vectors, scales
+
+
+def build_artifact(path=None, with_tokens=True, with_vectors=None):
+    """
+    Compile the current knowledge base into an artifact file (replaced atomically).
+
+    Args:
+        path: Output path (default CORPUS_ARTIFACT_PATH)
+        with_tokens: Pre-tokenize chunks for the QA model (needs transformers)
+        with_vectors: Embed chunks (default: when RETRIEVAL_MODE is dense)
+
+    Returns:
+        dict: The artifact header
+    """
+    from app.services.context_loader import load_base_context, compose_context, read_transcripts
+
+    path = path or Config.CORPUS_ARTIFACT_PATH
+    if with_vectors is None:
+        with_vectors = Config.RETRIEVAL_MODE == "dense"
+    started = time.perf_counter()
+
+    base = load_base_context()
+    texts, last_id = read_transcripts()
+    context = compose_context(base, texts)
+    chunks = chunk_text(context)
+    index = BM25Index()
+    index.add_passages(chunks)
+
+    sections = {}
+    sections["context"] = context.encode("utf-8")
+    encoded_chunks = [chunk.encode("utf-8") for chunk in chunks]
+    sections["chunk_text"] = b"".join(encoded_chunks)
+    sections["chunk_bounds"] = _packed("Q", _bounds(len(chunk) for chunk in encoded_chunks))
+    digests = sorted((chunk_digest(chunk), chunk_id) for chunk_id, chunk in enumerate(chunks))
+    sections["chunk_hashes"] = _packed("Q", (digest for digest, _ in digests))
+    sections["chunk_hash_ids"] = _packed("I", (chunk_id for _, chunk_id in digests))
+
+    terms = sorted(index.postings)
+    encoded_terms = [term.encode("utf-8") for term in terms]
+    sections["terms"] = b"".join(encoded_terms)
+    sections["term_bounds"] = _packed("Q", _bounds(len(term) for term in encoded_terms))
+    sections["posting_bounds"] = _packed("Q", _bounds(len(index.postings[term]) for term in terms))
+    sections["posting_ids"] = _packed("I", (pid for term in terms for pid, _ in index.postings[term]))
+    sections["posting_tfs"] = _packed("I", (tf for term in terms for _, tf in index.postings[term]))
+    sections["doc_lengths"] = _packed("I", index.doc_lengths)
+
+    tokenizer_info = None
+    if with_tokens:
+        try:
+            tokenizer_info, ids, spans, words, counts = _tokenize_chunks(chunks, Config.AI_MODEL_QA)
+            sections["token_ids"] = _packed("i", ids)
+            sections["token_spans"] = _packed("i", spans)
+            sections["token_words"] = _packed("i", words)
+            sections["token_bounds"] = _packed("Q", _bounds(counts))
+        except Exception as e:
+            logger.warning(f"Skipping QA pre-tokenization: {e}")
+
+    embedding_info = None
+    if with_vectors:
+        try:
+            embedding_info, vectors, scales = _embed_chunks(chunks)
+            sections["vectors"] = vectors.tobytes()
+            if scales is not None:
+                sections["vector_scales"] = scales.tobytes()
+        except Exception as e:
+            logger.warning(f"Skipping chunk embeddings: {e}")
+
+    layout = {}
+    offset = 0
+    for name, data in sections.items():
+        layout[name] = [offset, len(data)]
+        offset = _align(offset + len(data))
+
+    context_md5 = hashlib.md5(sections["context"]).hexdigest()
+    chunking = {"chars": Config.RETRIEVAL_CHUNK_CHARS, "overlap": Config.RETRIEVAL_CHUNK_OVERLAP}
+    header = {
+        "version": hashlib.sha1(json.dumps(
+            [FORMAT_VERSION, context_md5, chunking, tokenizer_info, embedding_info], sort_keys=True
+        ).encode("utf-8")).hexdigest()[:16],
+        "created": time.time(),
+        "byteorder": "little",
+        "context_md5": context_md5,
+        "base_md5": hashlib.md5(base.encode("utf-8")).hexdigest(),
+        "last_document_id": last_id,
+        "documents": len(texts),
+        "chunks": len(chunks),
+        "chunking": chunking,
+        "bm25": {"terms": len(terms), "total_length": index.total_length},
+        "tokenizer": tokenizer_info,
+        "embedding": embedding_info,
+        "sections": layout,
+    }
+    encoded_header = json.dumps(header, sort_keys=True).encode("utf-8")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(encoded_header)))
+        f.write(encoded_header)
+        data_start = _align(f.tell())
+        for name, data in sections.items():
+            f.seek(data_start + layout[name][0])
+            f.write(data)
+        f.truncate(data_start + offset)
+    # Workers that mapped the previous file keep a valid mapping until they reopen
+    os.replace(tmp_path, path)
+
+    logger.info(f"Corpus artifact {header['version']} written to {path} ({header['chunks']} chunks, "
+                f"{header['documents']} documents) in {time.perf_counter() - started:.1f}s")
+    return header
+
+
+class _MappedPassages:
+    """Chunk texts decoded from the artifact on access, followed by passages appended since"""
+    def __init__(self, artifact):
+        self._artifact = artifact
+        self._appended = []
+
+    def __len__(self):
+        return self._artifact.chunk_count + len(self._appended)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if 0 <= item < self._artifact.chunk_count:
+            return self._artifact.chunk(item)
+        return self._appended[item - self._artifact.chunk_count]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, passage):
+        self._appended.append(passage)
+
+
+class MappedBM25Index(BM25Index):
+    """BM25 over the artifact's postings; passages added later are indexed in memory as usual"""
+    def __init__(self, artifact):
+        super().__init__()
+        self._artifact = artifact
+        self.passages = _MappedPassages(artifact)
+        self.doc_lengths = array.array("I")
+        self.doc_lengths.frombytes(artifact.section("doc_lengths"))
+        self.total_length = artifact.header["bm25"]["total_length"]
+
+    def _term_postings(self, term):
+        mapped = self._artifact.postings(term)
+        added = self.postings.get(term)
+        if mapped and added:
+            return mapped + added
+        return mapped or added
+
+
+class CorpusArtifact:
+    """A compiled knowledge base, memory-mapped read-only"""
+    def __init__(self, path):
+        if sys.byteorder != "little":
+            raise ValueError("Corpus artifacts can only be mapped on little-endian hosts")
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, format_version, header_length = _PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a corpus artifact")
+        if format_version != FORMAT_VERSION:
+            raise ValueError(f"{path} has format {format_version}, expected {FORMAT_VERSION} (rebuild it)")
+        self.header = json.loads(self._mmap[_PREAMBLE.size:_PREAMBLE.size + header_length])
+        self._data_start = _align(_PREAMBLE.size + header_length)
+        self._view = memoryview(self._mmap)
+
+        self.version = self.header["version"]
+        self.chunk_count = self.header["chunks"]
+        self._context = None
+        self._chunk_text = self.section("chunk_text")
+        self._chunk_bounds = self.section("chunk_bounds").cast("Q")
+        self._chunk_hashes = self.section("chunk_hashes").cast("Q")
+        self._chunk_hash_ids = self.section("chunk_hash_ids").cast("I")
+        self._terms = self.section("terms")
+        self._term_bounds = self.section("term_bounds").cast("Q")
+        self._posting_bounds = self.section("posting_bounds").cast("Q")
+        self._posting_ids = self.section("posting_ids").cast("I")
+        self._posting_tfs = self.section("posting_tfs").cast("I")
+        self._tokenizer_matches = {}
+
+    @property
+    def last_document_id(self):
+        return self.header["last_document_id"]
+
+    @property
+    def document_count(self):
+        return self.header["documents"]
+
+    @property
+    def context(self):
+        """The full context text (decoded once per process; the same object on every access)"""
+        if self._context is None:
+            self._context = str(self.section("context"), "utf-8")
+        return self._context
+
+    def section(self, name):
+        offset, length = self.header["sections"][name]
+        start = self._data_start + offset
+        return self._view[start:start + length]
+
+    def is_current(self, base_md5):
+        """True if the artifact was built from this llm-script.txt content with the current chunking"""
+        chunking = self.header["chunking"]
+        return (self.header["base_md5"] == base_md5
+                and chunking["chars"] == Config.RETRIEVAL_CHUNK_CHARS
+                and chunking["overlap"] == Config.RETRIEVAL_CHUNK_OVERLAP)
+
+    def chunk(self, chunk_id):
+        return str(self._chunk_text[self._chunk_bounds[chunk_id]:self._chunk_bounds[chunk_id + 1]], "utf-8")
+
+    def _term(self, term_id):
+        return str(self._terms[self._term_bounds[term_id]:self._term_bounds[term_id + 1]], "utf-8")
+
+    def postings(self, term):
+        """(passage_id, tf) pairs for a term, or None"""
+        low, high = 0, self.header["bm25"]["terms"]
+        while low < high:
+            middle = (low + high) // 2
+            if self._term(middle) < term:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.header["bm25"]["terms"] or self._term(low) != term:
+            return None
+        start, end = self._posting_bounds[low], self._posting_bounds[low + 1]
+        return list(zip(self._posting_ids[start:end], self._posting_tfs[start:end]))
+
+    def bm25_index(self):
+        return MappedBM25Index(self)
+
+    def encoded_segment(self, text, tokenizer):
+        """
+        Pre-tokenized (input_ids, offsets, word_ids) of a passage segment (the
+        passage separator followed by a chunk), as CachedQAEngine would compute them.
+
+        Returns:
+            tuple or None: None if the text is not a separator-prefixed chunk of this
+            artifact or the artifact was tokenized for a different tokenizer
+        """
+        matches = self._tokenizer_matches.get(id(tokenizer))
+        if matches is None:
+            info = self.header.get("tokenizer")
+            matches = bool(info) and info["name"] == getattr(tokenizer, "name_or_path", None) \
+                and info["size"] == len(tokenizer)
+            self._tokenizer_matches[id(tokenizer)] = matches
+        if not matches or not text.startswith(PASSAGE_SEPARATOR):
+            return None
+
+        chunk = text[len(PASSAGE_SEPARATOR):]
+        digest = chunk_digest(chunk)
+        position = bisect.bisect_left(self._chunk_hashes, digest)
+        while position < len(self._chunk_hashes) and self._chunk_hashes[position] == digest:
+            chunk_id = self._chunk_hash_ids[position]
+            if self.chunk(chunk_id) == chunk:
+                bounds = self.section("token_bounds").cast("Q")
+                start, end = bounds[chunk_id], bounds[chunk_id + 1]
+                spans = self.section("token_spans").cast("i")[2 * start:2 * end].tolist()
+                ids = self.section("token_ids").cast("i")[start:end].tolist()
+                words = [None if word < 0 else word for word in self.section("token_words").cast("i")[start:end]]
+                return ids, list(zip(spans[0::2], spans[1::2])), words
+            position += 1
+        return None
+
+    def dense_index(self):
+        """A DenseIndex over the stored embeddings, or None if there are none for the configured model"""
+        info = self.header.get("embedding")
+        if not info or info["model"] != Config.EMBEDDING_MODEL or info["dtype"] != Config.EMBEDDING_DTYPE:
+            return None
+        from app.services.embedding_service import DenseIndex, np
+
+        offset, _ = self.header["sections"]["vectors"]
+        matrix = np.frombuffer(self._mmap, dtype=np.dtype(info["dtype"]), count=info["rows"] * info["dim"],
+                               offset=self._data_start + offset).reshape(info["rows"], info["dim"])
+        scales = None
+        if "vector_scales" in self.header["sections"]:
+            offset, _ = self.header["sections"]["vector_scales"]
+            scales = np.frombuffer(self._mmap, dtype=np.float32, count=info["rows"], offset=self._data_start + offset)
+        index = DenseIndex()
+        index.attach(matrix, scales, (self.chunk(i) for i in range(self.chunk_count)))
+        return index
+
+
+def open_artifact(path=None):
+    """
+    Map the compiled artifact.
+
+    Returns:
+        CorpusArtifact or None: None when disabled, missing or unreadable
+    """
+    path = path or Config.CORPUS_ARTIFACT_PATH
+    if not Config.CORPUS_ARTIFACT_ENABLED or not os.path.exists(path):
+        return None
+    try:
+        return CorpusArtifact(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring corpus artifact {path}: {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the VirtualClone knowledge base")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Compile llm-script.txt and the knowledge store")
+    build_parser.add_argument("--output", default=None, help="Artifact path (default CORPUS_ARTIFACT_PATH)")
+    build_parser.add_argument("--no-tokens", action="store_true", help="Skip QA pre-tokenization")
+    vectors = build_parser.add_mutually_exclusive_group()
+    vectors.add_argument("--vectors", dest="vectors", action="store_true", default=None,
+                         help="Embed chunks (default: when RETRIEVAL_MODE=dense)")
+    vectors.add_argument("--no-vectors", dest="vectors", action="store_false")
+    info_parser = subparsers.add_parser("info", help="Show an artifact's header")
+    info_parser.add_argument("path", nargs="?", default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.command == "build":
+        header = build_artifact(args.output, with_tokens=not args.no_tokens, with_vectors=args.vectors)
+    else:
+        header = CorpusArtifact(args.path or Config.CORPUS_ARTIFACT_PATH).header
+    print(json.dumps({key: value for key, value in header.items() if key != "sections"}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+"""
+Indexed knowledge store.
+
+Uploaded transcripts and PDF texts live in an SQLite database (WAL mode) with
+their source, type, timestamp and a content hash for dedupe. Writes from all
+threads of a process go through one writer thread that commits them in
+groups. Readers stream
+documents by id, so the context loader can fetch just the new ones.
+
+    python -m app.services.document_store stats
+    python -m app.services.document_store export data/train.jsonl
+    python -m app.services.document_store import old-train.jsonl
+"""
+import os
+import sys
+import json
+import time
+import queue
+import sqlite3
+import hashlib
+import argparse
+import threading
+import logging
+from concurrent.futures import Future
+from app.config import Config
+from app.services.text_utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS documents ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " content_hash TEXT NOT NULL UNIQUE,"
+    " source TEXT,"
+    " type TEXT,"
+    " created REAL NOT NULL,"
+    " chars INTEGER NOT NULL,"
+    " text TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS documents_type_created ON documents (type, created)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+)
+
+
+def content_hash(text):
+    """SHA-256 of the whitespace-normalized text, used to skip duplicate documents"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class DocumentStore:
+    """SQLite document store with a group-commit writer thread"""
+    def __init__(self, path=None, batch_size=None, commit_wait_ms=None):
+        self.path = path or Config.DOCUMENT_STORE_PATH
+        self.batch_size = batch_size or Config.DOCUMENT_STORE_BATCH_SIZE
+        self.commit_wait = (Config.DOCUMENT_STORE_COMMIT_WAIT_MS if commit_wait_ms is None else commit_wait_ms) / 1000.0
+        self._local = threading.local()
+        self._writer_lock = threading.Lock()
+        self._queue = None
+        self._writer = None
+        self._writer_pid = None
+        self._initialized_pid = None
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _connection(self):
+        """One reader connection per thread (and per process, connections must not cross fork())"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            if self._initialized_pid != os.getpid():
+                self._initialize(conn)
+                self._initialized_pid = os.getpid()
+        return conn
+
+    def _initialize(self, conn):
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        self._migrate_legacy_jsonl(conn)
+
+    def _migrate_legacy_jsonl(self, conn):
+        """Import data/train.jsonl once, the first time any process opens the store"""
+        legacy = Config.LEGACY_TRANSCRIPTS_PATH
+        if not legacy or not os.path.exists(legacy):
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_jsonl_imported'").fetchone():
+                conn.rollback()
+                return
+            imported = self._insert_many(conn, iter_jsonl(legacy))
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('legacy_jsonl_imported', ?)",
+                (json.dumps({"path": legacy, "documents": imported, "at": time.time()}),),
+            )
+            conn.commit()
+            logger.info(f"Imported {imported} document(s) from {legacy} into {self.path}")
+        except Exception:
+            conn.rollback()
+            raise
+
+    @staticmethod
+    def _insert_many(conn, records):
+        """Insert records, skipping duplicates; returns how many were new"""
+        inserted = 0
+        for record in records:
+            inserted += DocumentStore._insert(conn, record)[1]
+        return inserted
+
+    @staticmethod
+    def _insert(conn, record):
+        text = record["text"].strip()
+        digest = content_hash(text)
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO documents (content_hash, source, type, created, chars, text) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (digest, record.get("source"), record.get("type"), record.get("created") or time.time(), len(text), text),
+        )
+        if cursor.rowcount == 0:
+            row = conn.execute("SELECT id FROM documents WHERE content_hash = ?", (digest,)).fetchone()
+            return row[0], False
+        return cursor.lastrowid, True
+
+    def _ensure_writer(self):
+        # The writer thread and its queue do not survive fork()
+        if self._writer_pid != os.getpid():
+            with self._writer_lock:
+                if self._writer_pid != os.getpid():
+                    self._queue = queue.Queue()
+                    self._writer = threading.Thread(target=self._write_loop, name="document-store-writer", daemon=True)
+                    self._writer.start()
+                    self._writer_pid = os.getpid()
+
+    def _fail_writer(self, error):
+        """The writer could not open the store: let the next add() start a new one and fail the waiting ones"""
+        with self._writer_lock:
+            pending = self._queue
+            if self._writer is threading.current_thread():
+                self._writer_pid = None
+                self._writer = None
+        while True:
+            try:
+                _, future = pending.get_nowait()
+            except queue.Empty:
+                break
+            future.set_exception(error)
+
+    def _write_loop(self):
+        try:
+            conn = self._connect()
+            if self._initialized_pid != os.getpid():
+                self._initialize(conn)
+                self._initialized_pid = os.getpid()
+        except Exception as e:
+            logger.error(f"Could not open the document store {self.path}: {e}")
+            self._fail_writer(e)
+            return
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.commit_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            results = []
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for record, _ in batch:
+                    # A savepoint per record, so a bad record only fails its own upload
+                    conn.execute("SAVEPOINT record")
+                    try:
+                        results.append(self._insert(conn, record))
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO SAVEPOINT record")
+                        logger.error(f"Document store write failed for {record.get('source')}: {e}")
+                        results.append(e)
+                    conn.execute("RELEASE SAVEPOINT record")
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Document store commit failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def add(self, text, source=None, doc_type=None, created=None, timeout=None):
+        """
+        Store a document (ignored if an identical text is already stored).
+
+        Concurrent calls are committed together by the writer thread.
+
+        Args:
+            text: Document text
+            source: Original file name or URL
+            doc_type: 'transcript', 'pdf', ...
+            created: Unix timestamp (defaults to now)
+            timeout: Seconds to wait for the commit (defaults to DOCUMENT_STORE_WRITE_TIMEOUT)
+
+        Returns:
+            tuple: (document id, True if it was new)
+
+        Raises:
+            TimeoutError: If the write was not committed within the timeout
+        """
+        if not text or not text.strip():
+            raise ValueError("Cannot store an empty document")
+        self._ensure_writer()
+        future = Future()
+        self._queue.put(({"text": text, "source": source, "type": doc_type, "created": created}, future))
+        return future.result(timeout=Config.DOCUMENT_STORE_WRITE_TIMEOUT if timeout is None else timeout)
+
+    def max_document_id(self):
+        """Id of the newest document (0 if empty); an indexed lookup, cheap enough for every request"""
+        row = self._connection().execute("SELECT MAX(id) FROM documents").fetchone()
+        return row[0] or 0
+
+    def iter_documents(self, after_id=0, batch_size=500):
+        """
+        Stream documents in insertion order without loading them all at once.
+
+        Args:
+            after_id: Only documents with a larger id
+            batch_size: Rows fetched per query
+
+        Yields:
+            dict: id, text, source, type, created
+        """
+        conn = self._connection()
+        last_id = after_id
+        while True:
+            rows = conn.execute(
+                "SELECT id, text, source, type, created FROM documents WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield {"id": row[0], "text": row[1], "source": row[2], "type": row[3], "created": row[4]}
+            last_id = rows[-1][0]
+
+    def stats(self):
+        conn = self._connection()
+        documents, chars = conn.execute("SELECT COUNT(*), COALESCE(SUM(chars), 0) FROM documents").fetchone()
+        by_type = dict(conn.execute("SELECT COALESCE(type, ''), COUNT(*) FROM documents GROUP BY type").fetchall())
+        return {"documents": documents, "characters": chars, "by_type": by_type}
+
+    def export_jsonl(self, path):
+        """
+        Write every document as a JSON line ({"text", "source", "type", "timestamp"}),
+        the format AITrainingService loads. The file is replaced atomically.
+
+        Returns:
+            int: Number of documents written
+        """
+        from datetime import datetime
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        count = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for document in self.iter_documents():
+                f.write(json.dumps({
+                    "text": document["text"],
+                    "source": document["source"],
+                    "type": document["type"],
+                    "timestamp": datetime.fromtimestamp(document["created"]).isoformat(),
+                }, ensure_ascii=False) + "\n")
+                count += 1
+        os.replace(tmp_path, path)
+        return count
+
+    def import_jsonl(self, path):
+        """Add the documents of a JSONL file (duplicates are skipped); returns how many were new"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            inserted = self._insert_many(conn, iter_jsonl(path))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return inserted
+
+
+def iter_jsonl(path):
+    """Records with a non-empty text from a transcripts JSONL file; malformed lines are skipped"""
+    from datetime import datetime
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line_num, line in enumerate(f, 1):
+            try:
+                data = json.loads(line)
+            except ValueError:
+                if line.strip():
+                    logger.warning(f"Skipping malformed JSON at line {line_num} in {path}")
+                continue
+            if not isinstance(data, dict) or not str(data.get("text", "")).strip():
+                continue
+            created = None
+            if data.get("timestamp"):
+                try:
+                    created = datetime.fromisoformat(data["timestamp"]).timestamp()
+                except (TypeError, ValueError):
+                    pass
+            yield {
+                "text": data["text"],
+                "source": data.get("source"),
+                "type": data.get("type", "transcript"),
+                "created": created,
+            }
+
+
+document_store = DocumentStore()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the VirtualClone document store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Show document counts")
+    export_parser = subparsers.add_parser("export", help="Write all documents to a JSONL file")
+    export_parser.add_argument("path", nargs="?", default=Config.LEGACY_TRANSCRIPTS_PATH)
+    import_parser = subparsers.add_parser("import", help="Add the documents of a JSONL file")
+    import_parser.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        print(json.dumps(document_store.stats(), indent=2))
+    elif args.command == "export":
+        print(f"Exported {document_store.export_jsonl(args.path)} document(s) to {args.path}")
+    elif args.command == "import":
+        print(f"Imported {document_store.import_jsonl(args.path)} new document(s) from {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
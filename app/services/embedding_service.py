@@ -0,0 +1,302 @@
+import os
+import glob
+import json
+import uuid
+import hashlib
+import threading
+import logging
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+try:
+    import numpy as np
+    _NUMPY_AVAILABLE = True
+except Exception:
+    np = None
+    _NUMPY_AVAILABLE = False
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Rows scored per block when the matrix is int8, to bound the float32 scratch space
+_SCORE_BLOCK_ROWS = 8192
+
+
+class EmbeddingEncoder:
+    """Sentence embedding model with lazy loading (mean-pooled, L2-normalized)"""
+    def __init__(self, model_id=None, batch_size=None):
+        self.model_id = model_id or Config.EMBEDDING_MODEL
+        self.batch_size = batch_size or Config.EMBEDDING_BATCH_SIZE
+        self._tokenizer = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from transformers import AutoTokenizer, AutoModel
+                    logger.info(f"Loading embedding model {self.model_id}...")
+                    self._tokenizer = AutoTokenizer.from_pretrained(self.model_id)
+                    model = AutoModel.from_pretrained(self.model_id)
+                    model.eval()
+                    self._model = model
+                    logger.info("Embedding model loaded")
+        return self._tokenizer, self._model
+
+    def encode(self, texts):
+        """
+        Embed a list of texts.
+
+        Args:
+            texts: List of strings
+
+        Returns:
+            numpy.ndarray: float32 matrix of shape (len(texts), dim) with unit-length rows
+        """
+        import torch
+
+        tokenizer, model = self._load()
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            encoded = tokenizer(batch, padding=True, truncation=True,
+                                max_length=Config.EMBEDDING_MAX_TOKENS, return_tensors="pt")
+            with torch.no_grad():
+                hidden = model(**encoded).last_hidden_state
+            mask = encoded["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+            batches.append(pooled.float().cpu().numpy())
+        return np.ascontiguousarray(np.vstack(batches), dtype=np.float32)
+
+
+def quantize_int8(vectors):
+    """
+    Symmetric per-row int8 quantization.
+
+    Args:
+        vectors: float32 matrix
+
+    Returns:
+        tuple: (int8 matrix, float32 per-row scales)
+    """
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+class DenseIndex:
+    """
+    Passage embeddings stored as a memory-mapped matrix on disk.
+
+    Rows live in an append-only file: a new corpus version appends its new rows
+    and writes a small manifest naming the file and its row count, so workers
+    still mapping an earlier version keep reading valid bytes. The manifests of
+    the last EMBEDDING_KEEP_VERSIONS versions are kept.
+    """
+    def __init__(self, encoder=None, index_dir=None, dtype=None):
+        if not _NUMPY_AVAILABLE:
+            raise RuntimeError("numpy is not installed; dense retrieval is unavailable.")
+        self.encoder = encoder or EmbeddingEncoder()
+        self.index_dir = index_dir or Config.INDEX_DIR
+        self.dtype = (dtype or Config.EMBEDDING_DTYPE).lower()
+        if self.dtype not in ("float32", "int8"):
+            raise ValueError(f"Unsupported embedding dtype: {self.dtype}")
+        self.matrix = None
+        self.scales = None
+        self._count = 0
+        self._rows_path = None
+        self._scales_path = None
+        # Fingerprint of everything that determines the matrix contents
+        self._digest = hashlib.sha1(
+            f"{self.encoder.model_id}|{self.dtype}|{Config.RETRIEVAL_CHUNK_CHARS}|"
+            f"{Config.RETRIEVAL_CHUNK_OVERLAP}".encode()
+        )
+
+    def __len__(self):
+        return self._count
+
+    def _prefix(self):
+        model_name = self.encoder.model_id.replace("/", "--")
+        return os.path.join(self.index_dir, f"embeddings-{model_name}-{self.dtype}")
+
+    def _manifest_path(self):
+        return f"{self._prefix()}-{self._digest.hexdigest()[:16]}.json"
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialize writers across worker processes (readers never lock)"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(f"{self._prefix()}.lock", "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _map(self, manifest):
+        """Map the first manifest['count'] rows of the manifest's data files"""
+        count, dim = manifest["count"], manifest["dim"]
+        rows_path = os.path.join(self.index_dir, manifest["rows"])
+        self.matrix = np.memmap(rows_path, dtype=np.dtype(self.dtype), mode="r", shape=(count, dim))
+        self._rows_path = rows_path
+        if self.dtype == "int8":
+            self._scales_path = os.path.join(self.index_dir, manifest["scales"])
+            self.scales = np.memmap(self._scales_path, dtype=np.float32, mode="r", shape=(count,))
+        else:
+            self._scales_path, self.scales = None, None
+        self._count = count
+
+    def _append(self, vectors, scales):
+        """
+        Write rows after the currently mapped ones.
+
+        Appends in place when this index's data file still ends at its last
+        mapped row; otherwise (no file yet, a matrix attached from an artifact,
+        or another writer appended to the file since) starts a new data file.
+
+        Returns:
+            tuple: (rows file name, scales file name or None)
+        """
+        row_bytes = vectors.shape[1] * np.dtype(self.dtype).itemsize
+        rows_path, scales_path = self._rows_path, self._scales_path
+        in_place = (rows_path is not None and os.path.exists(rows_path)
+                    and os.path.getsize(rows_path) == self._count * row_bytes
+                    and (scales_path is None or os.path.getsize(scales_path) == self._count * 4))
+        if not in_place:
+            base = f"{self._prefix()}-{uuid.uuid4().hex[:12]}"
+            rows_path = f"{base}.rows"
+            scales_path = f"{base}.scales" if scales is not None else None
+            if self._count:
+                vectors = np.concatenate([np.asarray(self.matrix), vectors])
+                if scales is not None:
+                    scales = np.concatenate([np.asarray(self.scales), scales])
+
+        for path, array in ((rows_path, vectors), (scales_path, scales)):
+            if path is not None:
+                with open(path, "ab") as f:
+                    f.write(np.ascontiguousarray(array).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+        return os.path.basename(rows_path), os.path.basename(scales_path) if scales_path else None
+
+    def _write_manifest(self, path, manifest):
+        """Write atomically so concurrent workers never read a partial manifest"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+    def _prune(self):
+        """Drop all but the newest EMBEDDING_KEEP_VERSIONS manifests and the data files only they used"""
+        manifests = sorted(glob.glob(f"{self._prefix()}-*.json"), key=os.path.getmtime, reverse=True)
+        keep = max(1, Config.EMBEDDING_KEEP_VERSIONS)
+        for stale in manifests[keep:]:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+        referenced = set()
+        for path in manifests[:keep]:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                continue
+            referenced.update(name for name in (manifest.get("rows"), manifest.get("scales")) if name)
+        # Mapped copies of a removed file stay valid until unmapped
+        for pattern in ("rows", "scales"):
+            for data_path in glob.glob(f"{self._prefix()}-*.{pattern}"):
+                if os.path.basename(data_path) not in referenced:
+                    try:
+                        os.remove(data_path)
+                    except OSError:
+                        pass
+
+    def attach(self, matrix, scales, passages):
+        """
+        Use an already computed (e.g. memory-mapped) embedding matrix.
+
+        Args:
+            matrix: Embeddings of the passages, in this index's dtype
+            scales: Per-row scales for int8 matrices, else None
+            passages: Iterable of the passage strings the rows belong to
+        """
+        for passage in passages:
+            self._digest.update(passage.encode("utf-8"))
+            self._digest.update(b"\0")
+        self.matrix = matrix
+        self.scales = scales
+        self._count = matrix.shape[0]
+        self._rows_path = self._scales_path = None
+
+    def add_passages(self, passages):
+        """
+        Embed and append passages, reusing a matrix already persisted for the same corpus.
+
+        Args:
+            passages: List of passage strings
+        """
+        if not passages:
+            return
+        for passage in passages:
+            self._digest.update(passage.encode("utf-8"))
+            self._digest.update(b"\0")
+
+        manifest_path = self._manifest_path()
+        with self._file_lock():
+            # Another worker may have embedded this corpus version while we waited
+            if os.path.exists(manifest_path):
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    self._map(json.load(f))
+                logger.info(f"Mapped embedding matrix {manifest_path} ({self._count} passages)")
+                return
+
+            vectors = self.encoder.encode(passages)
+            scales = None
+            if self.dtype == "int8":
+                vectors, scales = quantize_int8(vectors)
+            rows_name, scales_name = self._append(vectors, scales)
+            manifest = {"rows": rows_name, "scales": scales_name,
+                        "count": self._count + len(passages), "dim": int(vectors.shape[1])}
+            self._write_manifest(manifest_path, manifest)
+            self._map(manifest)
+            self._prune()
+        logger.info(f"Embedded {len(passages)} passage(s) into {manifest['rows']} ({self._count} total)")
+
+    def _scores(self, query_vector):
+        if self.dtype == "float32":
+            return self.matrix @ query_vector
+        scores = np.empty(self._count, dtype=np.float32)
+        for start in range(0, self._count, _SCORE_BLOCK_ROWS):
+            block = self.matrix[start:start + _SCORE_BLOCK_ROWS].astype(np.float32)
+            scores[start:start + len(block)] = block @ query_vector
+        return scores * self.scales
+
+    def search(self, query, top_k=None):
+        """
+        Score passages by cosine similarity to the query.
+
+        Args:
+            query: The query string
+            top_k: Maximum number of results
+
+        Returns:
+            list: (passage_id, score) tuples, best first
+        """
+        top_k = top_k or Config.RETRIEVAL_TOP_K
+        if self._count == 0:
+            return []
+
+        scores = self._scores(self.encoder.encode([query])[0])
+        top_k = min(top_k, self._count)
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        ranked = candidates[np.argsort(-scores[candidates])]
+        return [(int(i), float(scores[i])) for i in ranked]
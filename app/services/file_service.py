@@ -5,6 +5,7 @@ import uuid
 import subprocess
 import re
 import logging
+from app.services import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +61,7 @@ def save_file(file):
 
     return unique_filename
 
+@metrics.timed_function("download_audio")
 def download_audio_from_url(url):
     """
     Download audio from a video URL (e.g., YouTube).
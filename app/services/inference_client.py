@@ -0,0 +1,189 @@
+import os
+import stat
+import queue
+import secrets
+import hashlib
+import threading
+import logging
+from multiprocessing.connection import Client
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownContextError(Exception):
+    """The inference server does not hold the context version the client referenced"""
+
+
+def _read_authkey_file(path):
+    """Read a key file, refusing one that other users can read"""
+    mode = os.stat(path).st_mode
+    if mode & (stat.S_IRWXG | stat.S_IRWXO):
+        raise RuntimeError(f"{path} is readable by other users; restrict it with chmod 600")
+    with open(path, "r", encoding="utf-8") as f:
+        key = f.read().strip()
+    if not key:
+        raise RuntimeError(f"{path} is empty")
+    return key
+
+
+def inference_authkey(create=False):
+    """
+    The socket's shared secret: INFERENCE_AUTHKEY, else the key in INFERENCE_AUTHKEY_FILE.
+
+    There is deliberately no built-in default, since anyone who knows the key
+    can make the server unpickle arbitrary objects.
+
+    Args:
+        create: Generate a random key into the file (mode 0600) if there is none (server side)
+
+    Returns:
+        bytes: The key
+
+    Raises:
+        RuntimeError: If no key is configured and none can be read (or created)
+    """
+    if Config.INFERENCE_AUTHKEY:
+        return Config.INFERENCE_AUTHKEY.encode("utf-8")
+
+    path = Config.INFERENCE_AUTHKEY_FILE
+    if create and not os.path.exists(path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass  # created concurrently; read it below
+        else:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(secrets.token_hex(32))
+            logger.info(f"Generated inference authkey in {path}")
+    try:
+        return _read_authkey_file(path).encode("utf-8")
+    except FileNotFoundError:
+        raise RuntimeError(
+            f"No inference authkey: set INFERENCE_AUTHKEY, or start the inference server so it creates {path}"
+        ) from None
+
+
+class InferenceClient:
+    """Client for the inference server, with a pool of reusable socket connections"""
+    def __init__(self, address=None, authkey=None):
+        self.address = address or Config.INFERENCE_SOCKET
+        self.authkey = authkey.encode("utf-8") if authkey else inference_authkey()
+        self._idle = queue.LifoQueue()
+        self._pid = os.getpid()
+
+    def _acquire(self):
+        if self._pid != os.getpid():
+            # Connections must not be shared with a forked parent
+            self._idle = queue.LifoQueue()
+            self._pid = os.getpid()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return Client(self.address, family="AF_UNIX", authkey=self.authkey)
+
+    def call(self, method, *args, timeout=None):
+        """
+        Run a method on the inference server.
+
+        Args:
+            method: Server method name
+            *args: Positional arguments (must be picklable)
+            timeout: Seconds to wait for the reply
+
+        Returns:
+            The method's return value
+
+        Raises:
+            TimeoutError: If the server does not reply in time
+            UnknownContextError: If the server needs the full context text
+            RuntimeError: If the server reports an error
+        """
+        conn = self._acquire()
+        try:
+            conn.send((method, args))
+            if not conn.poll(timeout):
+                raise TimeoutError(f"Inference server did not answer '{method}' within {timeout}s")
+            status, value = conn.recv()
+        except BaseException:
+            # A half-finished exchange leaves the connection out of sync
+            conn.close()
+            raise
+        self._idle.put(conn)
+
+        if status == "unknown_context":
+            raise UnknownContextError(value)
+        if status == "error":
+            raise RuntimeError(f"Inference server error in '{method}': {value}")
+        return value
+
+
+_client = None
+_client_lock = threading.Lock()
+_context_version = (None, None)
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = InferenceClient()
+    return _client
+
+
+def _version_of(context):
+    """MD5 of the context, memoized for the current context object"""
+    global _context_version
+    cached_context, version = _context_version
+    if context is not cached_context:
+        version = hashlib.md5((context or "").encode("utf-8")).hexdigest()
+        _context_version = (context, version)
+    return version
+
+
+def remote_ping():
+    """
+    The inference server's pid and model states.
+
+    Returns:
+        dict or None: {'pid', 'models'}, or None if the server cannot be reached
+    """
+    try:
+        return get_client().call("ping", timeout=Config.INFERENCE_PING_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Inference server unreachable: {e}")
+        return None
+
+
+def remote_translate(text, src_lang, tgt_lang):
+    try:
+        return get_client().call("translate", text, src_lang, tgt_lang, timeout=Config.INFERENCE_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Remote translation error: {e}")
+        return text  # Return original text on error
+
+
+def remote_answer_question_with_context(question, context, conversation_history=None):
+    """Answer on the inference server; the context text is only sent when the server lacks that version"""
+    client = get_client()
+    version = _version_of(context)
+    history = list(conversation_history or [])
+    try:
+        try:
+            return client.call("answer", question, version, None, history, timeout=Config.INFERENCE_TIMEOUT)
+        except UnknownContextError:
+            return client.call("answer", question, version, context, history, timeout=Config.INFERENCE_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Remote QA error: {e}")
+        return "I apologize, but I'm having trouble processing your question right now."
+
+
+def remote_transcribe(audio_path, mode=None, detailed=False):
+    try:
+        return get_client().call("transcribe", os.path.abspath(audio_path), mode, detailed,
+                                 timeout=Config.INFERENCE_TRANSCRIBE_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Remote transcription error: {e}")
+        return None
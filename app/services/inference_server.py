@@ -0,0 +1,121 @@
+"""
+Out-of-process inference server.
+
+Owns the QA, translation and Whisper models and serves them to every web
+worker over a Unix socket. Start it with:
+    python -m app.services.inference_server
+and run the web app with INFERENCE_MODE=remote.
+"""
+import os
+import argparse
+import threading
+import logging
+from multiprocessing.connection import Listener
+from multiprocessing import AuthenticationError
+from app.config import Config
+from app.services.cache import LRUCache
+from app.services.inference_client import UnknownContextError, inference_authkey
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceServer:
+    """Serves model calls from web workers, one thread per client connection"""
+    def __init__(self, address=None, authkey=None):
+        self.address = address or Config.INFERENCE_SOCKET
+        self.authkey = authkey.encode("utf-8") if authkey else inference_authkey(create=True)
+        self._contexts = LRUCache(maxsize=4)
+        self._contexts_lock = threading.Lock()
+        self.handlers = {
+            "ping": self._ping,
+            "translate": self._translate,
+            "answer": self._answer,
+            "transcribe": self._transcribe,
+        }
+
+    def _ping(self):
+        from app.services import model_status
+        return {"pid": os.getpid(), "models": model_status.snapshot()}
+
+    def _translate(self, text, src_lang, tgt_lang):
+        from app.services.ai_service import ai_service
+        return ai_service.translate(text, src_lang, tgt_lang)
+
+    def _answer(self, question, context_version, context, conversation_history):
+        from app.services.ai_service import ai_service
+        with self._contexts_lock:
+            if context is not None:
+                self._contexts[context_version] = context
+            else:
+                context = self._contexts.get(context_version)
+        if context is None:
+            raise UnknownContextError(context_version)
+        return ai_service.answer_question_with_context(question, context, conversation_history)
+
+    def _transcribe(self, audio_path, mode=None, detailed=False):
+        from app.services.transcribe_service import transcribe_audio, transcribe_with_stats
+        if detailed:
+            return transcribe_with_stats(audio_path, mode=mode)
+        return transcribe_audio(audio_path, mode=mode)
+
+    def _serve_connection(self, conn):
+        try:
+            while True:
+                method, args = conn.recv()
+                handler = self.handlers.get(method)
+                try:
+                    if handler is None:
+                        raise ValueError(f"Unknown method: {method}")
+                    result = handler(*args)
+                except UnknownContextError as e:
+                    conn.send(("unknown_context", str(e)))
+                    continue
+                except Exception as e:
+                    logger.error(f"Inference '{method}' failed: {e}", exc_info=True)
+                    conn.send(("error", str(e)))
+                    continue
+                conn.send(("ok", result))
+        except (EOFError, OSError):
+            pass  # client went away
+        finally:
+            conn.close()
+
+    def serve_forever(self):
+        """Accept client connections until the process is stopped"""
+        if os.path.exists(self.address):
+            os.remove(self.address)  # stale socket from a previous run
+        os.makedirs(os.path.dirname(os.path.abspath(self.address)), exist_ok=True)
+
+        with Listener(self.address, family="AF_UNIX", authkey=self.authkey) as listener:
+            os.chmod(self.address, 0o660)
+            logger.info(f"Inference server {os.getpid()} listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except AuthenticationError:
+                    logger.warning("Rejected inference client with a bad authkey")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the VirtualClone inference server")
+    parser.add_argument("--socket", default=None, help="Unix socket path (default: INFERENCE_SOCKET)")
+    parser.add_argument("--no-preload", action="store_true", help="Load models on first use instead of at startup")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO),
+                        format='[%(asctime)s] %(levelname)s in %(module)s: %(message)s')
+
+    # This process is the model owner: always run inference locally
+    Config.INFERENCE_MODE = "local"
+
+    if not args.no_preload:
+        from app.services.preload_service import preload_models
+        preload_models(Config.PRELOAD_MODEL_NAMES)
+
+    InferenceServer(address=args.socket).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
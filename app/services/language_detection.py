@@ -0,0 +1,112 @@
+import threading
+import logging
+from app.config import Config
+from app.services.cache import LRUCache
+from app.services.text_utils import normalize_text
+
+try:
+    from langdetect import DetectorFactory, detect_langs, LangDetectException
+    DetectorFactory.seed = 0  # langdetect is randomized; make results repeatable
+    _LANGDETECT_AVAILABLE = True
+except Exception:
+    detect_langs = None
+    LangDetectException = Exception
+    _LANGDETECT_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# langdetect (ISO 639-1) codes -> NLLB codes used by the translation model
+ISO_TO_NLLB = {
+    "af": "afr_Latn", "ar": "arb_Arab", "bg": "bul_Cyrl", "bn": "ben_Beng", "ca": "cat_Latn",
+    "cs": "ces_Latn", "cy": "cym_Latn", "da": "dan_Latn", "de": "deu_Latn", "el": "ell_Grek",
+    "en": "eng_Latn", "es": "spa_Latn", "et": "est_Latn", "fa": "pes_Arab", "fi": "fin_Latn",
+    "fr": "fra_Latn", "gu": "guj_Gujr", "he": "heb_Hebr", "hi": "hin_Deva", "hr": "hrv_Latn",
+    "hu": "hun_Latn", "id": "ind_Latn", "it": "ita_Latn", "ja": "jpn_Jpan", "kn": "kan_Knda",
+    "ko": "kor_Hang", "lt": "lit_Latn", "lv": "lvs_Latn", "mk": "mkd_Cyrl", "ml": "mal_Mlym",
+    "mr": "mar_Deva", "ne": "npi_Deva", "nl": "nld_Latn", "no": "nob_Latn", "pa": "pan_Guru",
+    "pl": "pol_Latn", "pt": "por_Latn", "ro": "ron_Latn", "ru": "rus_Cyrl", "sk": "slk_Latn",
+    "sl": "slv_Latn", "so": "som_Latn", "sq": "als_Latn", "sv": "swe_Latn", "sw": "swh_Latn",
+    "ta": "tam_Taml", "te": "tel_Telu", "th": "tha_Thai", "tl": "tgl_Latn", "tr": "tur_Latn",
+    "uk": "ukr_Cyrl", "ur": "urd_Arab", "vi": "vie_Latn", "zh-cn": "zho_Hans", "zh-tw": "zho_Hant",
+}
+
+ENGLISH = "eng_Latn"
+
+_cache = LRUCache(maxsize=Config.LANGUAGE_DETECTION_CACHE_SIZE)
+_cache_lock = threading.Lock()
+_warned = False
+
+
+def detect_language(text):
+    """
+    Identify the language of a chat message.
+
+    Results are cached by normalized text. Messages shorter than
+    LANGUAGE_DETECTION_MIN_CHARS are not classified (too unreliable).
+
+    Args:
+        text: Message text
+
+    Returns:
+        tuple: (NLLB language code or None, probability)
+    """
+    global _warned
+    if not _LANGDETECT_AVAILABLE:
+        if not _warned:
+            logger.warning("langdetect is not installed; language detection is disabled")
+            _warned = True
+        return None, 0.0
+
+    normalized = normalize_text(text)
+    if len(normalized) < Config.LANGUAGE_DETECTION_MIN_CHARS:
+        return None, 0.0
+
+    with _cache_lock:
+        cached = _cache.get(normalized)
+        if cached is not None:
+            _cache.move_to_end(normalized)
+            return cached
+
+    try:
+        best = detect_langs(normalized)[0]
+        result = (ISO_TO_NLLB.get(best.lang), round(best.prob, 4))
+    except LangDetectException:
+        result = (None, 0.0)
+
+    with _cache_lock:
+        _cache[normalized] = result
+    return result
+
+
+def resolve_languages(text, session_language):
+    """
+    Pick the source and target language for a chat turn.
+
+    English detected with LANGUAGE_DETECTION_MIN_CONFIDENCE skips the inbound
+    translation. With LANGUAGE_AUTO_TARGET, a confidently detected language
+    is also used as the source and as the language of the reply.
+
+    Args:
+        text: The user's message
+        session_language: Language selected in the UI / request
+
+    Returns:
+        tuple: (src_lang, tgt_lang, detected_lang or None)
+    """
+    if not Config.LANGUAGE_DETECTION_ENABLED:
+        return session_language, session_language, None
+    if session_language == ENGLISH and not Config.LANGUAGE_AUTO_TARGET:
+        return ENGLISH, ENGLISH, None  # nothing to translate either way
+
+    detected, probability = detect_language(text)
+    if probability < Config.LANGUAGE_DETECTION_MIN_CONFIDENCE:
+        detected = None
+
+    if detected == ENGLISH:
+        src_lang = ENGLISH
+    elif detected is not None and Config.LANGUAGE_AUTO_TARGET:
+        src_lang = detected
+    else:
+        src_lang = session_language
+    tgt_lang = detected if (detected is not None and Config.LANGUAGE_AUTO_TARGET) else session_language
+    return src_lang, tgt_lang, detected
@@ -0,0 +1,297 @@
+import os
+import time
+import bisect
+import threading
+import functools
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from cache hits up to long transcriptions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, *extra):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    pairs.extend(label for label in extra if label)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self, const_labels=""):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value, const_labels))
+        return lines
+
+    def _render_sample(self, key, value, const_labels=""):
+        return [f"{self.name}{_format_labels(self.labelnames, key, const_labels)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Cumulative bucketed distribution with sum and count"""
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_sample(self, key, state, const_labels=""):
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = f'le="{_format_value(float(bound))}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, const_labels, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, key, const_labels)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """
+    Holds metrics and scrape-time collectors, and renders the Prometheus text format.
+
+    Values live in the process that recorded them, so every sample carries a
+    worker="<pid>" label: behind the preforking server, successive scrapes
+    through one port reach different workers, and the label keeps each
+    worker's counters a separate series (aggregate with sum by (...) over rate()).
+    """
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """
+        Add a function called at scrape time.
+
+        The function returns metrics (typically fresh Gauge/Counter objects)
+        whose values are read from the service's own state.
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def reset(self):
+        """Drop every recorded value"""
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            metric.reset()
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        # Read per scrape: forked workers inherit the registry but not the pid
+        worker = f'worker="{os.getpid()}"'
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render(worker))
+        for collector in collectors:
+            try:
+                for metric in collector():
+                    lines.extend(metric.render(worker))
+            except Exception as e:
+                lines.append(f"# collector {getattr(collector, '__name__', collector)} failed: {_escape(e)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "virtualclone_stage_seconds", "Time spent in each processing stage", ("stage",)))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "virtualclone_http_request_seconds", "HTTP request latency by endpoint", ("endpoint", "method")))
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "virtualclone_http_requests_total", "HTTP requests by endpoint and status", ("endpoint", "method", "status")))
+TRANSLATIONS_SKIPPED = REGISTRY.register(Counter(
+    "virtualclone_translations_skipped_total", "Translation calls avoided by language detection", ("leg",)))
+WHISPER_REAL_TIME_FACTOR = REGISTRY.register(Histogram(
+    "virtualclone_whisper_real_time_factor", "Transcription time divided by audio duration", ("mode",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0)))
+
+# A forked worker would otherwise report the master's samples again under its own worker label
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=REGISTRY.reset)
+
+
+_trace = threading.local()
+
+
+def begin_trace():
+    """Start collecting stage timings and notes for the current thread's request"""
+    _trace.current = {"stages": {}, "notes": {}}
+
+
+def end_trace():
+    """
+    Stop collecting for the current thread.
+
+    Returns:
+        dict: {'stages': {stage: seconds}, 'notes': {key: value}}
+    """
+    trace = getattr(_trace, "current", None)
+    _trace.current = None
+    return trace or {"stages": {}, "notes": {}}
+
+
+def annotate(key, value):
+    """Attach a note (e.g. a cache outcome) to the current thread's trace, if one is active"""
+    trace = getattr(_trace, "current", None)
+    if trace is not None:
+        trace["notes"][key] = value
+
+
+@contextmanager
+def timed(stage):
+    """Observe the duration of a block under virtualclone_stage_seconds{stage=...}"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        trace = getattr(_trace, "current", None)
+        if trace is not None:
+            trace["stages"][stage] = trace["stages"].get(stage, 0.0) + elapsed
+
+
+def timed_function(stage):
+    """Decorator form of timed()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _collect_service_state():
+    """Model load state, cache effectiveness and queue depths, read at scrape time"""
+    from app.services import model_status
+    from app.services.ai_service import ai_service
+
+    model_ready = Gauge("virtualclone_model_ready", "1 when the model is loaded", ("model",))
+    model_load = Gauge("virtualclone_model_load_seconds", "Model load duration", ("model",))
+    model_warmup = Gauge("virtualclone_model_warmup_seconds", "Model warm-up forward pass duration", ("model",))
+    for name, entry in model_status.snapshot().items():
+        model_ready.set(1 if entry.get("state") == "ready" else 0, model=name)
+        if "load_seconds" in entry:
+            model_load.set(entry["load_seconds"], model=name)
+        if "warmup_seconds" in entry:
+            model_warmup.set(entry["warmup_seconds"], model=name)
+
+    cache_lookups = Counter("virtualclone_cache_lookups_total", "Cache lookups by outcome", ("cache", "result"))
+    cache_entries = Gauge("virtualclone_cache_entries", "Entries held in memory", ("cache",))
+    stats = ai_service.cache_stats()
+    if "translation" in stats:
+        translation = stats["translation"]
+        cache_lookups.inc(translation["memory_hits"], cache="translation", result="memory_hit")
+        cache_lookups.inc(translation["disk_hits"], cache="translation", result="disk_hit")
+        cache_lookups.inc(translation["misses"], cache="translation", result="miss")
+        cache_entries.set(translation["memory_entries"], cache="translation")
+    if "answer" in stats:
+        answer = stats["answer"]
+        cache_lookups.inc(answer["hits"], cache="answer", result="hit")
+        cache_lookups.inc(answer["misses"], cache="answer", result="miss")
+        cache_entries.set(answer["entries"], cache="answer")
+
+    queue_depth = Gauge("virtualclone_queue_depth", "Requests waiting in a batching queue", ("queue",))
+    for name, batcher in (("qa", ai_service._qa_batcher), ("translation", ai_service._translation_batcher)):
+        if batcher is not None:
+            queue_depth.set(batcher.queue_depth, queue=name)
+
+    return [model_ready, model_load, model_warmup, cache_lookups, cache_entries, queue_depth]
+
+
+def init_app(app):
+    """Time every request and session save, and register the service-state collector"""
+    from flask import request, g
+    from flask.sessions import SecureCookieSessionInterface
+
+    class TimedSessionInterface(SecureCookieSessionInterface):
+        def save_session(self, app, session, response):
+            with timed("session_save"):
+                return super().save_session(app, session, response)
+
+    app.session_interface = TimedSessionInterface()
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop("_metrics_started", None)
+        if started is not None:
+            endpoint = request.endpoint or "unknown"
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+            HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        return response
+
+    REGISTRY.register_collector(_collect_service_state)
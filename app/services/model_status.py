@@ -0,0 +1,81 @@
+import time
+import threading
+
+_lock = threading.Lock()
+_status = {}
+
+
+def mark_loading(name):
+    """Record that a model has started loading (keeping a pending warm-up)"""
+    with _lock:
+        warmup = _status.get(name, {}).get("warmup")
+        _status[name] = {"state": "loading", "started_at": time.time()}
+        if warmup == "pending":
+            _status[name]["warmup"] = warmup
+
+
+def mark_warming(name):
+    """Record that a model will get a warm-up pass; it is not ready until the pass finishes or fails"""
+    with _lock:
+        entry = _status.setdefault(name, {"state": "loading"})
+        entry["warmup"] = "pending"
+
+
+def mark_ready(name, load_seconds, **details):
+    """Record that a model finished loading, with optional extra details (e.g. precision)"""
+    with _lock:
+        entry = _status.setdefault(name, {})
+        entry.update({"state": "ready", "load_seconds": round(load_seconds, 3), "ready_at": time.time()})
+        entry.update(details)
+        entry.pop("error", None)
+
+
+def mark_warm(name, warmup_seconds):
+    """Record that a model completed its warm-up forward pass"""
+    with _lock:
+        entry = _status.setdefault(name, {"state": "ready"})
+        entry["warmup"] = "done"
+        entry["warmup_seconds"] = round(warmup_seconds, 3)
+
+
+def mark_warm_failed(name, error):
+    """Record that a loaded model's warm-up pass failed (the model is still usable)"""
+    with _lock:
+        entry = _status.setdefault(name, {"state": "ready"})
+        entry.update({"warmup": "failed", "warmup_error": str(error)})
+
+
+def mark_failed(name, error):
+    """Record that a model failed to load"""
+    with _lock:
+        entry = _status.setdefault(name, {})
+        entry.update({"state": "failed", "error": str(error)})
+
+
+def snapshot():
+    """
+    Current load state of every model seen so far.
+
+    Returns:
+        dict: Model name -> state dict (state, load_seconds, warmup, warmup_seconds, error)
+    """
+    with _lock:
+        return {name: dict(entry) for name, entry in _status.items()}
+
+
+def _entry_ready(entry):
+    return entry.get("state") == "ready" and entry.get("warmup") != "pending"
+
+
+def is_ready(names, status=None):
+    """
+    True when every named model has loaded and finished (or failed) any pending warm-up.
+
+    Args:
+        names: Model names
+        status: A snapshot() to check (e.g. one reported by the inference server); defaults to this process
+    """
+    if status is not None:
+        return all(_entry_ready(status.get(name, {})) for name in names)
+    with _lock:
+        return all(_entry_ready(_status.get(name, {})) for name in names)
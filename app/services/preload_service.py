@@ -0,0 +1,102 @@
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from app.config import Config
+from app.services import model_status
+
+logger = logging.getLogger(__name__)
+
+
+def _preload_context():
+    from app.routes.main_routes import init_context
+    model_status.mark_loading("context")
+    started = time.perf_counter()
+    init_context()
+    model_status.mark_ready("context", time.perf_counter() - started)
+
+
+def _preload_qa():
+    from app.services.ai_service import ai_service
+    ai_service.warm_up_qa()
+
+
+def _preload_translation():
+    from app.services.ai_service import ai_service
+    ai_service.warm_up_translation()
+
+
+def _preload_whisper():
+    from app.services.transcribe_service import warm_up_model
+    warm_up_model()
+
+
+PRELOADERS = {
+    "context": _preload_context,
+    "qa": _preload_qa,
+    "translation": _preload_translation,
+    "whisper": _preload_whisper,
+}
+
+
+def local_preload_names(names=None):
+    """
+    The preloadable models this process needs.
+
+    With INFERENCE_MODE=remote the models live in the inference server, so a
+    web process only loads the knowledge base.
+    """
+    names = [name for name in (names or Config.PRELOAD_MODEL_NAMES) if name]
+    if Config.INFERENCE_MODE == "remote":
+        return [name for name in names if name == "context"]
+    return names
+
+
+def preload_models(names=None):
+    """
+    Load and warm up models in parallel.
+
+    Args:
+        names: Model names to preload (defaults to Config.PRELOAD_MODEL_NAMES)
+
+    Returns:
+        dict: Model name -> True if it loaded and warmed up, False otherwise
+    """
+    names = [name for name in (names or Config.PRELOAD_MODEL_NAMES) if name]
+    unknown = [name for name in names if name not in PRELOADERS]
+    if unknown:
+        logger.warning(f"Ignoring unknown models in preload list: {unknown}")
+    names = [name for name in names if name in PRELOADERS]
+
+    started = time.perf_counter()
+    logger.info(f"Preloading models: {names}")
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(names)), thread_name_prefix="preload") as executor:
+        futures = {name: executor.submit(PRELOADERS[name]) for name in names}
+        for name, future in futures.items():
+            try:
+                future.result()
+                results[name] = True
+            except Exception as e:
+                logger.error(f"Failed to preload {name} model: {e}")
+                model_status.mark_failed(name, e)
+                results[name] = False
+
+    logger.info(f"Model preload finished in {time.perf_counter() - started:.1f}s: {results}")
+    return results
+
+
+def start_preload(names=None, blocking=False):
+    """
+    Preload models, either inline or on a background thread.
+
+    Args:
+        names: Model names to preload
+        blocking: Wait for the preload to finish before returning
+    """
+    if blocking:
+        preload_models(names)
+        return None
+    thread = threading.Thread(target=preload_models, args=(names,), name="model-preload", daemon=True)
+    thread.start()
+    return thread
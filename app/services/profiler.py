@@ -0,0 +1,250 @@
+"""
+Sampling request profiler.
+
+When enabled, a background thread periodically captures the Python stack of
+every request thread being profiled. Profiles are kept for 1-in-N requests
+and for requests slower than a threshold, and written as JSON (metadata plus
+collapsed stacks, loadable by flamegraph.pl / speedscope) to a rotating
+directory. When disabled no hooks are registered at all.
+"""
+import os
+import sys
+import json
+import time
+import itertools
+import threading
+import logging
+from collections import Counter
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    One sampler thread shared by all profiled requests.
+
+    The thread only runs while at least one request is registered.
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_thread(self):
+        # A sampler thread started before fork() does not exist in the child
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+            self._thread.start()
+
+    def start(self, thread_id):
+        """Begin sampling a thread; returns the Counter its stacks accumulate into"""
+        stacks = Counter()
+        with self._lock:
+            self._active[thread_id] = stacks
+            self._ensure_thread()
+        self._wakeup.set()
+        return stacks
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._active.pop(thread_id, None)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            with self._lock:
+                active = dict(self._active)
+            if not active:
+                self._wakeup.clear()
+                self._wakeup.wait()
+                continue
+
+            frames = sys._current_frames()
+            for thread_id, stacks in active.items():
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own_id:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                stacks[";".join(reversed(labels))] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+class RequestProfiler:
+    """Decides which requests to profile and writes the kept profiles to disk"""
+    def __init__(self, routes=None, sample_rate=None, slow_ms=None, interval_ms=None,
+                 output_dir=None, max_files=None):
+        self.routes = {self._normalize(route) for route in (routes or Config.PROFILER_ROUTES)}
+        self.sample_rate = Config.PROFILER_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.slow_seconds = (Config.PROFILER_SLOW_MS if slow_ms is None else slow_ms) / 1000.0
+        interval_ms = Config.PROFILER_INTERVAL_MS if interval_ms is None else interval_ms
+        self.output_dir = output_dir or Config.PROFILER_DIR
+        self.max_files = Config.PROFILER_MAX_FILES if max_files is None else max_files
+        self.sampler = StackSampler(interval_ms / 1000.0)
+        self._counter = itertools.count(1)
+        self._write_lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(path):
+        return path.rstrip("/") or "/"
+
+    def should_watch(self, path):
+        return self._normalize(path) in self.routes
+
+    def begin(self):
+        """
+        Decide whether the current request is profiled.
+
+        Every watched request is sampled when a slow threshold is set, because
+        slowness is only known at the end; otherwise only 1-in-N are.
+
+        Returns:
+            dict or None: Per-request profiling state
+        """
+        sampled = self.sample_rate > 0 and next(self._counter) % self.sample_rate == 0
+        if not sampled and self.slow_seconds <= 0:
+            return None
+        thread_id = threading.get_ident()
+        return {
+            "thread_id": thread_id,
+            "sampled": sampled,
+            "started": time.perf_counter(),
+            "stacks": self.sampler.start(thread_id),
+        }
+
+    def finish(self, state, metadata):
+        """Stop sampling and write the profile if the request was sampled or slow"""
+        self.sampler.stop(state["thread_id"])
+        duration = time.perf_counter() - state["started"]
+        slow = self.slow_seconds > 0 and duration >= self.slow_seconds
+        if not (state["sampled"] or slow):
+            return None
+
+        profile = dict(metadata)
+        profile.update({
+            "reason": "slow" if slow else "sampled",
+            "duration_ms": round(duration * 1000, 2),
+            "interval_ms": round(self.sampler.interval * 1000, 2),
+            "samples": sum(state["stacks"].values()),
+            "pid": os.getpid(),
+            "timestamp": time.time(),
+            "stacks": dict(state["stacks"].most_common()),
+        })
+        return self._write(profile)
+
+    def _write(self, profile):
+        route = profile.get("route", "").strip("/").replace("/", "_") or "index"
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(profile['timestamp'] * 1000) % 1000:03d}-{route}-{os.getpid()}.json"
+        path = os.path.join(self.output_dir, filename)
+        try:
+            with self._write_lock:
+                os.makedirs(self.output_dir, exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(profile, f)
+                self._rotate()
+        except OSError as e:
+            logger.warning(f"Could not write request profile: {e}")
+            return None
+        logger.info(f"Profiled {profile.get('route')} ({profile['reason']}, {profile['duration_ms']}ms) -> {path}")
+        return path
+
+    def _rotate(self):
+        if self.max_files <= 0:
+            return
+        profiles = sorted(name for name in os.listdir(self.output_dir) if name.endswith(".json"))
+        for name in profiles[:-self.max_files]:
+            try:
+                os.remove(os.path.join(self.output_dir, name))
+            except OSError:
+                pass  # another worker removed it first
+
+
+def _language_pair(g):
+    """
+    Languages a chat request was translated through, as resolved by the route.
+
+    The routes store resolve_languages()'s (src, tgt) on g.language_pair, so a
+    question detected as English shows no inbound leg even in a non-English UI.
+
+    Returns:
+        str or None: The legs through the English pivot, e.g. 'fra_Latn->eng_Latn->fra_Latn',
+            'eng_Latn->fra_Latn' or 'eng_Latn' for no translation; None if languages were not resolved
+    """
+    pair = g.get("language_pair")
+    if not pair:
+        return None
+    src_lang, tgt_lang = pair
+    legs = [src_lang]
+    for language in ("eng_Latn", tgt_lang):
+        if language != legs[-1]:
+            legs.append(language)
+    return "->".join(legs)
+
+
+def _context_chars():
+    # Read what is loaded; profiling a request must not trigger the corpus load itself
+    try:
+        from app.services.context_loader import context_corpus
+        return len(context_corpus.text)
+    except Exception:
+        return None
+
+
+def init_app(app):
+    """Register the profiling hooks; does nothing unless PROFILER_ENABLED is set"""
+    if not Config.PROFILER_ENABLED:
+        return None
+
+    from flask import request, g
+
+    profiler = RequestProfiler()
+    app.extensions["request_profiler"] = profiler
+
+    @app.before_request
+    def _begin_profile():
+        if profiler.should_watch(request.path):
+            state = profiler.begin()
+            if state is not None:
+                g._profile = state
+
+    @app.after_request
+    def _record_status(response):
+        if "_profile" in g:
+            g._profile["status"] = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_profile(exc):
+        state = g.pop("_profile", None)
+        if state is None:
+            return
+        try:
+            profiler.finish(state, {
+                "route": request.path,
+                "endpoint": request.endpoint,
+                "method": request.method,
+                "status": state.get("status", 500 if exc else None),
+                "language_pair": _language_pair(g),
+                "context_chars": _context_chars(),
+            })
+        except Exception as e:
+            logger.warning(f"Request profiling failed: {e}")
+
+    app.logger.info(
+        f"Request profiler enabled: 1-in-{profiler.sample_rate} sampling, "
+        f"slow threshold {profiler.slow_seconds * 1000:.0f}ms, routes {sorted(profiler.routes)}"
+    )
+    return profiler
@@ -0,0 +1,316 @@
+import hashlib
+import threading
+import logging
+from app.config import Config
+from app.services.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Placed in front of every passage but the first, so a passage segment starts with the separator
+PASSAGE_SEPARATOR = "\n\n"
+# Characters on each side of a segment boundary re-tokenized to check that it joins cleanly
+_BOUNDARY_CHARS = 64
+
+
+class CachedQAEngine:
+    """
+    Extractive QA over pre-tokenized context segments.
+
+    Context segments (knowledge-base passages, conversation exchanges) are
+    tokenized once and cached, so a request only tokenizes its question and
+    the segments it has not seen before (typically the newest exchange).
+
+    Answers are the ones the transformers question-answering pipeline gives
+    for the concatenated context with the same max_seq_len and doc_stride:
+    cached segments are only joined where re-tokenizing the boundary gives
+    the same tokens as tokenizing across it (otherwise the two segments are
+    tokenized together), windows follow the tokenizer's stride truncation
+    for the question's length, and spans are scored and widened to whole
+    words the way the pipeline does.
+    """
+    def __init__(self, model, tokenizer, max_seq_len=None, doc_stride=None, batch_size=None, cache_size=None):
+        if not getattr(tokenizer, "is_fast", False):
+            raise ValueError("CachedQAEngine requires a fast tokenizer (offset mappings and word ids)")
+
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_seq_len = max_seq_len or Config.QA_MAX_SEQ_LEN
+        self.doc_stride = Config.QA_DOC_STRIDE if doc_stride is None else doc_stride
+        self.batch_size = batch_size or Config.QA_BATCH_SIZE
+        if self.doc_stride >= self.max_seq_len:
+            raise ValueError("QA_DOC_STRIDE must be smaller than QA_MAX_SEQ_LEN")
+
+        self._num_special = tokenizer.num_special_tokens_to_add(pair=True)
+        # Position of the first context token after a one-token question
+        self._context_offset = tokenizer.build_inputs_with_special_tokens([-2], [-1]).index(-1) - 1
+        self._use_token_types = "token_type_ids" in tokenizer.model_input_names
+
+        self.version = hashlib.md5(
+            f"{getattr(tokenizer, 'name_or_path', '')}|{len(tokenizer)}|{self.max_seq_len}|"
+            f"{self.doc_stride}".encode()
+        ).hexdigest()[:12]
+
+        cache_size = cache_size or Config.QA_ENCODING_CACHE_SIZE
+        self._segments = LRUCache(maxsize=cache_size)
+        self._joins = LRUCache(maxsize=cache_size)
+        self._contexts = LRUCache(maxsize=max(16, cache_size // 8))
+        self._lock = threading.Lock()
+        # Optional provider of pre-tokenized segments (a compiled corpus artifact)
+        self.segment_source = None
+        logger.info(f"QA encoding cache ready (version {self.version})")
+
+    def _lookup(self, cache, key):
+        """Read a cache entry (and refresh its recency) under the lock that guards writes and evictions"""
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def _store(self, cache, key, value):
+        with self._lock:
+            cache[key] = value
+
+    def _tokenize(self, text):
+        tokens = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        return tokens["input_ids"], tokens["offset_mapping"], tokens.word_ids()
+
+    def _encode_segment(self, text):
+        """Return cached (input_ids, offsets, word_ids) for a context segment"""
+        encoded = self._lookup(self._segments, text)
+        if encoded is None:
+            source = self.segment_source
+            if source is not None:
+                encoded = source.encoded_segment(text, self.tokenizer)
+            if encoded is None:
+                encoded = self._tokenize(text)
+            self._store(self._segments, text, encoded)
+        return encoded
+
+    def _joins_cleanly(self, head, tail):
+        """
+        True if tokenizing head and tail separately gives the tokens (and words) of head + tail.
+
+        Pre-tokenization only looks at a few characters around a split, so
+        the text on either side of a segment boundary is enough.
+        """
+        key = (head, tail)
+        clean = self._lookup(self._joins, key)
+        if clean is None:
+            joined = self._tokenize(head + tail)
+            head_ids, head_offsets, head_words = self._tokenize(head)
+            tail_ids, tail_offsets, tail_words = self._tokenize(tail)
+            shift = max((word for word in head_words if word is not None), default=-1) + 1
+            clean = (joined[0] == head_ids + tail_ids
+                     and [tuple(span) for span in joined[1]] == [tuple(span) for span in head_offsets] +
+                     [(start + len(head), end + len(head)) for start, end in tail_offsets]
+                     and list(joined[2]) == list(head_words) +
+                     [None if word is None else word + shift for word in tail_words])
+            self._store(self._joins, key, clean)
+        return clean
+
+    def _context_for(self, segments):
+        """
+        Tokenize (or fetch) the concatenation of context segments.
+
+        Returns:
+            tuple: (context_text, input_ids, offsets, word_spans), where word_spans[i]
+            is the (first, last) token of the word token i belongs to
+        """
+        key = tuple(segments)
+        cached = self._lookup(self._contexts, key)
+        if cached is not None:
+            return cached
+
+        # Merge neighbours whose boundary would be tokenized differently inside the whole text
+        text = "".join(segments)
+        units = []
+        position = 0
+        for segment in segments:
+            if not segment:
+                continue
+            if units and not self._joins_cleanly(text[max(0, position - _BOUNDARY_CHARS):position],
+                                                 text[position:position + _BOUNDARY_CHARS]):
+                units[-1] += segment
+            else:
+                units.append(segment)
+            position += len(segment)
+
+        ids = []
+        offsets = []
+        words = []
+        base = 0
+        next_word = 0
+        for unit in units:
+            unit_ids, unit_offsets, unit_words = self._encode_segment(unit)
+            ids.extend(unit_ids)
+            offsets.extend((start + base, end + base) for start, end in unit_offsets)
+            # Word ids restart in every unit; shift them so words of different units stay apart
+            shifted = [-1 if word is None else word + next_word for word in unit_words]
+            words.extend(shifted)
+            base += len(unit)
+            next_word = max(shifted + [next_word - 1]) + 1
+
+        word_spans = [None] * len(ids)
+        first = 0
+        for index in range(1, len(ids) + 1):
+            if index == len(ids) or words[index] != words[first] or words[first] < 0:
+                for token in range(first, index):
+                    word_spans[token] = (first, index - 1)
+                first = index
+
+        cached = (text, ids, offsets, word_spans)
+        self._store(self._contexts, key, cached)
+        return cached
+
+    def _windows(self, length, question_length):
+        """(start, stop) token ranges of the context windows, as the tokenizer's stride truncation splits them"""
+        window_len = self.max_seq_len - self._num_special - question_length
+        if length <= window_len:
+            return [(0, length)] if length else []
+        if window_len <= self.doc_stride:
+            raise ValueError("Question too long for QA_MAX_SEQ_LEN and QA_DOC_STRIDE")
+        windows = []
+        for start in range(0, length, window_len - self.doc_stride):
+            stop = min(start + window_len, length)
+            windows.append((start, stop))
+            if stop == length:
+                break
+        return windows
+
+    def _forward(self, features):
+        """Run one padded forward pass, returning float32 start/end logits"""
+        import torch
+
+        longest = max(len(feature["input_ids"]) for feature in features)
+        pad_id = self.tokenizer.pad_token_id or 0
+        input_ids = torch.full((len(features), longest), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(features), longest), dtype=torch.long)
+        token_type_ids = torch.zeros((len(features), longest), dtype=torch.long) if self._use_token_types else None
+        for row, feature in enumerate(features):
+            length = len(feature["input_ids"])
+            input_ids[row, :length] = torch.tensor(feature["input_ids"], dtype=torch.long)
+            attention_mask[row, :length] = 1
+            if token_type_ids is not None:
+                token_type_ids[row, :length] = torch.tensor(feature["token_type_ids"], dtype=torch.long)
+
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if token_type_ids is not None:
+            inputs["token_type_ids"] = token_type_ids
+        device = getattr(self.model, "device", None)
+        if device is not None:
+            inputs = {name: tensor.to(device) for name, tensor in inputs.items()}
+
+        with torch.inference_mode():
+            outputs = self.model(**inputs)
+        return outputs.start_logits.float().cpu(), outputs.end_logits.float().cpu()
+
+    @staticmethod
+    def _decode(start_logits, end_logits, feature, top_k, max_answer_len):
+        """Best (score, first_token, last_token) context spans of one window"""
+        n_tokens = feature["stop"] - feature["start"]
+        if n_tokens == 0:
+            return []
+        # Like the pipeline, normalize over the context tokens and the CLS token,
+        # which takes part in the softmax but cannot start an answer
+        cls = feature["cls"]
+        keep = cls + list(range(feature["context_start"], feature["context_start"] + n_tokens))
+        start_probs = start_logits[keep].softmax(dim=-1)[len(cls):]
+        end_probs = end_logits[keep].softmax(dim=-1)[len(cls):]
+
+        scores = start_probs.unsqueeze(1) * end_probs.unsqueeze(0)
+        scores = scores.triu().tril(max_answer_len - 1)
+        values, indices = scores.flatten().topk(min(top_k, n_tokens * n_tokens))
+
+        spans = []
+        for value, index in zip(values.tolist(), indices.tolist()):
+            if value <= 0:
+                break
+            start_token, end_token = divmod(index, n_tokens)
+            spans.append((value, feature["start"] + start_token, feature["start"] + end_token))
+        return spans
+
+    def answer_batch(self, requests):
+        """
+        Answer several questions, sharing padded forward passes across them.
+
+        Args:
+            requests: List of (question, segments, top_k, max_answer_len) tuples;
+                segments are concatenated verbatim to form the context
+
+        Returns:
+            list: For each request, a list of {'answer', 'score', 'start', 'end'}
+                dicts, best first (same shape as the transformers QA pipeline);
+                empty when the context has no answer span
+        """
+        cls_id = self.tokenizer.cls_token_id
+        contexts = []
+        features = []
+        for request_index, (question, segments, top_k, max_answer_len) in enumerate(requests):
+            question_ids = self.tokenizer(question, add_special_tokens=False)["input_ids"]
+            context = self._context_for(segments)
+            contexts.append(context)
+            _, ids, _, _ = context
+
+            for start, stop in self._windows(len(ids), len(question_ids)):
+                window_ids = ids[start:stop]
+                input_ids = self.tokenizer.build_inputs_with_special_tokens(question_ids, window_ids)
+                context_start = len(question_ids) + self._context_offset
+                feature = {
+                    "request": request_index,
+                    "input_ids": input_ids,
+                    "context_start": context_start,
+                    "start": start,
+                    "stop": stop,
+                    "cls": [position for position, token in enumerate(input_ids)
+                            if token == cls_id and not context_start <= position < context_start + len(window_ids)],
+                }
+                if self._use_token_types:
+                    feature["token_type_ids"] = self.tokenizer.create_token_type_ids_from_sequences(
+                        question_ids, window_ids
+                    )
+                features.append(feature)
+
+        candidates = [[] for _ in requests]
+        for batch_start in range(0, len(features), self.batch_size):
+            batch = features[batch_start:batch_start + self.batch_size]
+            start_logits, end_logits = self._forward(batch)
+            for row, feature in enumerate(batch):
+                _, _, top_k, max_answer_len = requests[feature["request"]]
+                candidates[feature["request"]].extend(
+                    (score, first, last, feature["start"], feature["stop"])
+                    for score, first, last in self._decode(start_logits[row], end_logits[row], feature,
+                                                           top_k, max_answer_len)
+                )
+
+        results = []
+        for request_index, spans in enumerate(candidates):
+            top_k = requests[request_index][2]
+            context_text, _, offsets, word_spans = contexts[request_index]
+            answers = []
+            # Spans found in two overlapping windows are kept twice, as the pipeline does
+            for score, first, last, window_start, window_stop in sorted(spans, key=lambda span: span[0], reverse=True):
+                # Widen to whole words, as far as they lie inside the span's window
+                first = max(word_spans[first][0], window_start)
+                last = min(word_spans[last][1], window_stop - 1)
+                start, end = offsets[first][0], offsets[last][1]
+                answers.append({"answer": context_text[start:end], "score": score, "start": start, "end": end})
+                if len(answers) >= top_k:
+                    break
+            results.append(answers)
+        return results
+
+    def answer(self, question, segments, top_k=1, max_answer_len=15):
+        """
+        Answer a single question over the given context segments.
+
+        Args:
+            question: The question string
+            segments: List of context strings, concatenated verbatim
+            top_k: Number of candidate answers
+            max_answer_len: Maximum answer length in tokens
+
+        Returns:
+            list: Candidate answer dicts, best first
+        """
+        return self.answer_batch([(question, segments, top_k, max_answer_len)])[0]
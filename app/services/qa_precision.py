@@ -0,0 +1,146 @@
+import os
+import copy
+import logging
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+PRECISION_MODES = ("fp32", "int8", "bf16", "onnx")
+
+# Fixed question set used to check a reduced-precision model against fp32
+CHECK_QUESTIONS = [
+    ("Who directed The Matrix?",
+     "The Matrix is a 1999 science fiction action film written and directed by the Wachowskis."),
+    ("When was The Matrix released in the United States?",
+     "The film was released in the United States on March 31, 1999, by Warner Bros."),
+    ("Who plays Neo?",
+     "It stars Keanu Reeves as Neo, a computer hacker, alongside Laurence Fishburne and Carrie-Anne Moss."),
+    ("What did the film gross worldwide?",
+     "Made on a budget of $63 million, the film grossed over $460 million worldwide."),
+    ("What is the Matrix?",
+     "Humanity is unknowingly trapped inside the Matrix, a simulated reality created by intelligent machines."),
+    ("Who offers Neo a choice between a red pill and a blue pill?",
+     "Morpheus offers Neo a choice between a red pill, which would reveal the truth, and a blue pill."),
+]
+
+
+def bf16_supported():
+    """True when the CPU has native bfloat16 instructions (AVX512-BF16 or AMX)"""
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def _onnx_pipeline(fp32_pipeline):
+    """Export the QA model to ONNX Runtime (cached under data/models) and wrap it in a pipeline"""
+    from transformers import pipeline
+    from optimum.onnxruntime import ORTModelForQuestionAnswering
+
+    name = Config.AI_MODEL_QA.replace("/", "--")
+    onnx_dir = Config.QA_ONNX_MODEL_DIR or os.path.join(Config.BASE_DIR, "data", "models", f"onnx-{name}")
+    if os.path.exists(os.path.join(onnx_dir, "model.onnx")):
+        model = ORTModelForQuestionAnswering.from_pretrained(onnx_dir)
+    else:
+        logger.info(f"Exporting {Config.AI_MODEL_QA} to ONNX in {onnx_dir}...")
+        model = ORTModelForQuestionAnswering.from_pretrained(Config.AI_MODEL_QA, export=True)
+        model.save_pretrained(onnx_dir)
+    return pipeline("question-answering", model=model, tokenizer=fp32_pipeline.tokenizer)
+
+
+def build_reduced_precision_pipeline(fp32_pipeline, mode):
+    """
+    Create a reduced-precision copy of a CPU QA pipeline.
+
+    Args:
+        fp32_pipeline: The loaded full-precision QA pipeline (left unmodified)
+        mode: One of 'int8', 'bf16', 'onnx'
+
+    Returns:
+        Pipeline: A QA pipeline running the reduced-precision model
+    """
+    import torch
+
+    if mode == "int8":
+        model = torch.ao.quantization.quantize_dynamic(fp32_pipeline.model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif mode == "bf16":
+        if not bf16_supported():
+            raise RuntimeError("CPU has no native bfloat16 support")
+        model = copy.deepcopy(fp32_pipeline.model).to(torch.bfloat16)
+    elif mode == "onnx":
+        return _onnx_pipeline(fp32_pipeline)
+    else:
+        raise ValueError(f"Unknown QA precision mode: {mode}")
+
+    reduced = copy.copy(fp32_pipeline)
+    reduced.model = model
+    return reduced
+
+
+def answer_agreement(reference, candidate, questions=None):
+    """
+    Fraction of check questions where both pipelines give the same answer.
+
+    Args:
+        reference: The fp32 QA pipeline
+        candidate: The reduced-precision QA pipeline
+        questions: List of (question, context) pairs (defaults to CHECK_QUESTIONS)
+
+    Returns:
+        float: Agreement ratio between 0 and 1
+    """
+    questions = questions or CHECK_QUESTIONS
+    matches = 0
+    for question, context in questions:
+        expected = reference(question=question, context=context)["answer"].strip().lower()
+        actual = candidate(question=question, context=context)["answer"].strip().lower()
+        if expected == actual:
+            matches += 1
+        else:
+            logger.info(f"Precision check mismatch for '{question}': fp32='{expected}' reduced='{actual}'")
+    return matches / len(questions)
+
+
+def apply_qa_precision(fp32_pipeline, mode=None):
+    """
+    Swap a CPU QA pipeline for the configured reduced-precision variant.
+
+    The variant is only used if it agrees with fp32 on the fixed question
+    set (when QA_PRECISION_CHECK is on); otherwise fp32 is kept.
+
+    Args:
+        fp32_pipeline: The loaded full-precision QA pipeline
+        mode: Precision mode (defaults to Config.QA_PRECISION)
+
+    Returns:
+        tuple: (pipeline to serve, precision mode actually in use)
+    """
+    mode = (mode or Config.QA_PRECISION).lower()
+    if mode == "fp32":
+        return fp32_pipeline, "fp32"
+    if mode not in PRECISION_MODES:
+        logger.warning(f"Unknown QA_PRECISION '{mode}', using fp32")
+        return fp32_pipeline, "fp32"
+    if getattr(fp32_pipeline, "device", None) is not None and fp32_pipeline.device.type != "cpu":
+        logger.info(f"QA model runs on {fp32_pipeline.device}; QA_PRECISION={mode} only applies to CPU")
+        return fp32_pipeline, "fp32"
+
+    try:
+        reduced = build_reduced_precision_pipeline(fp32_pipeline, mode)
+    except Exception as e:
+        logger.error(f"Could not build {mode} QA model, using fp32: {e}")
+        return fp32_pipeline, "fp32"
+
+    if Config.QA_PRECISION_CHECK:
+        agreement = answer_agreement(fp32_pipeline, reduced)
+        if agreement < Config.QA_PRECISION_MIN_AGREEMENT:
+            logger.warning(
+                f"{mode} QA model agrees with fp32 on {agreement:.0%} of check questions "
+                f"(minimum {Config.QA_PRECISION_MIN_AGREEMENT:.0%}); using fp32"
+            )
+            return fp32_pipeline, "fp32"
+        logger.info(f"{mode} QA model agrees with fp32 on {agreement:.0%} of check questions")
+
+    return reduced, mode
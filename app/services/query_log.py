@@ -0,0 +1,343 @@
+"""
+Structured query log for replay and offline analysis.
+
+Chat routes hand a small record per turn to a background writer thread,
+which appends JSON lines to QUERY_LOG_PATH and rotates the file by size.
+Summarize a log with:
+    python -m app.services.query_log [path ...]
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import argparse
+import threading
+import logging
+from collections import Counter
+from app.config import Config
+from app.services import metrics
+from app.services.text_utils import question_hash
+
+logger = logging.getLogger(__name__)
+
+# Stages timed inside a chat turn, in the order they run
+TURN_STAGES = ("translate_in", "retrieve", "qa", "answer", "translate_out")
+
+
+class QueryLogWriter:
+    """
+    Appends records to a JSONL file from a background thread.
+
+    Records are dropped (and counted) rather than blocking a request when the
+    queue is full. The file is rotated to path.1 .. path.N once it exceeds
+    max_bytes; several worker processes can share one path.
+    """
+    def __init__(self, path=None, max_bytes=None, backups=None, queue_size=None):
+        self.path = path or Config.QUERY_LOG_PATH
+        self.max_bytes = Config.QUERY_LOG_MAX_BYTES if max_bytes is None else max_bytes
+        self.backups = Config.QUERY_LOG_BACKUPS if backups is None else backups
+        self.queue_size = queue_size or Config.QUERY_LOG_QUEUE_SIZE
+        self.dropped = 0
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        # The writer thread and its queue do not survive fork()
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self.queue_size)
+                    self._thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+
+    def write(self, record):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        return open(self.path, "a", encoding="utf-8")
+
+    def _rotate(self, handle):
+        handle.close()
+        try:
+            for index in range(self.backups - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            if self.backups > 0:
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+        except OSError as e:
+            logger.warning(f"Query log rotation failed: {e}")
+        return self._open()
+
+    def _reopen_if_rotated(self, handle):
+        """Another worker may have rotated the file out from under this handle"""
+        try:
+            if os.stat(self.path).st_ino == os.fstat(handle.fileno()).st_ino:
+                return handle
+        except OSError:
+            pass
+        handle.close()
+        return self._open()
+
+    def _run(self):
+        handle = None
+        while True:
+            records = [self._queue.get()]
+            # Drain whatever else is waiting so a burst costs one write
+            while len(records) < 256:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                handle = self._open() if handle is None else self._reopen_if_rotated(handle)
+                handle.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+                handle.flush()
+                if self.max_bytes > 0 and handle.tell() >= self.max_bytes:
+                    handle = self._rotate(handle)
+            except Exception as e:
+                logger.warning(f"Could not write query log: {e}")
+                handle = None
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = QueryLogWriter()
+    return _writer
+
+
+def start_turn():
+    """
+    Begin timing a chat turn.
+
+    Returns:
+        float or None: Start time, or None when the query log is disabled
+    """
+    if not Config.QUERY_LOG_ENABLED:
+        return None
+    metrics.begin_trace()
+    return time.perf_counter()
+
+
+def session_id(session):
+    """A stable random id for the conversation, kept in the session so replays can regroup turns"""
+    if not Config.QUERY_LOG_ENABLED:
+        return None
+    sid = session.get("query_log_sid")
+    if sid is None:
+        sid = session["query_log_sid"] = uuid.uuid4().hex[:16]
+    return sid
+
+
+def finish_turn(started, endpoint, question, language, history_length, answer, ok=True, session_id=None,
+                src_lang=None, tgt_lang=None, detected_language=None):
+    """
+    Queue the record of a chat turn started with start_turn().
+
+    Args:
+        language: Language selected in the UI or request
+        src_lang: Language the question was translated from (resolved after detection)
+        tgt_lang: Language the answer was translated into
+        detected_language: Language detected in the question, if detection ran
+    """
+    if started is None:
+        return
+    total = time.perf_counter() - started
+    trace = metrics.end_trace()
+    record = {
+        "ts": round(time.time() - total, 3),
+        "endpoint": endpoint,
+        "session_id": session_id,
+        "question_hash": question_hash(question),
+        "language": language,
+        "src_lang": src_lang,
+        "tgt_lang": tgt_lang,
+        "detected_language": detected_language,
+        "history_length": history_length,
+        "timings_ms": dict(
+            {stage: round(seconds * 1000, 2) for stage, seconds in trace["stages"].items()},
+            total=round(total * 1000, 2),
+        ),
+        "cache": trace["notes"],
+        "answer_chars": len(answer or ""),
+        "ok": ok,
+        "pid": os.getpid(),
+    }
+    if Config.QUERY_LOG_INCLUDE_TEXT:
+        record["question"] = question
+    get_writer().write(record)
+
+
+def read_records(paths):
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except OSError as e:
+            print(f"Skipping {path}: {e}", file=sys.stderr)
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def translation_path(record):
+    """
+    The languages a turn went through, e.g. 'fra_Latn->eng_Latn->fra_Latn'.
+
+    English is the pivot; legs that detection made unnecessary are left out
+    ('eng_Latn->fra_Latn' when an English question got a French answer).
+    Records without resolved languages fall back to the selected language.
+    """
+    language = record.get("language") or "eng_Latn"
+    src_lang = record.get("src_lang") or language
+    tgt_lang = record.get("tgt_lang") or language
+    path = [src_lang]
+    if src_lang != "eng_Latn":
+        path.append("eng_Latn")
+    if tgt_lang != path[-1]:
+        path.append(tgt_lang)
+    return "->".join(path)
+
+
+def summarize(records, top=10):
+    """
+    Aggregate query log records.
+
+    Returns:
+        dict: Totals, top questions, language pairs, latency percentiles,
+        cache outcomes and the dominant stage of tail (>= p95) requests
+    """
+    records = list(records)
+    totals = sorted(record["timings_ms"]["total"] for record in records)
+    p95 = _percentile(totals, 0.95)
+
+    questions = Counter()
+    examples = {}
+    languages = Counter()
+    cache_outcomes = Counter()
+    tail_causes = Counter()
+    tail_stage_ms = Counter()
+    tail = []
+    for record in records:
+        questions[record["question_hash"]] += 1
+        if "question" in record:
+            examples.setdefault(record["question_hash"], record["question"])
+        languages[translation_path(record)] += 1
+        for key, value in record.get("cache", {}).items():
+            cache_outcomes[f"{key}:{value}"] += 1
+
+        if totals and record["timings_ms"]["total"] >= p95:
+            tail.append(record)
+            # "answer" contains "retrieve" and "qa"; attribute the remainder to answer overhead
+            stages = {stage: ms for stage, ms in record["timings_ms"].items() if stage != "total"}
+            if "answer" in stages:
+                stages["answer"] = max(0.0, stages["answer"] - stages.get("retrieve", 0.0) - stages.get("qa", 0.0))
+            unaccounted = record["timings_ms"]["total"] - sum(stages.values())
+            stages["other"] = max(0.0, unaccounted)
+            dominant = max(stages, key=stages.get)
+            cause = dominant
+            if dominant in ("qa", "retrieve") and record.get("cache", {}).get("answer_cache") == "miss":
+                cause = f"{dominant} (answer cache miss)"
+            elif dominant in ("translate_in", "translate_out"):
+                leg = "translation_cache_" + dominant.split("_")[1]
+                if record.get("cache", {}).get(leg) == "miss":
+                    cause = f"{dominant} (translation cache miss)"
+            tail_causes[cause] += 1
+            for stage, ms in stages.items():
+                tail_stage_ms[stage] += ms
+
+    return {
+        "requests": len(records),
+        "errors": sum(1 for record in records if not record.get("ok", True)),
+        "latency_ms": {
+            "p50": _percentile(totals, 0.50),
+            "p95": p95,
+            "p99": _percentile(totals, 0.99),
+            "max": totals[-1] if totals else 0.0,
+        },
+        "top_questions": [
+            {"question_hash": h, "count": count, "question": examples.get(h)}
+            for h, count in questions.most_common(top)
+        ],
+        "distinct_questions": len(questions),
+        "language_pairs": dict(languages.most_common()),
+        "cache_outcomes": dict(sorted(cache_outcomes.items())),
+        "tail": {
+            "threshold_ms": p95,
+            "requests": len(tail),
+            "dominant_stage": dict(tail_causes.most_common()),
+            "mean_stage_ms": {stage: round(ms / len(tail), 2) for stage, ms in tail_stage_ms.most_common()} if tail else {},
+        },
+    }
+
+
+def _print_summary(summary):
+    print(f"Requests: {summary['requests']}  errors: {summary['errors']}  "
+          f"distinct questions: {summary['distinct_questions']}")
+    latency = summary["latency_ms"]
+    print(f"Latency: p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms max={latency['max']}ms")
+    print("\nTop questions:")
+    for entry in summary["top_questions"]:
+        print(f"  {entry['count']:>6}  {entry['question_hash']}  {entry['question'] or ''}")
+    print("\nLanguage pairs:")
+    for pair, count in summary["language_pairs"].items():
+        print(f"  {count:>6}  {pair}")
+    print("\nCache outcomes:")
+    for outcome, count in summary["cache_outcomes"].items():
+        print(f"  {count:>6}  {outcome}")
+    tail = summary["tail"]
+    print(f"\nTail requests (>= p95, {tail['threshold_ms']}ms): {tail['requests']}")
+    for cause, count in tail["dominant_stage"].items():
+        print(f"  {count:>6}  {cause}")
+    if tail["mean_stage_ms"]:
+        print("  mean ms per stage: " + ", ".join(f"{stage}={ms}" for stage, ms in tail["mean_stage_ms"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize the VirtualClone query log")
+    parser.add_argument("paths", nargs="*", help="Log files (default: QUERY_LOG_PATH and its rotations)")
+    parser.add_argument("--top", type=int, default=10, help="Number of top questions to show")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    paths = args.paths
+    if not paths:
+        base = Config.QUERY_LOG_PATH
+        paths = [f"{base}.{index}" for index in range(Config.QUERY_LOG_BACKUPS, 0, -1)] + [base]
+        paths = [path for path in paths if os.path.exists(path)]
+
+    summary = summarize(read_records(paths), top=args.top)
+    if args.json:
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+    else:
+        _print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import re
+import math
+import heapq
+import threading
+import logging
+from collections import defaultdict, Counter
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+_STOPWORDS = frozenset("""
+a an and are as at be but by did do does for from had has have he her him his how i if in into is it
+its me my of on or our she so than that the their them then there these they this to was we were what
+when where which who whom why will with would you your
+""".split())
+
+
+def tokenize(text):
+    """
+    Split text into lowercase word tokens, dropping common stopwords.
+
+    Args:
+        text: The text to tokenize
+
+    Returns:
+        list: Index terms for the text
+    """
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _split_long_paragraph(paragraph, max_chars, overlap):
+    """Split an oversized paragraph into overlapping sentence windows."""
+    window = []
+    size = 0
+    for sentence in _SENTENCE_RE.split(paragraph):
+        if window and size + len(sentence) > max_chars:
+            yield " ".join(window)
+            kept = []
+            kept_size = 0
+            for previous in reversed(window):
+                if kept_size + len(previous) > overlap:
+                    break
+                kept.insert(0, previous)
+                kept_size += len(previous) + 1
+            window = kept
+            size = kept_size
+        window.append(sentence)
+        size += len(sentence) + 1
+    if window:
+        yield " ".join(window)
+
+
+def chunk_text(text, max_chars=None, overlap=None):
+    """
+    Split text into passages for retrieval.
+
+    Consecutive short paragraphs are packed together up to max_chars;
+    paragraphs longer than that are split into overlapping sentence windows.
+
+    Args:
+        text: The text to split
+        max_chars: Target maximum passage length in characters
+        overlap: Characters of trailing sentences repeated between windows
+
+    Returns:
+        list: Passage strings in document order
+    """
+    max_chars = max_chars or Config.RETRIEVAL_CHUNK_CHARS
+    overlap = Config.RETRIEVAL_CHUNK_OVERLAP if overlap is None else overlap
+
+    passages = []
+    pending = []
+    pending_size = 0
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+
+        if len(paragraph) > max_chars:
+            if pending:
+                passages.append("\n\n".join(pending))
+                pending, pending_size = [], 0
+            passages.extend(_split_long_paragraph(paragraph, max_chars, overlap))
+            continue
+
+        if pending and pending_size + len(paragraph) > max_chars:
+            passages.append("\n\n".join(pending))
+            pending, pending_size = [], 0
+        pending.append(paragraph)
+        pending_size += len(paragraph) + 2
+
+    if pending:
+        passages.append("\n\n".join(pending))
+    return passages
+
+
+class BM25Index:
+    """Okapi BM25 inverted index over passages"""
+    def __init__(self, k1=None, b=None):
+        self.k1 = Config.RETRIEVAL_BM25_K1 if k1 is None else k1
+        self.b = Config.RETRIEVAL_BM25_B if b is None else b
+        self.passages = []
+        self.postings = defaultdict(list)
+        self.doc_lengths = []
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.passages)
+
+    def add_passages(self, passages):
+        """
+        Add passages to the index.
+
+        Args:
+            passages: Iterable of passage strings
+        """
+        for passage in passages:
+            passage_id = len(self.passages)
+            terms = tokenize(passage)
+            self.passages.append(passage)
+            self.doc_lengths.append(len(terms))
+            self.total_length += len(terms)
+            for term, tf in Counter(terms).items():
+                self.postings[term].append((passage_id, tf))
+
+    def _term_postings(self, term):
+        return self.postings.get(term)
+
+    def search(self, query, top_k=None):
+        """
+        Score passages against a query.
+
+        Args:
+            query: The query string
+            top_k: Maximum number of results
+
+        Returns:
+            list: (passage_id, score) tuples, best first
+        """
+        top_k = top_k or Config.RETRIEVAL_TOP_K
+        n_docs = len(self.passages)
+        if n_docs == 0:
+            return []
+
+        avg_length = (self.total_length / n_docs) or 1.0
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._term_postings(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for passage_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[passage_id] / avg_length)
+                scores[passage_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+
+class ContextRetriever:
+    """Keeps passage indexes in sync with the active context string"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._text = None
+        self._index = BM25Index()
+        self._dense = None
+        self._artifact = None
+
+    def _new_dense_index(self):
+        """Create the optional embedding index, or None when dense retrieval is off or unavailable"""
+        if Config.RETRIEVAL_MODE != "dense":
+            return None
+        try:
+            from app.services.embedding_service import DenseIndex
+            return DenseIndex()
+        except Exception as e:
+            logger.warning(f"Dense retrieval unavailable, using BM25: {e}")
+            return None
+
+    def _add_passages(self, passages):
+        self._index.add_passages(passages)
+        if self._dense is not None:
+            try:
+                self._dense.add_passages(passages)
+            except Exception as e:
+                logger.error(f"Failed to embed passages, falling back to BM25: {e}")
+                self._dense = None
+
+    def _sync(self, context):
+        """Index the given context, reusing the existing indexes when possible"""
+        if context is self._text:
+            return self._index
+
+        with self._lock:
+            if context is self._text:
+                return self._index
+
+            if self._text is not None and len(context) >= len(self._text) and context.startswith(self._text):
+                # Context only grew (e.g. new transcripts appended): index the tail
+                self._add_passages(chunk_text(context[len(self._text):]))
+            else:
+                self._index = BM25Index()
+                self._dense = self._new_dense_index()
+                self._artifact = None
+                self._add_passages(chunk_text(context))
+            self._text = context
+            logger.info(f"Retrieval index ready ({len(self._index)} passages)")
+            return self._index
+
+    def _attach(self, artifact):
+        """Serve the passages, postings and embeddings compiled into a corpus artifact"""
+        with self._lock:
+            index = artifact.bm25_index()
+            dense = None
+            if Config.RETRIEVAL_MODE == "dense":
+                try:
+                    dense = artifact.dense_index()
+                except Exception as e:
+                    logger.warning(f"Could not map the artifact's embeddings: {e}")
+                if dense is None:
+                    dense = self._new_dense_index()
+                    if dense is not None:
+                        try:
+                            dense.add_passages(list(index.passages))
+                        except Exception as e:
+                            logger.error(f"Failed to embed passages, falling back to BM25: {e}")
+                            dense = None
+            self._index, self._dense = index, dense
+            self._text = artifact.context
+            self._artifact = artifact
+            logger.info(f"Retrieval index mapped from corpus artifact {artifact.version} ({len(index)} passages)")
+
+    def update(self, context, artifact=None):
+        """
+        Index a new context now instead of on the next query (only the appended tail if it grew).
+
+        Args:
+            context: The full knowledge base text
+            artifact: Compiled corpus artifact the context starts with, if any
+        """
+        if artifact is not None and artifact is not self._artifact:
+            self._attach(artifact)
+        self._sync(context)
+
+    def retrieve(self, query, context, top_k=None):
+        """
+        Select the passages of the context most relevant to a query.
+
+        Args:
+            query: The query string
+            context: The full knowledge base text
+            top_k: Number of passages to return
+
+        Returns:
+            list: Passage strings in document order
+        """
+        top_k = top_k or Config.RETRIEVAL_TOP_K
+        index = self._sync(context)
+        dense = self._dense
+
+        hits = None
+        if dense is not None and len(dense) == len(index):
+            try:
+                hits = dense.search(query, top_k)
+            except Exception as e:
+                logger.error(f"Dense search failed, using BM25: {e}")
+        if hits is None:
+            hits = index.search(query, top_k)
+
+        if not hits:
+            return index.passages[:top_k]
+        return [index.passages[passage_id] for passage_id in sorted(pid for pid, _ in hits)]
+
+
+context_retriever = ContextRetriever()
+
+def retrieve_passages(query, context, top_k=None):
+    return context_retriever.retrieve(query, context, top_k)
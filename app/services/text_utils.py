@@ -0,0 +1,24 @@
+"""
+Text normalization and hashing shared by the caches, the document store and the query log.
+
+Kept free of model imports so lightweight modules can use it without loading the QA stack.
+"""
+import re
+import hashlib
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different inputs share a cache entry"""
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def question_hash(question):
+    """
+    MD5 of the lowercased, stripped question.
+
+    The answer cache and the query log both key questions by it, so log
+    records can be joined with cache entries.
+    """
+    return hashlib.md5(question.lower().strip().encode()).hexdigest()
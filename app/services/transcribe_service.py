@@ -1,27 +1,38 @@
 #import whisper
 import os
 import subprocess
-import json
+import time
+import logging
+from app.config import Config
+from app.services import model_status
+from app.services import metrics
+from app.services.document_store import document_store
+from app.services import whisper_engine
+from app.services.whisper_engine import whisper_pool
 
-# Optional import: make faster_whisper lazy/optional to avoid heavy dependency during tests
-try:
-    from faster_whisper import WhisperModel  # type: ignore
-    _FW_AVAILABLE = True
-except Exception:  # pragma: no cover - environments without faster_whisper
-    WhisperModel = None  # type: ignore
-    _FW_AVAILABLE = False
+logger = logging.getLogger(__name__)
 
-# Lazy model initialization
-_model = None
 
 def _get_model():
-    global _model
-    if _model is None:
-        if WhisperModel is None:
-            raise RuntimeError("faster_whisper is not installed; transcription is unavailable.")
-        _model = WhisperModel("tiny")
-    return _model
+    return whisper_pool.get()
 
+def warm_up_model():
+    """Load the Whisper model and transcribe one second of silence"""
+    import numpy as np
+
+    model_status.mark_warming("whisper")
+    model = _get_model()
+    started = time.perf_counter()
+    try:
+        segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32))
+        list(segments)
+    except Exception as e:
+        logger.warning(f"Whisper warm-up failed: {e}")
+        model_status.mark_warm_failed("whisper", e)
+        return
+    model_status.mark_warm("whisper", time.perf_counter() - started)
+
+@metrics.timed_function("extract_audio")
 def extract_audio(video_path, audio_path):
     try:
         command = [
@@ -37,30 +48,72 @@ def extract_audio(video_path, audio_path):
     except Exception as e:
         print(f"Error extracting audio: {e}")
 
-def transcribe_audio(audio_path):
+@metrics.timed_function("transcribe_audio")
+def transcribe_with_stats(audio_path, mode=None):
+    """
+    Transcribe an audio file, add the text to the knowledge store and report how it went.
+
+    Args:
+        audio_path: Path of the audio file
+        mode: 'sequential' or 'batched' (default WHISPER_TRANSCRIBE_MODE)
+
+    Returns:
+        dict or None: text, segments ([{start, end, text}] in time order), mode,
+        audio_seconds, speech_seconds, elapsed_seconds and real_time_factor;
+        None if transcription failed
+    """
+    if Config.INFERENCE_MODE == "remote":
+        from app.services.inference_client import remote_transcribe
+        return remote_transcribe(audio_path, mode=mode, detailed=True)
+
     try:
         if not os.path.exists(audio_path) or not is_valid_audio(audio_path):
             raise Exception(f"Invalid audio file: {audio_path}")
-        
-        model = _get_model()
-        segments, info = model.transcribe(audio_path)
-        text = " ".join([segment.text for segment in segments if segment.text.strip()])
-        #result = model.transcribe(audio_path)
-        #text = result['text']
-
-        BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
-        DATA_DIR = os.path.join(BASE_DIR, "data")
-
-        os.makedirs(DATA_DIR, exist_ok=True)
-        with open(os.path.join(DATA_DIR, "train.jsonl"), "a", encoding="utf-8") as f:
-            json.dump({"text": text.strip()}, f, ensure_ascii=False)
-            f.write("\n")
-
-        return text
+
+        started = time.perf_counter()
+        segments, info, used_mode = whisper_engine.transcribe(audio_path, mode=mode)
+        # Segments are generated lazily, so decoding happens while collecting them
+        timed_segments = [
+            {"start": round(segment.start, 2), "end": round(segment.end, 2), "text": segment.text.strip()}
+            for segment in segments if segment.text.strip()
+        ]
+        elapsed = time.perf_counter() - started
+        text = " ".join(segment["text"] for segment in timed_segments)
+
+        real_time_factor = elapsed / info.duration if info.duration else None
+        if real_time_factor is not None:
+            metrics.WHISPER_REAL_TIME_FACTOR.observe(real_time_factor, mode=used_mode)
+        speech_seconds = getattr(info, "duration_after_vad", None) or info.duration
+        logger.info(f"Transcribed {info.duration:.0f}s of audio ({speech_seconds:.0f}s speech) in {elapsed:.1f}s, "
+                    f"real-time factor {real_time_factor or 0:.3f} ({used_mode})")
+
+        if text:
+            try:
+                document_store.add(text, source=os.path.basename(audio_path), doc_type="transcript",
+                                   timeout=Config.DOCUMENT_STORE_WRITE_TIMEOUT)
+            except Exception as e:
+                # The transcription is still returned; it is just not added to the knowledge base
+                logger.error(f"Could not store the transcript of {os.path.basename(audio_path)}: {e}")
+
+        return {
+            "text": text,
+            "segments": timed_segments,
+            "mode": used_mode,
+            "audio_seconds": round(info.duration, 2),
+            "speech_seconds": round(speech_seconds, 2),
+            "elapsed_seconds": round(elapsed, 2),
+            "real_time_factor": round(real_time_factor, 4) if real_time_factor is not None else None,
+        }
     except Exception as e:
         print(f"Error transcribing audio: {e}")
         return None
-    
+
+
+def transcribe_audio(audio_path, mode=None):
+    """Transcribe an audio file (see transcribe_with_stats); returns the text, or None on failure"""
+    result = transcribe_with_stats(audio_path, mode=mode)
+    return result["text"] if result else None
+
 
 def is_valid_audio(audio_path):
     try:
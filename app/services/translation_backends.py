@@ -0,0 +1,241 @@
+"""
+Translation backends for AIService.
+
+Both backends expose translate_batch(texts, src_lang, tgt_lang), take
+NLLB language codes (e.g. 'eng_Latn') and carry a cache_tag that keeps
+their translations apart in the translation cache.
+
+Convert the translation model ahead of deployment with:
+    python -m app.services.translation_backends --convert
+"""
+import os
+import shutil
+import argparse
+import threading
+import logging
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def transformers_cache_tag(model_id=None):
+    """Identifies what the transformers backend returns, for translation cache keys"""
+    return f"transformers|{model_id or Config.AI_MODEL_TRANSLATION}"
+
+
+def ct2_cache_tag(model_id=None, compute_type=None, beam_size=None):
+    """Identifies what the CTranslate2 backend returns: quantization and beam width change translations"""
+    return (f"ctranslate2|{model_id or Config.AI_MODEL_TRANSLATION}|"
+            f"{compute_type or Config.TRANSLATION_CT2_COMPUTE_TYPE}|beam={beam_size or Config.TRANSLATION_CT2_BEAM_SIZE}")
+
+
+def configured_cache_tag():
+    """Cache tag of the backend Config selects, known without loading it"""
+    if Config.TRANSLATION_BACKEND == "ctranslate2":
+        return ct2_cache_tag()
+    return transformers_cache_tag()
+
+
+class TransformersTranslationBackend:
+    """Full-precision transformers translation pipeline"""
+    name = "transformers"
+
+    def __init__(self, model_id=None):
+        from transformers import pipeline
+
+        self.model_id = model_id or Config.AI_MODEL_TRANSLATION
+        self.pipe = pipeline("translation", model=self.model_id)
+        # Decoding follows the model's generation config, so the model id identifies the output
+        self.cache_tag = transformers_cache_tag(self.model_id)
+
+    def translate_batch(self, texts, src_lang, tgt_lang):
+        """
+        Translate texts sharing one language pair in a single padded batch.
+
+        Args:
+            texts: List of source strings
+            src_lang: Source language code
+            tgt_lang: Target language code
+
+        Returns:
+            list: Translated strings, in input order
+        """
+        results = self.pipe(texts, src_lang=src_lang, tgt_lang=tgt_lang, batch_size=len(texts))
+        return [(r[0] if isinstance(r, list) else r)['translation_text'] for r in results]
+
+
+def default_ct2_model_dir(model_id=None, quantization=None):
+    """Directory holding the converted CTranslate2 model for a model id and quantization"""
+    model_id = model_id or Config.AI_MODEL_TRANSLATION
+    quantization = quantization or Config.TRANSLATION_CT2_COMPUTE_TYPE
+    name = model_id.replace("/", "--")
+    return os.path.join(Config.BASE_DIR, "data", "models", f"ct2-{name}-{quantization}")
+
+
+def convert_to_ctranslate2(model_id=None, output_dir=None, quantization=None, force=False):
+    """
+    Convert a transformers translation model to the CTranslate2 format.
+
+    Safe to call from several worker processes at once: one converts (into a
+    temporary directory moved into place when complete) while the others wait
+    for it, so no reader ever sees a half-written model.
+
+    Args:
+        model_id: HuggingFace model id (defaults to Config.AI_MODEL_TRANSLATION)
+        output_dir: Destination directory
+        quantization: Weight quantization, e.g. 'int8' or 'int8_float32'
+        force: Overwrite an existing conversion
+
+    Returns:
+        str: Path to the converted model directory
+    """
+    import ctranslate2
+
+    model_id = model_id or Config.AI_MODEL_TRANSLATION
+    quantization = quantization or Config.TRANSLATION_CT2_COMPUTE_TYPE
+    output_dir = os.path.abspath(
+        output_dir or Config.TRANSLATION_CT2_MODEL_DIR or default_ct2_model_dir(model_id, quantization)
+    )
+    model_path = os.path.join(output_dir, "model.bin")
+
+    if os.path.exists(model_path) and not force:
+        return output_dir
+
+    os.makedirs(os.path.dirname(output_dir), exist_ok=True)
+    with open(f"{output_dir}.lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            # Another worker may have converted the model while we waited
+            if os.path.exists(model_path) and not force:
+                return output_dir
+
+            logger.info(f"Converting {model_id} to CTranslate2 ({quantization}) in {output_dir}...")
+            tmp_dir = f"{output_dir}.tmp-{os.getpid()}"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            try:
+                converter = ctranslate2.converters.TransformersConverter(model_id)
+                converter.convert(tmp_dir, quantization=quantization, force=True)
+                # A directory can only be replaced by rename once it is gone; move any old one aside first
+                stale_dir = f"{output_dir}.old-{os.getpid()}"
+                if os.path.exists(output_dir):
+                    os.replace(output_dir, stale_dir)
+                os.replace(tmp_dir, output_dir)
+                shutil.rmtree(stale_dir, ignore_errors=True)
+            except BaseException:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                raise
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    logger.info("CTranslate2 conversion finished")
+    return output_dir
+
+
+class CTranslate2TranslationBackend:
+    """NLLB served through CTranslate2 with quantized compute and native batching"""
+    name = "ctranslate2"
+
+    def __init__(self, model_id=None, model_dir=None, compute_type=None,
+                 inter_threads=None, intra_threads=None, beam_size=None):
+        import ctranslate2
+        from transformers import AutoTokenizer
+
+        self.model_id = model_id or Config.AI_MODEL_TRANSLATION
+        compute_type = compute_type or Config.TRANSLATION_CT2_COMPUTE_TYPE
+        model_dir = model_dir or Config.TRANSLATION_CT2_MODEL_DIR or default_ct2_model_dir(self.model_id, compute_type)
+
+        if not os.path.exists(os.path.join(model_dir, "model.bin")):
+            if not Config.TRANSLATION_CT2_AUTO_CONVERT:
+                raise FileNotFoundError(
+                    f"No CTranslate2 model at {model_dir}; run "
+                    "'python -m app.services.translation_backends --convert' first"
+                )
+            convert_to_ctranslate2(self.model_id, model_dir, compute_type)
+
+        self.translator = ctranslate2.Translator(
+            model_dir,
+            device="cpu",
+            compute_type=compute_type,
+            inter_threads=inter_threads or Config.TRANSLATION_CT2_INTER_THREADS,
+            intra_threads=Config.TRANSLATION_CT2_INTRA_THREADS if intra_threads is None else intra_threads,
+        )
+        self.beam_size = beam_size or Config.TRANSLATION_CT2_BEAM_SIZE
+        self.cache_tag = ct2_cache_tag(self.model_id, compute_type, self.beam_size)
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_id)
+        self._tokenizer_lock = threading.Lock()
+
+    def _source_tokens(self, text, src_lang):
+        # NLLB tokenizers take the source language as mutable state
+        with self._tokenizer_lock:
+            self.tokenizer.src_lang = src_lang
+            ids = self.tokenizer(text)["input_ids"]
+        return self.tokenizer.convert_ids_to_tokens(ids)
+
+    def translate_batch(self, texts, src_lang, tgt_lang):
+        """
+        Translate texts sharing one language pair in a single batch.
+
+        Args:
+            texts: List of source strings
+            src_lang: Source language code
+            tgt_lang: Target language code
+
+        Returns:
+            list: Translated strings, in input order
+        """
+        sources = [self._source_tokens(text, src_lang) for text in texts]
+        results = self.translator.translate_batch(
+            sources,
+            target_prefix=[[tgt_lang]] * len(sources),
+            beam_size=self.beam_size,
+            max_batch_size=Config.TRANSLATION_BATCH_MAX_SIZE,
+        )
+        translations = []
+        for result in results:
+            target_tokens = result.hypotheses[0][1:]  # drop the target language token
+            target_ids = self.tokenizer.convert_tokens_to_ids(target_tokens)
+            translations.append(self.tokenizer.decode(target_ids, skip_special_tokens=True))
+        return translations
+
+
+def create_translation_backend(backend=None):
+    """
+    Build the translation backend selected by Config.TRANSLATION_BACKEND.
+
+    Falls back to the transformers pipeline if CTranslate2 cannot be loaded.
+    """
+    backend = (backend or Config.TRANSLATION_BACKEND).lower()
+    if backend == "ctranslate2":
+        try:
+            return CTranslate2TranslationBackend()
+        except Exception as e:
+            logger.error(f"CTranslate2 translation backend unavailable, using transformers: {e}")
+    elif backend != "transformers":
+        logger.warning(f"Unknown translation backend '{backend}', using transformers")
+    return TransformersTranslationBackend()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage translation model backends")
+    parser.add_argument("--convert", action="store_true", help="Convert the translation model to CTranslate2")
+    parser.add_argument("--model", default=None, help="Model id (default: AI_MODEL_TRANSLATION)")
+    parser.add_argument("--output-dir", default=None, help="Output directory")
+    parser.add_argument("--quantization", default=None, help="Quantization (default: TRANSLATION_CT2_COMPUTE_TYPE)")
+    parser.add_argument("--force", action="store_true", help="Overwrite an existing conversion")
+    args = parser.parse_args()
+
+    if not args.convert:
+        parser.print_help()
+        return
+    logging.basicConfig(level=logging.INFO)
+    path = convert_to_ctranslate2(args.model, args.output_dir, args.quantization, force=args.force)
+    print(f"CTranslate2 model ready at {path}")
+
+
+if __name__ == "__main__":
+    main()
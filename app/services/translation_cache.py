@@ -0,0 +1,216 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from app.config import Config
+from app.services.text_utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+class ByteLRUCache:
+    """Thread-safe LRU cache bounded by the total size of its string values"""
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    @staticmethod
+    def _size(key, value):
+        return len(key) + len(value.encode("utf-8"))
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        size = self._size(key, value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= self._size(key, previous)
+            self._data[key] = value
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                old_key, old_value = self._data.popitem(last=False)
+                self.current_bytes -= self._size(old_key, old_value)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+
+
+class TranslationCache:
+    """
+    Two-tier translation cache: an in-process LRU bounded by bytes in front
+    of an SQLite store that survives restarts and is shared by workers.
+
+    Keys cover the backend tag (model, backend and decoding settings), so a
+    change of backend never serves the other backend's translations. The
+    store keeps at most max_rows entries, dropping the oldest first.
+    """
+    # Puts between checks of the store's size
+    PRUNE_INTERVAL = 256
+
+    def __init__(self, max_bytes=None, db_path=None, backend_tag=None, max_rows=None):
+        if backend_tag is None:
+            from app.services.translation_backends import configured_cache_tag
+            backend_tag = configured_cache_tag()
+        self.backend_tag = backend_tag
+        self.memory = ByteLRUCache(Config.TRANSLATION_CACHE_MAX_BYTES if max_bytes is None else max_bytes)
+        self.db_path = Config.TRANSLATION_CACHE_DB if db_path is None else db_path
+        self.max_rows = Config.TRANSLATION_CACHE_DB_MAX_ROWS if max_rows is None else max_rows
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._puts = 0
+
+        if self.db_path:
+            try:
+                self._connection()
+            except Exception as e:
+                logger.warning(f"Translation cache store unavailable at {self.db_path}: {e}")
+                self.db_path = None
+
+    def _connection(self):
+        """One SQLite connection per thread (and per process, connections must not cross fork())"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key TEXT PRIMARY KEY, translation TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS translations_created ON translations (created)")
+            conn.commit()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def use_backend(self, backend_tag):
+        """Key entries by another backend (e.g. after CTranslate2 fell back to transformers)"""
+        if backend_tag != self.backend_tag:
+            logger.info(f"Translation cache now keyed by {backend_tag}")
+            self.backend_tag = backend_tag
+            self.memory.clear()
+
+    def make_key(self, text, src_lang, tgt_lang):
+        """Hash of the normalized text, language pair and backend tag"""
+        payload = "\0".join((self.backend_tag, src_lang, tgt_lang, normalize_text(text)))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, field):
+        with self._stats_lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def get(self, text, src_lang, tgt_lang):
+        """
+        Look up a cached translation.
+
+        Args:
+            text: Source text
+            src_lang: Source language code
+            tgt_lang: Target language code
+
+        Returns:
+            str or None: The cached translation, or None on a miss
+        """
+        key = self.make_key(text, src_lang, tgt_lang)
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+
+        if self.db_path:
+            try:
+                row = self._connection().execute(
+                    "SELECT translation FROM translations WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Translation cache read failed: {e}")
+                row = None
+            if row is not None:
+                self.memory.put(key, row[0])
+                self._count("disk_hits")
+                return row[0]
+
+        self._count("misses")
+        return None
+
+    def put(self, text, src_lang, tgt_lang, translation):
+        """Store a translation in both tiers"""
+        key = self.make_key(text, src_lang, tgt_lang)
+        self.memory.put(key, translation)
+        if self.db_path:
+            try:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO translations (key, translation, created) VALUES (?, ?, ?)",
+                    (key, translation, time.time()),
+                )
+                conn.commit()
+                with self._stats_lock:
+                    self._puts += 1
+                    prune = self._puts % self.PRUNE_INTERVAL == 1
+                if prune:
+                    self.prune()
+            except sqlite3.Error as e:
+                logger.warning(f"Translation cache write failed: {e}")
+
+    def prune(self):
+        """
+        Drop the oldest stored translations beyond max_rows.
+
+        Returns:
+            int: Rows deleted
+        """
+        if not self.db_path or self.max_rows <= 0:
+            return 0
+        conn = self._connection()
+        excess = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0] - self.max_rows
+        if excess <= 0:
+            return 0
+        conn.execute(
+            "DELETE FROM translations WHERE key IN (SELECT key FROM translations ORDER BY created LIMIT ?)",
+            (excess,),
+        )
+        conn.commit()
+        logger.info(f"Pruned {excess} translation(s) from {self.db_path}")
+        return excess
+
+    def stats(self):
+        """
+        Cache effectiveness counters.
+
+        Returns:
+            dict: Hit/miss counts, hit ratio and memory tier size
+        """
+        with self._stats_lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self.memory),
+                "memory_bytes": self.memory.current_bytes,
+                "persistent": bool(self.db_path),
+            }
@@ -0,0 +1,201 @@
+"""
+Shared faster-whisper engine.
+
+Every transcription path (uploads, links, the inference server, the CLI and
+realtime scripts) gets its WhisperModel from one pool, keyed by model size,
+compute type, device, CPU threads and worker count. Models load on first use
+and the least recently used one is dropped when WHISPER_POOL_SIZE is exceeded,
+so a configuration is never loaded twice in a process.
+
+Long recordings can be transcribed in batched mode: voice activity detection
+splits the audio into speech chunks (silence is never decoded) and the chunks
+are decoded in batches by faster-whisper's BatchedInferencePipeline.
+"""
+import time
+import threading
+import logging
+from collections import OrderedDict, namedtuple
+from app.config import Config
+from app.services import model_status
+
+logger = logging.getLogger(__name__)
+
+EngineKey = namedtuple("EngineKey", "size compute_type device cpu_threads num_workers")
+
+TRANSCRIBE_MODES = ("sequential", "batched")
+
+
+def engine_key(size=None, compute_type=None, device=None, cpu_threads=None, num_workers=None):
+    """Fill in Config defaults for the options not given"""
+    return EngineKey(
+        size=size or Config.WHISPER_MODEL,
+        compute_type=compute_type or Config.WHISPER_COMPUTE_TYPE,
+        device=device or Config.WHISPER_DEVICE,
+        cpu_threads=Config.WHISPER_CPU_THREADS if cpu_threads is None else cpu_threads,
+        num_workers=num_workers or Config.WHISPER_NUM_WORKERS,
+    )
+
+
+class WhisperEnginePool:
+    """
+    LRU pool of WhisperModel instances.
+
+    An evicted model is freed once the transcriptions still holding it finish.
+    Concurrent requests for a model that is loading wait for that load.
+    """
+    def __init__(self, max_models=None):
+        self.max_models = max(1, max_models or Config.WHISPER_POOL_SIZE)
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._pipelines = {}
+
+    @staticmethod
+    def _status_name(key):
+        # The configured default is the "whisper" model that preloading and /api/v1/health track
+        return "whisper" if key == engine_key() else f"whisper:{key.size}/{key.compute_type}"
+
+    def _load(self, key):
+        # Imported on first use: faster_whisper pulls in ctranslate2 and av
+        name = self._status_name(key)
+        try:
+            from faster_whisper import WhisperModel  # type: ignore
+        except Exception:  # pragma: no cover - environments without faster_whisper
+            model_status.mark_failed(name, "faster_whisper is not installed")
+            raise RuntimeError("faster_whisper is not installed; transcription is unavailable.")
+
+        logger.info(f"Loading Whisper model {key.size} ({key.compute_type}, {key.device}, "
+                    f"cpu_threads={key.cpu_threads}, num_workers={key.num_workers})...")
+        model_status.mark_loading(name)
+        started = time.perf_counter()
+        try:
+            model = WhisperModel(key.size, device=key.device, compute_type=key.compute_type,
+                                 cpu_threads=key.cpu_threads, num_workers=key.num_workers)
+        except Exception as e:
+            model_status.mark_failed(name, e)
+            raise
+        model_status.mark_ready(name, time.perf_counter() - started, compute_type=key.compute_type)
+        return model
+
+    def get(self, **options):
+        """
+        Return the model for a configuration, loading it if needed.
+
+        Args:
+            **options: size, compute_type, device, cpu_threads, num_workers (Config defaults otherwise)
+
+        Returns:
+            WhisperModel
+        """
+        key = engine_key(**options)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+            loading = self._loading.get(key)
+            if loading is None:
+                loading = self._loading[key] = threading.Lock()
+        with loading:
+            with self._lock:
+                model = self._models.get(key)
+            if model is None:
+                try:
+                    model = self._load(key)
+                except Exception:
+                    with self._lock:
+                        self._loading.pop(key, None)
+                    raise
+                with self._lock:
+                    self._models[key] = model
+                    self._loading.pop(key, None)
+                    while len(self._models) > self.max_models:
+                        evicted, _ = self._models.popitem(last=False)
+                        self._pipelines.pop(evicted, None)
+                        logger.info(f"Evicted Whisper model {evicted.size} ({evicted.compute_type}) from the pool")
+        return model
+
+    def get_batched(self, **options):
+        """
+        Return a BatchedInferencePipeline over the pooled model for a configuration.
+
+        Returns:
+            BatchedInferencePipeline or None: None if this faster_whisper has no batched pipeline
+        """
+        key = engine_key(**options)
+        model = self.get(**options)
+        with self._lock:
+            pipeline = self._pipelines.get(key)
+            if pipeline is None:
+                try:
+                    from faster_whisper import BatchedInferencePipeline  # type: ignore
+                except ImportError:
+                    return None
+                pipeline = self._pipelines[key] = BatchedInferencePipeline(model=model)
+        return pipeline
+
+    def loaded(self):
+        """Keys of the loaded models, least recently used first"""
+        with self._lock:
+            return list(self._models)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._pipelines.clear()
+
+
+whisper_pool = WhisperEnginePool()
+
+
+def get_model(**options):
+    """The pooled WhisperModel for the given options (see engine_key)"""
+    return whisper_pool.get(**options)
+
+
+def transcription_options(**overrides):
+    """Decoding options shared by every transcription path"""
+    options = {"beam_size": Config.WHISPER_BEAM_SIZE}
+    options.update(overrides)
+    return options
+
+
+def resolve_mode(mode):
+    """A requested transcription mode, or WHISPER_TRANSCRIBE_MODE if missing or unknown"""
+    mode = (mode or "").strip().lower()
+    return mode if mode in TRANSCRIBE_MODES else Config.WHISPER_TRANSCRIBE_MODE
+
+
+def transcribe(audio, mode=None, **options):
+    """
+    Transcribe audio with the pooled model.
+
+    In batched mode, VAD splits the audio into speech chunks that are decoded
+    WHISPER_BATCH_SIZE at a time. Without BatchedInferencePipeline
+    (faster-whisper older than 1.1) it logs an error and falls back to
+    sequential decoding with the VAD filter, which still skips silence.
+
+    Args:
+        audio: File path or 16 kHz float32 samples
+        mode: 'sequential' or 'batched' (default WHISPER_TRANSCRIBE_MODE)
+        **options: Extra faster_whisper transcribe() options
+
+    Returns:
+        tuple: (segment generator, TranscriptionInfo, mode actually used)
+    """
+    mode = resolve_mode(mode)
+    vad_parameters = {"min_silence_duration_ms": Config.WHISPER_VAD_MIN_SILENCE_MS}
+    if mode == "batched":
+        pipeline = whisper_pool.get_batched()
+        if pipeline is not None:
+            segments, info = pipeline.transcribe(
+                audio, batch_size=Config.WHISPER_BATCH_SIZE, vad_filter=True,
+                vad_parameters=vad_parameters, **transcription_options(**options))
+            return segments, info, mode
+        logger.error("Batched transcription needs faster-whisper>=1.1 (BatchedInferencePipeline); "
+                     "falling back to sequential decoding with VAD")
+        segments, info = whisper_pool.get().transcribe(
+            audio, vad_filter=True, vad_parameters=vad_parameters, **transcription_options(**options))
+        return segments, info, "sequential+vad"
+    segments, info = whisper_pool.get().transcribe(audio, **transcription_options(**options))
+    return segments, info, mode
@@ -0,0 +1,235 @@
+"""
+Benchmarks for AIService and context loading.
+
+Measures answer_question_with_context, translate, _build_enhanced_context
+and load_context over llm-script.txt scaled to several corpus sizes, and
+reports p50/p95/p99 latency, throughput and peak RSS.
+
+    python -m benchmarks.bench_ai_service                 # stub models (fast, deterministic)
+    python -m benchmarks.bench_ai_service --mode full     # real models from Config
+    python -m benchmarks.bench_ai_service --compare data/benchmarks/<previous>.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import resource
+import tempfile
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.config import Config  # noqa: E402
+from benchmarks.workload import QUESTIONS, HISTORY, TRANSLATION_INPUTS  # noqa: E402
+
+DEFAULT_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "data", "benchmarks")
+
+
+def read_base_corpus():
+    with open(os.path.join(PROJECT_ROOT, "llm-script.txt"), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def scale_corpus(base, factor):
+    """Repeat the base corpus, marking each copy so the passages are not identical"""
+    if factor <= 1:
+        return base
+    return "\n\n".join(f"{base}\n\n(Part {copy + 1})" for copy in range(factor))
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process so far (Linux reports kB, macOS bytes)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def measure(name, func, iterations, warmup=1, **metadata):
+    """
+    Time repeated calls of func(i).
+
+    Returns:
+        dict: Latency percentiles in ms, throughput per second and peak RSS
+    """
+    for i in range(warmup):
+        func(i)
+
+    durations = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        func(i)
+        durations.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+
+    durations.sort()
+    result = {
+        "name": name,
+        "iterations": iterations,
+        "p50_ms": round(percentile(durations, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(durations, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 4),
+        "mean_ms": round(sum(durations) / len(durations) * 1000, 4),
+        "throughput_per_s": round(iterations / elapsed, 2) if elapsed else None,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+    result.update(metadata)
+    print(f"{name:<32} {metadata.get('corpus_chars', ''):>9} chars  "
+          f"p50={result['p50_ms']:.3f}ms p95={result['p95_ms']:.3f}ms p99={result['p99_ms']:.3f}ms  "
+          f"{result['throughput_per_s']}/s  rss={result['peak_rss_kb']}kB")
+    return result
+
+
+def create_service(mode):
+    """An AIService with stub or real models; caches and batching off so every call does the work"""
+    Config.ANSWER_CACHE_ENABLED = False
+    Config.TRANSLATION_CACHE_ENABLED = False
+    Config.TRANSLATION_BATCH_ENABLED = False
+    Config.QA_MICROBATCH_ENABLED = False
+
+    from app.services.ai_service import AIService
+    service = AIService()
+    if mode == "stub":
+        from benchmarks.stubs import StubQAPipeline, StubTranslationBackend
+        service._qa_pipeline = StubQAPipeline()
+        service._translation_backend = StubTranslationBackend()
+        service._qa_engine_disabled = True
+    else:
+        service.warm_up_qa()
+        service.warm_up_translation()
+    return service
+
+
+def bench_load_context(corpus, iterations):
+    from app.services.context_loader import load_context
+
+    workdir = tempfile.mkdtemp(prefix="bench-context-")
+    previous_cwd = os.getcwd()
+    try:
+        with open(os.path.join(workdir, "llm-script.txt"), "w", encoding="utf-8") as f:
+            f.write(corpus)
+        # load_context looks in the working directory first
+        os.chdir(workdir)
+        return measure("load_context", lambda i: load_context(include_transcripts=False),
+                       iterations, corpus_chars=len(corpus))
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(mode, sizes, iterations):
+    import logging
+    logging.disable(logging.WARNING)  # keep per-call log lines out of the timings
+
+    service = create_service(mode)
+    base = read_base_corpus()
+    results = []
+
+    results.append(measure(
+        "translate",
+        lambda i: service.translate(*TRANSLATION_INPUTS[i % len(TRANSLATION_INPUTS)]),
+        iterations,
+    ))
+
+    for factor in sizes:
+        corpus = scale_corpus(base, factor)
+        results.append(bench_load_context(corpus, max(1, iterations // 10)))
+        results.append(measure(
+            "build_enhanced_context",
+            lambda i: service._build_enhanced_context(corpus, HISTORY),
+            iterations, corpus_chars=len(corpus),
+        ))
+        # The first call builds the retrieval index for this corpus (excluded as warm-up);
+        # distinct questions per call keep the repetition detector out of the way
+        results.append(measure(
+            "answer_question_with_context",
+            lambda i: service.answer_question_with_context(QUESTIONS[i % len(QUESTIONS)], corpus, HISTORY),
+            iterations, corpus_chars=len(corpus),
+        ))
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline_path):
+    """Print p50/p95 changes against a previous results file"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["name"], r.get("corpus_chars")): r for r in baseline.get("results", [])}
+
+    print(f"\nCompared with {baseline_path} ({baseline.get('meta', {}).get('git_revision')}):")
+    for result in results:
+        before = previous.get((result["name"], result.get("corpus_chars")))
+        if before is None:
+            continue
+        changes = []
+        for field in ("p50_ms", "p95_ms"):
+            if before[field]:
+                changes.append(f"{field} {(result[field] - before[field]) / before[field] * 100:+.1f}%")
+        print(f"  {result['name']:<32} {result.get('corpus_chars', ''):>9}  " + "  ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AIService and context loading")
+    parser.add_argument("--mode", choices=("stub", "full"), default="stub",
+                        help="stub: deterministic fake models; full: the configured real models")
+    parser.add_argument("--sizes", default="1,4,16",
+                        help="Comma-separated corpus sizes as multiples of llm-script.txt")
+    parser.add_argument("--iterations", type=int, default=None,
+                        help="Timed calls per benchmark (default: 200 stub, 20 full)")
+    parser.add_argument("--output", default=None, help="Results JSON path (default: data/benchmarks/)")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    iterations = args.iterations or (200 if args.mode == "stub" else 20)
+
+    results = run(args.mode, sizes, iterations)
+    report = {
+        "meta": {
+            "mode": args.mode,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "iterations": iterations,
+            "sizes": sizes,
+            "retrieval_enabled": Config.RETRIEVAL_ENABLED,
+            "retrieval_mode": Config.RETRIEVAL_MODE,
+            "translation_backend": Config.TRANSLATION_BACKEND,
+            "qa_precision": Config.QA_PRECISION,
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, f"ai_service-{args.mode}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Cold start benchmark.
+
+Imports the app, runs create_app() and serves one /api/v1/health request in
+fresh interpreters, and fails if the median import + create_app time exceeds
+the budget or a model stack (transformers, torch, faster_whisper, ...) was
+imported on the way:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --budget-ms 1500 --runs 10
+    python -m benchmarks.bench_startup --importtime     # slowest imports (python -X importtime)
+
+Model preloading is switched off in the child processes, so this measures
+what every worker restart and the first health check pay.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.bench_ai_service import DEFAULT_OUTPUT_DIR, git_revision  # noqa: E402
+
+# Modules that belong behind lazy model loading, never on the import path of the app
+HEAVY_MODULES = ("transformers", "torch", "faster_whisper", "ctranslate2", "onnxruntime",
+                 "optimum", "numpy", "PyPDF2", "pdfplumber")
+
+_CHILD = """
+import sys, json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+status = app.test_client().get("/api/v1/health").status_code
+served = time.perf_counter()
+print("BENCH_STARTUP " + json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_health_ms": (served - created) * 1000,
+    "health_status": status,
+    "heavy_modules": sorted(name for name in %r if name in sys.modules),
+    "modules": len(sys.modules),
+}))
+""" % (HEAVY_MODULES,)
+
+
+def _child_env():
+    env = dict(os.environ)
+    env["PRELOAD_MODELS"] = "False"
+    env.setdefault("LOG_LEVEL", "WARNING")
+    return env
+
+
+def measure_once():
+    result = subprocess.run([sys.executable, "-c", _CHILD], cwd=PROJECT_ROOT, env=_child_env(),
+                            capture_output=True, text=True, timeout=600)
+    for line in result.stdout.splitlines():
+        if line.startswith("BENCH_STARTUP "):
+            return json.loads(line[len("BENCH_STARTUP "):])
+    raise RuntimeError(f"Startup probe failed (exit {result.returncode}):\n{result.stderr[-2000:]}")
+
+
+def slowest_imports(top):
+    """Cumulative import times (ms) from python -X importtime, slowest first"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "from app import create_app"],
+                            cwd=PROJECT_ROOT, env=_child_env(), capture_output=True, text=True, timeout=600)
+    timings = []
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        timings.append((int(cumulative_us) / 1000.0, name.rstrip()))
+    return sorted(timings, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app import and create_app() time against a budget")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure")
+    parser.add_argument("--budget-ms", type=float, default=2000,
+                        help="Maximum median import + create_app() time in milliseconds")
+    parser.add_argument("--allow-heavy", action="store_true",
+                        help="Do not fail when model stacks are imported at startup")
+    parser.add_argument("--importtime", type=int, nargs="?", const=15, default=0,
+                        help="Also list the N slowest imports")
+    parser.add_argument("--output", default=None, help="Results JSON path (default: data/benchmarks/)")
+    args = parser.parse_args()
+
+    runs = [measure_once() for _ in range(args.runs)]
+    startup = sorted(run["import_ms"] + run["create_app_ms"] for run in runs)
+    summary = {
+        "median_startup_ms": round(statistics.median(startup), 1),
+        "max_startup_ms": round(startup[-1], 1),
+        "median_import_ms": round(statistics.median(run["import_ms"] for run in runs), 1),
+        "median_create_app_ms": round(statistics.median(run["create_app_ms"] for run in runs), 1),
+        "median_first_health_ms": round(statistics.median(run["first_health_ms"] for run in runs), 1),
+        "health_status": runs[-1]["health_status"],
+        "heavy_modules": sorted({name for run in runs for name in run["heavy_modules"]}),
+        "modules": runs[-1]["modules"],
+        "budget_ms": args.budget_ms,
+    }
+
+    print(f"import {summary['median_import_ms']}ms + create_app {summary['median_create_app_ms']}ms = "
+          f"{summary['median_startup_ms']}ms median over {args.runs} runs (budget {args.budget_ms}ms)")
+    print(f"first /api/v1/health: {summary['median_first_health_ms']}ms (HTTP {summary['health_status']}), "
+          f"{summary['modules']} modules loaded")
+    if args.importtime:
+        print("\nSlowest imports (cumulative):")
+        for ms, name in slowest_imports(args.importtime):
+            print(f"  {ms:>9.1f}ms  {name}")
+
+    failures = []
+    if summary["median_startup_ms"] > args.budget_ms:
+        failures.append(f"median startup {summary['median_startup_ms']}ms exceeds the {args.budget_ms}ms budget")
+    if summary["heavy_modules"] and not args.allow_heavy:
+        failures.append(f"model stacks imported at startup: {', '.join(summary['heavy_modules'])}")
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": args.runs,
+        },
+        "summary": summary,
+        "runs": runs,
+        "failures": failures,
+    }
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"startup-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
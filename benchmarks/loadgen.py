@@ -0,0 +1,318 @@
+"""
+HTTP load generator and traffic replay for the chat endpoints.
+
+Synthetic load: N concurrent virtual users, each reusing a cookie session for
+several turns, with a weighted language mix:
+
+    python -m benchmarks.loadgen --app --concurrency 8 --duration 60
+    python -m benchmarks.loadgen --url http://127.0.0.1:5050 --endpoint both \\
+        --languages eng_Latn:0.7,spa_Latn:0.2,fra_Latn:0.1
+
+Replay: a JSONL file with one request per line,
+    {"ts": 1718000000.25, "question": "...", "language": "eng_Latn", "session_id": "abc"}
+dispatched at the recorded inter-arrival times divided by --speedup; requests
+of one session are sent in order on that session's cookies:
+
+    python -m benchmarks.loadgen --app --replay queries.jsonl --speedup 10
+
+--app starts create_app() on an ephemeral local port in this process.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import http.cookiejar
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.workload import LOCALIZED_QUESTIONS  # noqa: E402
+
+ENDPOINTS = ("api", "web")
+
+
+class Session:
+    """One client conversation: its own cookie jar, so the server-side history is reused"""
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.web_language = None
+        self.lock = threading.Lock()
+
+    def _post(self, path, data, headers):
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method="POST")
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+    def chat_api(self, question, language):
+        body = json.dumps({"message": question, "language": language}).encode("utf-8")
+        return self._post("/api/v1/chat", body, {"Content-Type": "application/json"})
+
+    def chat_web(self, question, language):
+        form = {"Content-Type": "application/x-www-form-urlencoded"}
+        if language != self.web_language:
+            # The web UI keeps the language in the session, set by a separate POST
+            self._post("/", urllib.parse.urlencode({"language": language}).encode("utf-8"), form)
+            self.web_language = language
+        return self._post("/", urllib.parse.urlencode({"user_input": question}).encode("utf-8"), form)
+
+    def send(self, endpoint, question, language):
+        if endpoint == "api":
+            return self.chat_api(question, language)
+        return self.chat_web(question, language)
+
+
+class Recorder:
+    """Thread-safe collection of request outcomes"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = []
+        self.max_dispatch_lag = 0.0
+
+    def record(self, endpoint, language, duration, status, error=None):
+        with self._lock:
+            self.samples.append((endpoint, language, duration, status, error))
+
+    def record_lag(self, lag):
+        with self._lock:
+            self.max_dispatch_lag = max(self.max_dispatch_lag, lag)
+
+
+def timed_send(session, recorder, endpoint, question, language):
+    started = time.perf_counter()
+    try:
+        with session.lock:
+            status = session.send(endpoint, question, language)
+        recorder.record(endpoint, language, time.perf_counter() - started, status)
+    except Exception as e:
+        recorder.record(endpoint, language, time.perf_counter() - started, None, error=type(e).__name__)
+
+
+def parse_languages(spec):
+    """'eng_Latn:0.7,spa_Latn:0.3' -> ([codes], [weights])"""
+    codes, weights = [], []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        code, _, weight = item.strip().partition(":")
+        codes.append(code)
+        weights.append(float(weight) if weight else 1.0)
+    return codes, weights
+
+
+def run_synthetic(base_url, args, recorder):
+    codes, weights = parse_languages(args.languages)
+    endpoints = ENDPOINTS if args.endpoint == "both" else (args.endpoint,)
+    deadline = time.monotonic() + args.duration if args.duration else None
+    remaining = [args.requests]
+    remaining_lock = threading.Lock()
+
+    def take():
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        if args.requests:
+            with remaining_lock:
+                if remaining[0] <= 0:
+                    return False
+                remaining[0] -= 1
+        return True
+
+    def virtual_user(user_id):
+        rng = random.Random(args.seed + user_id)
+        while True:
+            # A new conversation: fresh cookies, one language and endpoint for all its turns
+            session = Session(base_url, args.timeout)
+            language = rng.choices(codes, weights)[0]
+            endpoint = rng.choice(endpoints)
+            questions = LOCALIZED_QUESTIONS.get(language, LOCALIZED_QUESTIONS["eng_Latn"])
+            for _ in range(rng.randint(1, args.max_turns)):
+                if not take():
+                    return
+                timed_send(session, recorder, endpoint, rng.choice(questions), language)
+                if args.think_ms:
+                    time.sleep(rng.uniform(0, args.think_ms) / 1000.0)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="vuser") as executor:
+        for user_id in range(args.concurrency):
+            executor.submit(virtual_user, user_id)
+
+
+def load_replay(path):
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("question"):
+                records.append(record)
+    records.sort(key=lambda record: record.get("ts", 0))
+    return records
+
+
+def run_replay(base_url, args, recorder):
+    records = load_replay(args.replay)
+    if not records:
+        print(f"No replayable records (with question text) in {args.replay}")
+        return
+    endpoint = "api" if args.endpoint == "both" else args.endpoint
+    sessions = {}
+    first_ts = records[0].get("ts", 0)
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="replay") as executor:
+        for record in records:
+            due = started + (record.get("ts", first_ts) - first_ts) / args.speedup
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                recorder.record_lag(-delay)
+
+            session_id = record.get("session_id") or id(record)
+            session = sessions.get(session_id)
+            if session is None:
+                session = sessions[session_id] = Session(base_url, args.timeout)
+            executor.submit(timed_send, session, recorder, endpoint,
+                            record["question"], record.get("language", "eng_Latn"))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def summarize(samples, elapsed):
+    durations = sorted(sample[2] for sample in samples)
+    errors = [sample for sample in samples if sample[4] is not None or not sample[3] or sample[3] >= 400]
+    return {
+        "requests": len(samples),
+        "errors": len(errors),
+        "error_rate": round(len(errors) / len(samples), 4) if samples else 0.0,
+        "throughput_per_s": round(len(samples) / elapsed, 2) if elapsed else None,
+        "p50_ms": round(percentile(durations, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(durations, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 2),
+        "max_ms": round(durations[-1] * 1000, 2) if durations else 0.0,
+    }
+
+
+def report(recorder, elapsed):
+    samples = list(recorder.samples)
+    groups = defaultdict(list)
+    for sample in samples:
+        groups[f"{sample[0]} {sample[1]}"].append(sample)
+
+    result = {
+        "elapsed_s": round(elapsed, 2),
+        "max_dispatch_lag_ms": round(recorder.max_dispatch_lag * 1000, 2),
+        "overall": summarize(samples, elapsed),
+        "by_endpoint_language": {key: summarize(group, elapsed) for key, group in sorted(groups.items())},
+        "error_kinds": dict(sorted(_error_kinds(samples).items())),
+    }
+
+    print(f"{'':<24} {'requests':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    for key, summary in [("overall", result["overall"])] + list(result["by_endpoint_language"].items()):
+        print(f"{key:<24} {summary['requests']:>9} {summary['errors']:>7} {summary['p50_ms']:>9} "
+              f"{summary['p95_ms']:>9} {summary['p99_ms']:>9} {summary['throughput_per_s']:>8}")
+    if result["error_kinds"]:
+        print(f"Errors: {result['error_kinds']}")
+    if result["max_dispatch_lag_ms"] >= 100:
+        print(f"Replay fell behind schedule by up to {result['max_dispatch_lag_ms']}ms "
+              f"(raise --concurrency or lower --speedup)")
+    return result
+
+
+def _error_kinds(samples):
+    kinds = defaultdict(int)
+    for _, _, _, status, error in samples:
+        if error is not None:
+            kinds[error] += 1
+        elif not status or status >= 400:
+            kinds[f"HTTP {status}"] += 1
+    return kinds
+
+
+def start_local_app():
+    """Serve create_app() on an ephemeral port in a background thread"""
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, name="loadgen-app", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test or replay traffic against the chat endpoints")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running server")
+    target.add_argument("--app", action="store_true", help="Start create_app() in this process")
+    parser.add_argument("--endpoint", choices=ENDPOINTS + ("both",), default="api",
+                        help="api: /api/v1/chat, web: / (form posts), both: mixed per session")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent virtual users / replay workers")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of synthetic load (0: until --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many synthetic requests")
+    parser.add_argument("--languages", default="eng_Latn:0.7,spa_Latn:0.15,fra_Latn:0.1,deu_Latn:0.05",
+                        help="Weighted language mix, code:weight,...")
+    parser.add_argument("--max-turns", type=int, default=5, help="Maximum turns per synthetic conversation")
+    parser.add_argument("--think-ms", type=float, default=0, help="Maximum pause between turns of one user")
+    parser.add_argument("--replay", default=None, help="JSONL of {ts, question, language, session_id} to replay")
+    parser.add_argument("--speedup", type=float, default=1.0, help="Replay time compression factor")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic workload")
+    parser.add_argument("--output", default=None, help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    if not args.replay and not args.duration and not args.requests:
+        parser.error("synthetic load needs --duration or --requests")
+
+    server = None
+    base_url = args.url
+    if args.app:
+        server, base_url = start_local_app()
+        print(f"Started in-process app at {base_url}")
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    try:
+        if args.replay:
+            run_replay(base_url, args, recorder)
+        else:
+            run_synthetic(base_url, args, recorder)
+    except KeyboardInterrupt:
+        print("Interrupted; reporting what completed")
+    elapsed = time.perf_counter() - started
+
+    result = report(recorder, elapsed)
+    result["config"] = {key: value for key, value in vars(args).items()}
+    result["config"]["target"] = base_url
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
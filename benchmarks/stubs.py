@@ -0,0 +1,42 @@
+"""
+Deterministic stand-ins for the QA pipeline and translation backend.
+
+They do work proportional to their input (like the real models) but need no
+weights, so the benchmark measures the service code around the models.
+"""
+import re
+
+_WORD_RE = re.compile(r"\w+")
+_SENTENCE_RE = re.compile(r"[^.!?\n]+[.!?]?")
+
+
+class StubQAPipeline:
+    """Extractive QA by word overlap between the question and each sentence"""
+    def __call__(self, question, context, top_k=1, max_answer_len=None, **kwargs):
+        question_words = set(_WORD_RE.findall(question.lower()))
+        candidates = []
+        for match in _SENTENCE_RE.finditer(context):
+            sentence = match.group().strip()
+            if not sentence:
+                continue
+            words = _WORD_RE.findall(sentence.lower())
+            overlap = len(question_words.intersection(words))
+            if overlap:
+                candidates.append((overlap / (len(words) + 1), match.start(), match.end(), sentence))
+
+        candidates.sort(key=lambda candidate: (-candidate[0], candidate[1]))
+        if not candidates:
+            candidates = [(0.0, 0, 0, "")]
+        results = [
+            {"score": round(score, 6), "start": start, "end": end, "answer": sentence}
+            for score, start, end, sentence in candidates[:top_k]
+        ]
+        return results if top_k > 1 else results[0]
+
+
+class StubTranslationBackend:
+    """Tags the text with the target language"""
+    name = "stub"
+
+    def translate_batch(self, texts, src_lang, tgt_lang):
+        return [f"[{tgt_lang}] {text}" for text in texts]
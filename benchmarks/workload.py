@@ -0,0 +1,51 @@
+"""Questions and conversation fixtures shared by the benchmarks and the load generator"""
+
+QUESTIONS = [
+    "Who directed The Matrix?",
+    "When was the film released?",
+    "Who plays Neo?",
+    "What is the Matrix?",
+    "How much did the film gross worldwide?",
+    "Who composed the music?",
+    "What is bullet time?",
+    "Who is Morpheus?",
+    "What happened to Cypher?",
+    "Which studio distributed the film?",
+]
+
+# Questions as users of each language would type them
+LOCALIZED_QUESTIONS = {
+    "eng_Latn": QUESTIONS,
+    "spa_Latn": [
+        "¿Quién dirigió The Matrix?",
+        "¿Cuándo se estrenó la película?",
+        "¿Quién interpreta a Neo?",
+        "¿Qué es Matrix?",
+        "¿Quién es Morfeo?",
+    ],
+    "fra_Latn": [
+        "Qui a réalisé The Matrix ?",
+        "Quand le film est-il sorti ?",
+        "Qui joue Neo ?",
+        "Qu'est-ce que la Matrice ?",
+        "Qui est Morpheus ?",
+    ],
+    "deu_Latn": [
+        "Wer hat The Matrix gedreht?",
+        "Wann kam der Film heraus?",
+        "Wer spielt Neo?",
+        "Was ist die Matrix?",
+    ],
+}
+
+HISTORY = [
+    ("Tell me about the film.", "The Matrix is a 1999 science fiction action film."),
+    ("Who starred in it?", "Keanu Reeves, Laurence Fishburne and Carrie-Anne Moss."),
+]
+
+TRANSLATION_INPUTS = [
+    ("¿Quién dirigió la película?", "spa_Latn", "eng_Latn"),
+    ("The film was released in 1999.", "eng_Latn", "spa_Latn"),
+    ("Qui joue Neo ?", "fra_Latn", "eng_Latn"),
+    ("Morpheus believes Neo is the One.", "eng_Latn", "fra_Latn"),
+]
@@ -2,13 +2,9 @@ import sounddevice as sd
 import numpy as np
 import queue
 import argparse
-from faster_whisper import WhisperModel
+from app.services.whisper_engine import whisper_pool, transcription_options
 
-print("Loading Whisper model...")
-
-
-model = WhisperModel("base")
-print("✅ Model loaded")
+model = None
 
 
 RATE = 16000
@@ -47,9 +43,7 @@ def live_transcription():
                     if len(buffer) > RATE * 5:
                         segments, info = model.transcribe(
                             buffer,
-                            beam_size=5,
-                            language=None,
-                            task="transcribe"
+                            **transcription_options(language=None, task="transcribe")
                         )
 
                         if info.language != last_language:
@@ -69,7 +63,7 @@ def live_transcription():
 def file_transcription(file_path):
     """Transcribe an audio/video file"""
     print(f"🎬 Transcribing file: {file_path}")
-    segments, info = model.transcribe(file_path, beam_size=5, task="transcribe")
+    segments, info = model.transcribe(file_path, **transcription_options(task="transcribe"))
     print(f"🌐 Detected language: {info.language}")
     for segment in segments:
         print(f"[{segment.start:.2f}s -> {segment.end:.2f}s] {segment.text}")
@@ -79,8 +73,14 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--file", type=str,
                         help="Path to an audio/video file for transcription")
+    parser.add_argument("--model", default="base", help="Whisper model size")
+    parser.add_argument("--compute-type", default=None, help="int8, int8_float32, float32 (default: WHISPER_COMPUTE_TYPE)")
     args = parser.parse_args()
 
+    print("Loading Whisper model...")
+    model = whisper_pool.get(size=args.model, compute_type=args.compute_type)
+    print("✅ Model loaded")
+
     if args.file:
         file_transcription(args.file)
     else:
@@ -0,0 +1,25 @@
+import os
+import argparse
+from dotenv import load_dotenv
+
+# Load environment variables before the app config is imported
+load_dotenv()
+
+from app.server import serve, smoke_check
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run VirtualClone with a preforking production server")
+    parser.add_argument("--host", default=os.environ.get('FLASK_HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.environ.get('FLASK_PORT', 5050)))
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: SERVER_WORKERS)")
+    parser.add_argument("--no-preload", action="store_true", help="Do not load models before forking")
+    parser.add_argument("--check", action="store_true",
+                        help="Fork one worker, run a translation and a transcription in it, and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        print(f"Forked worker OK: {smoke_check(preload=not args.no_preload)}")
+        raise SystemExit(0)
+
+    serve(host=args.host, port=args.port, workers=args.workers, preload=not args.no_preload)
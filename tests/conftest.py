@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Run from any directory: the app package lives in the project root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
@@ -0,0 +1,20 @@
+"""Answer cache keyed by question, context version and history"""
+from app.config import Config
+
+
+def test_answer_cache_key_changes_with_the_context_version(monkeypatch):
+    monkeypatch.setattr(Config, "ANSWER_CACHE_ENABLED", True)
+    from app.services.ai_service import AIService, question_hash
+
+    service = AIService()
+    question = question_hash("Where did you study?")
+    history = [("Hi", "Hello")]
+    key = service._answer_cache_key(question, "I studied at MIT.", history)
+
+    assert service._answer_cache_key(question, "I studied at MIT.", list(history)) == key
+    assert service._answer_cache_key(question, "I studied at Stanford.", history) != key
+    assert service._answer_cache_key(question, "I studied at MIT.", history + [("Why?", "Because")]) != key
+
+    service.answer_cache.put(key, [{"answer": "MIT"}])
+    assert service.answer_cache.get(key) == [{"answer": "MIT"}]
+    assert service.answer_cache.get(service._answer_cache_key(question, "I studied at Stanford.", history)) is None
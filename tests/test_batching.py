@@ -0,0 +1,91 @@
+"""Micro-batching of concurrent model calls"""
+import os
+import logging
+import threading
+from app.services.batching import MicroBatcher
+
+
+def test_batches_only_contain_items_with_the_same_key():
+    batches = []
+    gate = threading.Event()
+
+    def process(items):
+        gate.wait(5)
+        batches.append(list(items))
+        return [item[1] * 10 for item in items]
+
+    batcher = MicroBatcher(process, max_batch_size=8, max_wait_ms=200, key_fn=lambda item: item[0])
+    items = [("fra", 1), ("deu", 2), ("fra", 3), ("deu", 4), ("fra", 5)]
+    futures = [batcher.submit(item) for item in items]
+    gate.set()
+
+    assert [future.result(timeout=5) for future in futures] == [10, 20, 30, 40, 50]
+    for batch in batches:
+        assert len({key for key, _ in batch}) == 1
+    # Items skipped for another key keep their order for the next batch
+    assert [value for batch in batches for key, value in batch if key == "deu"] == [2, 4]
+    batcher.close()
+
+
+def test_forked_child_starts_its_own_worker_thread():
+    batcher = MicroBatcher(lambda items: [item + 1 for item in items], max_wait_ms=0)
+    assert batcher.run(1, timeout=5) == 2
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # The parent's worker thread does not exist here; a hang would mean it was reused
+        status = 1
+        try:
+            os.close(read_fd)
+            os.write(write_fd, str(batcher.run(41, timeout=5)).encode())
+            status = 0
+        finally:
+            os._exit(status)
+    os.close(write_fd)
+    try:
+        result = os.read(read_fd, 16)
+    finally:
+        os.close(read_fd)
+        _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert result == b"42"
+    assert batcher.run(2, timeout=5) == 3
+    batcher.close()
+
+
+def test_forked_child_does_not_inherit_the_lock_or_queued_items():
+    batcher = MicroBatcher(lambda items: [item * 2 for item in items], max_wait_ms=0)
+    read_fd, write_fd = os.pipe()
+    # Fork while the lock is held and an item is queued, as if the parent's worker were mid-batch
+    with batcher._cond:
+        batcher._pending.append(("parent item", None))
+        pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            os.close(read_fd)
+            os.write(write_fd, f"{len(batcher._pending)} {batcher.run(21, timeout=5)}".encode())
+            status = 0
+        finally:
+            os._exit(status)
+    os.close(write_fd)
+    try:
+        result = os.read(read_fd, 16)
+    finally:
+        os.close(read_fd)
+        _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert result == b"0 42"
+
+
+def test_qa_microbatching_without_cached_encoding_is_reported(monkeypatch, caplog):
+    from app.config import Config
+    from app.services.ai_service import AIService
+
+    monkeypatch.setattr(Config, "QA_MICROBATCH_ENABLED", True)
+    monkeypatch.setattr(Config, "QA_CACHED_ENCODING", False)
+    with caplog.at_level(logging.ERROR, logger="app.services.ai_service"):
+        service = AIService()
+    assert "QA_MICROBATCH_ENABLED" in caplog.text
+    assert service.qa_batcher is None
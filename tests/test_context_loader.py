@@ -0,0 +1,83 @@
+"""Knowledge base: incremental refresh and cross-process sync give the same text as a full load"""
+import os
+import hashlib
+import pytest
+from app.config import Config
+from app.services import context_loader
+from app.services.context_loader import ContextCorpus, compose_context
+from app.services.document_store import DocumentStore
+
+
+@pytest.fixture
+def knowledge(tmp_path, monkeypatch):
+    """A base script and an empty document store, wired into context_loader"""
+    monkeypatch.setattr(Config, "LEGACY_TRANSCRIPTS_PATH", "")
+    monkeypatch.setattr(Config, "CONTEXT_CHECK_INTERVAL", 60)
+    base = tmp_path / "llm-script.txt"
+    base.write_text("I studied computer science.", encoding="utf-8")
+    store = DocumentStore(path=str(tmp_path / "knowledge.sqlite3"), commit_wait_ms=0)
+    monkeypatch.setattr(context_loader, "document_store", store)
+    monkeypatch.setattr(context_loader, "open_artifact", lambda: None)
+    monkeypatch.setattr(context_loader, "load_base_context",
+                        lambda with_path=False: (base.read_text(encoding="utf-8"), str(base)) if with_path
+                        else base.read_text(encoding="utf-8"))
+    return base, store
+
+
+def _expected(base, store):
+    text = compose_context(base.read_text(encoding="utf-8"), [d["text"] for d in store.iter_documents()])
+    return text, hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+def test_refresh_appends_new_documents_like_a_full_load(knowledge):
+    base, store = knowledge
+    corpus = ContextCorpus()
+    corpus.load()
+    assert corpus.refresh() == 0
+
+    store.add("First transcript.", timeout=5)
+    assert corpus.refresh() == 1
+    store.add("Second transcript.", timeout=5)
+    store.add("Third transcript.", timeout=5)
+    assert corpus.refresh() == 2
+
+    assert (corpus.text, corpus.version) == _expected(base, store)
+    assert corpus.document_count == 3
+
+
+def test_sync_reloads_when_the_base_script_changes(knowledge):
+    base, store = knowledge
+    store.add("A transcript.", timeout=5)
+    corpus = ContextCorpus()
+    corpus.load()
+
+    # Within the check interval nothing is read from disk
+    base.write_text("I studied physics and computer science.", encoding="utf-8")
+    corpus._next_check = float("inf")
+    assert corpus.sync() == 0
+
+    assert corpus.sync(force=True) == -1
+    assert (corpus.text, corpus.version) == _expected(base, store)
+
+    # Same content written again: no reload, only new documents are ingested
+    stat = os.stat(base)
+    base.write_text(base.read_text(encoding="utf-8"), encoding="utf-8")
+    os.utime(base, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    store.add("Another transcript.", timeout=5)
+    assert corpus.sync(force=True) == 1
+    assert (corpus.text, corpus.version) == _expected(base, store)
+
+
+def test_removed_documents_trigger_a_full_reload(knowledge, tmp_path, monkeypatch):
+    base, store = knowledge
+    store.add("Kept transcript.", timeout=5)
+    store.add("Removed transcript.", timeout=5)
+    corpus = ContextCorpus()
+    corpus.load()
+
+    # Another process replaced the store with one holding fewer documents
+    smaller = DocumentStore(path=str(tmp_path / "smaller.sqlite3"), commit_wait_ms=0)
+    smaller.add("Kept transcript.", timeout=5)
+    monkeypatch.setattr(context_loader, "document_store", smaller)
+    assert corpus.refresh() == -1
+    assert (corpus.text, corpus.version) == _expected(base, smaller)
@@ -0,0 +1,46 @@
+"""Compiled knowledge base artifact: what build_artifact writes, CorpusArtifact reads back"""
+from app.config import Config
+from app.services import context_loader
+from app.services.corpus_artifact import build_artifact, open_artifact
+from app.services.retrieval_service import BM25Index, chunk_text
+
+BASE = ("I grew up in Nairobi and studied computer science.\n\n"
+        "I enjoy hiking, photography and building Python services.")
+TRANSCRIPTS = ["In my internship I built a speech transcription pipeline.",
+               "I speak English, Swahili and some French."]
+
+
+def test_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "CORPUS_ARTIFACT_ENABLED", True)
+    monkeypatch.setattr(context_loader, "load_base_context", lambda with_path=False: BASE)
+    monkeypatch.setattr(context_loader, "read_transcripts", lambda after_id=0: (TRANSCRIPTS, 7))
+    path = str(tmp_path / "corpus.bin")
+
+    header = build_artifact(path, with_tokens=False, with_vectors=False)
+    artifact = open_artifact(path)
+
+    context = context_loader.compose_context(BASE, TRANSCRIPTS)
+    chunks = chunk_text(context)
+    assert artifact.version == header["version"]
+    assert artifact.context == context
+    assert (artifact.last_document_id, artifact.document_count) == (7, 2)
+    assert [artifact.chunk(i) for i in range(artifact.chunk_count)] == chunks
+
+    index = BM25Index()
+    index.add_passages(chunks)
+    for query in ("internship transcription", "hiking photography", "swahili french"):
+        assert artifact.bm25_index().search(query, top_k=3) == index.search(query, top_k=3)
+    assert artifact.postings("nonexistentterm") is None
+
+    # The same inputs produce the same version; a changed base makes the artifact stale
+    assert build_artifact(path, with_tokens=False, with_vectors=False)["version"] == header["version"]
+    assert artifact.is_current(header["base_md5"])
+    assert not artifact.is_current("0" * 32)
+
+
+def test_open_artifact_ignores_missing_and_corrupt_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "CORPUS_ARTIFACT_ENABLED", True)
+    assert open_artifact(str(tmp_path / "missing.bin")) is None
+    corrupt = tmp_path / "corrupt.bin"
+    corrupt.write_bytes(b"not an artifact at all")
+    assert open_artifact(str(corrupt)) is None
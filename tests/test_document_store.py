@@ -0,0 +1,56 @@
+"""SQLite knowledge store: dedupe and the one-time legacy JSONL import"""
+import json
+import pytest
+from app.config import Config
+from app.services.document_store import DocumentStore
+
+
+def test_identical_documents_are_stored_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "LEGACY_TRANSCRIPTS_PATH", "")
+    store = DocumentStore(path=str(tmp_path / "store.db"), commit_wait_ms=0)
+
+    first_id, created = store.add("Hello   world\n", source="a.mp3", doc_type="transcript", timeout=5)
+    assert created
+    # Whitespace differences hash the same
+    assert store.add("Hello world", source="b.mp3", doc_type="transcript", timeout=5) == (first_id, False)
+    second_id, created = store.add("Another text", doc_type="pdf", timeout=5)
+    assert created and second_id > first_id
+
+    assert store.stats()["documents"] == 2
+    assert [document["text"] for document in store.iter_documents()] == ["Hello   world", "Another text"]
+    assert [document["id"] for document in store.iter_documents(after_id=first_id)] == [second_id]
+
+
+def test_legacy_jsonl_is_imported_only_once(tmp_path, monkeypatch):
+    legacy = tmp_path / "train.jsonl"
+    legacy.write_text("\n".join([
+        json.dumps({"text": "First transcript", "source": "one.mp3", "type": "transcript"}),
+        "not json",
+        json.dumps({"text": "First transcript"}),
+        json.dumps({"text": "Second transcript"}),
+    ]) + "\n", encoding="utf-8")
+    monkeypatch.setattr(Config, "LEGACY_TRANSCRIPTS_PATH", str(legacy))
+    path = str(tmp_path / "store.db")
+
+    assert DocumentStore(path=path).stats()["documents"] == 2
+
+    # Documents deleted later (or an edited legacy file) are not re-imported by the next process
+    legacy.write_text(json.dumps({"text": "Third transcript"}) + "\n", encoding="utf-8")
+    store = DocumentStore(path=path)
+    assert [document["text"] for document in store.iter_documents()] == ["First transcript", "Second transcript"]
+
+
+def test_writer_startup_failure_fails_the_write_and_recovers(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "LEGACY_TRANSCRIPTS_PATH", "")
+    blocker = tmp_path / "blocked"
+    blocker.write_text("not a directory", encoding="utf-8")
+    store = DocumentStore(path=str(blocker / "store.db"), commit_wait_ms=0)
+
+    # The store cannot be opened: the write fails instead of waiting forever on a dead writer thread
+    with pytest.raises(OSError) as error:
+        store.add("Hello world", timeout=5)
+    assert not isinstance(error.value, TimeoutError)
+    assert store._writer_pid is None
+
+    blocker.unlink()
+    assert store.add("Hello world", timeout=5) == (1, True)
@@ -0,0 +1,98 @@
+"""Inference client: connection reuse, context versions and the resend of unknown contexts"""
+import os
+import threading
+from multiprocessing.connection import Listener
+import pytest
+from app.config import Config
+from app.services import inference_client
+from app.services.inference_client import InferenceClient, UnknownContextError
+
+AUTHKEY = "test-key"
+
+
+@pytest.fixture
+def server(tmp_path):
+    """A socket server that answers like the inference server and records every request"""
+    address = str(tmp_path / "inference.sock")
+    listener = Listener(address, family="AF_UNIX", authkey=AUTHKEY.encode("utf-8"))
+    requests = []
+    contexts = set()
+
+    def handle(conn):
+        with conn:
+            while True:
+                try:
+                    method, args = conn.recv()
+                except EOFError:
+                    return
+                requests.append((method, args))
+                if method == "answer":
+                    question, version, context, history = args
+                    if context is not None:
+                        contexts.add(version)
+                    if version not in contexts:
+                        conn.send(("unknown_context", version))
+                        continue
+                    conn.send(("ok", f"answer to {question}"))
+                elif method == "ping":
+                    conn.send(("ok", {"pid": os.getpid(), "models": {}}))
+                else:
+                    conn.send(("error", f"no method {method}"))
+
+    def serve():
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield address, requests
+    listener.close()
+
+
+@pytest.fixture
+def client(server, monkeypatch):
+    address, _ = server
+    client = InferenceClient(address=address, authkey=AUTHKEY)
+    monkeypatch.setattr(inference_client, "_client", client)
+    return client
+
+
+def test_unknown_context_is_resent_once(server, client):
+    _, requests = server
+    context = "I studied computer science."
+
+    assert inference_client.remote_answer_question_with_context("Where?", context) == "answer to Where?"
+    # The first call references the version only; the server asks for the text, which is then sent
+    assert [args[2] for method, args in requests] == [None, context]
+
+    assert inference_client.remote_answer_question_with_context("What?", context) == "answer to What?"
+    assert requests[-1][1][2] is None
+    assert len(requests) == 3
+
+
+def test_call_reuses_connections_and_reports_statuses(client):
+    assert client.call("ping", timeout=5)["pid"] == os.getpid()
+    assert client._idle.qsize() == 1
+    with pytest.raises(UnknownContextError):
+        client.call("answer", "q", "missing", None, [], timeout=5)
+    with pytest.raises(RuntimeError, match="no method"):
+        client.call("nothing", timeout=5)
+    # Complete exchanges keep the single connection in the pool
+    assert client._idle.qsize() == 1
+
+
+def test_ping_uses_its_own_timeout(monkeypatch):
+    timeouts = []
+
+    class SilentClient:
+        def call(self, method, *args, timeout=None):
+            timeouts.append(timeout)
+            raise TimeoutError(method)
+
+    monkeypatch.setattr(inference_client, "_client", SilentClient())
+    monkeypatch.setattr(Config, "INFERENCE_PING_TIMEOUT", 0.5)
+    assert inference_client.remote_ping() is None
+    assert timeouts == [0.5]
@@ -0,0 +1,59 @@
+"""Language detection: which translation legs a chat turn needs"""
+import pytest
+from app.config import Config
+from app.services import language_detection
+from app.services.language_detection import resolve_languages
+
+
+@pytest.fixture
+def detected(monkeypatch):
+    """Replace detection with a fixed (language, probability) result"""
+    monkeypatch.setattr(Config, "LANGUAGE_DETECTION_ENABLED", True)
+    monkeypatch.setattr(Config, "LANGUAGE_DETECTION_MIN_CONFIDENCE", 0.9)
+    monkeypatch.setattr(Config, "LANGUAGE_AUTO_TARGET", False)
+    result = {"value": (None, 0.0)}
+    monkeypatch.setattr(language_detection, "detect_language", lambda text: result["value"])
+
+    def set_result(language, probability=0.99):
+        result["value"] = (language, probability)
+    return set_result
+
+
+def test_english_question_skips_the_inbound_translation(detected):
+    detected("eng_Latn")
+    assert resolve_languages("Where did you study?", "fra_Latn") == ("eng_Latn", "fra_Latn", "eng_Latn")
+
+
+def test_low_confidence_keeps_the_selected_language(detected):
+    detected("eng_Latn", probability=0.6)
+    assert resolve_languages("ok merci", "fra_Latn") == ("fra_Latn", "fra_Latn", None)
+
+
+def test_other_languages_follow_the_selection_unless_auto_target(detected, monkeypatch):
+    detected("spa_Latn")
+    assert resolve_languages("¿Dónde estudiaste?", "fra_Latn") == ("fra_Latn", "fra_Latn", "spa_Latn")
+    monkeypatch.setattr(Config, "LANGUAGE_AUTO_TARGET", True)
+    assert resolve_languages("¿Dónde estudiaste?", "eng_Latn") == ("spa_Latn", "spa_Latn", "spa_Latn")
+
+
+def test_english_selection_without_auto_target_does_not_detect(detected):
+    detected("spa_Latn")
+    assert resolve_languages("¿Dónde estudiaste?", "eng_Latn") == ("eng_Latn", "eng_Latn", None)
+
+
+def test_disabled_detection_uses_the_selection(detected, monkeypatch):
+    monkeypatch.setattr(Config, "LANGUAGE_DETECTION_ENABLED", False)
+    detected("eng_Latn")
+    assert resolve_languages("Where did you study?", "fra_Latn") == ("fra_Latn", "fra_Latn", None)
+
+
+def test_langdetect_classifies_and_caches(monkeypatch):
+    pytest.importorskip("langdetect")
+    monkeypatch.setattr(Config, "LANGUAGE_DETECTION_MIN_CHARS", 12)
+    assert language_detection.detect_language("hi")[0] is None
+    english = "Where did you study computer science and what did you build?"
+    language, probability = language_detection.detect_language(english)
+    assert language == "eng_Latn" and probability > 0.9
+    assert language_detection.detect_language("Où as-tu étudié l'informatique et qu'as-tu construit ?")[0] == "fra_Latn"
+    # Whitespace-only differences hit the cached entry
+    assert language_detection.detect_language(f"  {english.replace(' ', '   ')} ") == (language, probability)
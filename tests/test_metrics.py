@@ -0,0 +1,69 @@
+"""Prometheus metrics: text format, the per-worker label and the reset in forked workers"""
+import os
+import pytest
+from app.services import metrics
+from app.services.metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_samples_carry_the_worker_label():
+    registry = Registry()
+    requests = registry.register(Counter("requests_total", "Requests", ("endpoint",)))
+    latency = registry.register(Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)))
+    requests.inc(endpoint="chat")
+    requests.inc(2, endpoint="chat")
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    worker = f'worker="{os.getpid()}"'
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert f'requests_total{{endpoint="chat",{worker}}} 3' in lines
+    # Buckets are cumulative and end with +Inf
+    assert f'latency_seconds_bucket{{{worker},le="0.1"}} 1' in lines
+    assert f'latency_seconds_bucket{{{worker},le="1.0"}} 2' in lines
+    assert f'latency_seconds_bucket{{{worker},le="+Inf"}} 3' in lines
+    assert f"latency_seconds_count{{{worker}}} 3" in lines
+
+
+def test_failing_collector_is_reported_not_raised():
+    registry = Registry()
+
+    def queue_state():
+        gauge = Gauge("queue_depth", "Depth", ("queue",))
+        gauge.set(4, queue="qa")
+        return [gauge]
+
+    def broken():
+        raise RuntimeError("model not loaded")
+
+    registry.register_collector(queue_state)
+    registry.register_collector(broken)
+    text = registry.render()
+    assert f'queue_depth{{queue="qa",worker="{os.getpid()}"}} 4' in text
+    assert "# collector broken failed: model not loaded" in text
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+def test_forked_worker_starts_with_empty_metrics():
+    metrics.TRANSLATIONS_SKIPPED.inc(leg="fork-test")
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            metrics.TRANSLATIONS_SKIPPED.inc(leg="child")
+            os.write(write_fd, metrics.REGISTRY.render().encode("utf-8"))
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as f:
+        child = f.read().decode("utf-8")
+    os.waitpid(pid, 0)
+
+    try:
+        assert 'leg="fork-test"' in metrics.REGISTRY.render()
+        # The child reports under its own pid and does not repeat the parent's samples
+        assert 'leg="fork-test"' not in child
+        assert f'virtualclone_translations_skipped_total{{leg="child",worker="{pid}"}} 1' in child
+    finally:
+        metrics.REGISTRY.reset()
@@ -0,0 +1,56 @@
+"""Model load states and the readiness check behind /api/v1/health"""
+import pytest
+from app.config import Config
+from app.services import model_status
+
+
+@pytest.fixture(autouse=True)
+def fresh_status(monkeypatch):
+    monkeypatch.setattr(model_status, "_status", {})
+
+
+def test_a_model_is_not_ready_until_its_warm_up_finishes():
+    model_status.mark_warming("qa")
+    model_status.mark_loading("qa")
+    model_status.mark_ready("qa", 1.5, precision="fp32")
+    assert not model_status.is_ready(["qa"])
+    model_status.mark_warm("qa", 0.2)
+    assert model_status.is_ready(["qa"])
+    assert model_status.snapshot()["qa"]["warmup"] == "done"
+
+
+def test_failed_warm_up_is_ready_but_failed_load_is_not():
+    model_status.mark_warming("translation")
+    model_status.mark_ready("translation", 1.0)
+    model_status.mark_warm_failed("translation", RuntimeError("boom"))
+    assert model_status.is_ready(["translation"])
+
+    model_status.mark_loading("whisper")
+    model_status.mark_failed("whisper", RuntimeError("missing"))
+    assert not model_status.is_ready(["translation", "whisper"])
+    assert not model_status.is_ready(["context"])
+
+
+def test_is_ready_checks_a_remote_snapshot():
+    remote = {"qa": {"state": "ready", "warmup": "done"}, "translation": {"state": "loading"}}
+    assert model_status.is_ready(["qa"], remote)
+    assert not model_status.is_ready(["qa", "translation"], remote)
+
+
+def test_translation_warm_up_marks_the_model_warm(monkeypatch):
+    from app.services.ai_service import AIService
+
+    class Backend:
+        name = "stub"
+        cache_tag = "stub"
+
+        def translate_batch(self, texts, src_lang, tgt_lang):
+            return list(texts)
+
+    monkeypatch.setattr(Config, "TRANSLATION_CACHE_ENABLED", False)
+    service = AIService()
+    service._translation_backend = Backend()
+    model_status.mark_ready("translation", 0.1)  # as the lazy loader records it
+    service.warm_up_translation()
+    assert model_status.snapshot()["translation"]["warmup"] == "done"
+    assert model_status.is_ready(["translation"])
@@ -0,0 +1,43 @@
+"""Request profiler: sampled requests are written with the language pair the route resolved"""
+import json
+from flask import Flask, g, jsonify
+from app.config import Config
+from app.services import profiler
+
+
+def _app(monkeypatch, tmp_path, src_lang, tgt_lang):
+    monkeypatch.setattr(Config, "PROFILER_ENABLED", True)
+    monkeypatch.setattr(Config, "PROFILER_ROUTES", ["/chat"])
+    monkeypatch.setattr(Config, "PROFILER_SAMPLE_RATE", 1)
+    monkeypatch.setattr(Config, "PROFILER_SLOW_MS", 0)
+    monkeypatch.setattr(Config, "PROFILER_DIR", str(tmp_path))
+    app = Flask(__name__)
+
+    @app.route("/chat", methods=["POST"])
+    def chat():
+        g.language_pair = (src_lang, tgt_lang)
+        return jsonify({"success": True})
+
+    profiler.init_app(app)
+    return app
+
+
+def _profiles(tmp_path):
+    return [json.loads(path.read_text()) for path in sorted(tmp_path.glob("*.json"))]
+
+
+def test_profile_records_the_resolved_language_pair(monkeypatch, tmp_path):
+    # A French UI, but the question was detected as English: only the answer is translated
+    app = _app(monkeypatch, tmp_path, "eng_Latn", "fra_Latn")
+    response = app.test_client().post("/chat", json={"message": "Hello", "language": "fra_Latn"})
+    assert response.status_code == 200
+
+    (profile,) = _profiles(tmp_path)
+    assert profile["language_pair"] == "eng_Latn->fra_Latn"
+    assert profile["route"] == "/chat" and profile["reason"] == "sampled"
+
+
+def test_english_request_has_no_translation_legs(monkeypatch, tmp_path):
+    app = _app(monkeypatch, tmp_path, "eng_Latn", "eng_Latn")
+    app.test_client().post("/chat", json={"message": "Hello"})
+    assert _profiles(tmp_path)[0]["language_pair"] == "eng_Latn"
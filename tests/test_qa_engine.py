@@ -0,0 +1,125 @@
+"""Cached-encoding QA engine: same tokens, windows and answers as the transformers pipeline"""
+import re
+import pytest
+from app.config import Config
+from app.services.qa_engine import CachedQAEngine
+
+# GPT-2 style pre-tokenization: whitespace runs are split like byte-level BPE tokenizers split them
+_PRETOKEN_RE = re.compile(r"'s|'t|'re|'ve|'m|'ll|'d| ?[^\W\d_]+| ?\d+| ?[^\s\w]+|\s+(?!\S)|\s+")
+
+
+class _Encoding(dict):
+    def __init__(self, ids, offsets, words):
+        super().__init__(input_ids=ids, offset_mapping=offsets)
+        self._words = words
+
+    def word_ids(self):
+        return self._words
+
+
+class FakeTokenizer:
+    """Fast-tokenizer stand-in: one word per pre-token, long words split into 4-character pieces"""
+    is_fast = True
+    name_or_path = "fake"
+    model_input_names = ["input_ids", "attention_mask"]
+    cls_token_id = 0
+    pad_token_id = 1
+
+    def __init__(self):
+        self.vocab = {}
+
+    def __len__(self):
+        return 1000
+
+    def __call__(self, text, add_special_tokens=True, return_offsets_mapping=False):
+        ids, offsets, words = [], [], []
+        for word, match in enumerate(_PRETOKEN_RE.finditer(text)):
+            for start in range(match.start(), match.end(), 4):
+                end = min(start + 4, match.end())
+                ids.append(self.vocab.setdefault(text[start:end], len(self.vocab) + 3))
+                offsets.append((start, end))
+                words.append(word)
+        return _Encoding(ids, offsets, words)
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 4 if pair else 2
+
+    def build_inputs_with_special_tokens(self, first, second):
+        return [0] + first + [2, 2] + second + [2]
+
+
+def _whole(tokenizer, text):
+    encoded = tokenizer(text, add_special_tokens=False)
+    words = encoded.word_ids()
+    spans = []
+    for index, word in enumerate(words):
+        same = [i for i, w in enumerate(words) if w == word]
+        spans.append((same[0], same[-1]))
+    return encoded["input_ids"], [tuple(span) for span in encoded["offset_mapping"]], spans
+
+
+@pytest.fixture
+def engine():
+    return CachedQAEngine(model=None, tokenizer=FakeTokenizer(), max_seq_len=32, doc_stride=8)
+
+
+def test_context_layout_tokenizes_like_the_joined_text(engine):
+    from app.services.ai_service import AIService
+
+    passages = ["I studied computer science.", "I enjoy hiking   and photography.", "Python services."]
+    history = [("Where did you study?", "computer science"), ("Hobbies?", "hiking")]
+    segments = AIService()._build_context_segments(passages, history)
+
+    text, ids, offsets, word_spans = engine._context_for(segments)
+    assert text == "".join(segments)
+    assert (ids, [tuple(span) for span in offsets], word_spans) == _whole(engine.tokenizer, text)
+    # Every boundary of the layout joins cleanly, so each segment is cached on its own
+    assert all(segment in engine._segments for segment in segments)
+
+
+@pytest.mark.parametrize("segments", [
+    ["First passage.", "\n\n", "Second passage."],   # a bare separator tokenizes as one "\n\n" token
+    ["hello wor", "ld again"],                        # a boundary inside a word
+    ["trailing space ", "\n\nnext"],
+])
+def test_segments_that_would_tokenize_differently_are_joined(engine, segments):
+    text, ids, offsets, word_spans = engine._context_for(segments)
+    assert (ids, [tuple(span) for span in offsets], word_spans) == _whole(engine.tokenizer, text)
+
+
+def test_windows_follow_stride_truncation(engine):
+    # 32 - 4 special tokens - 4 question tokens = 24 context tokens per window, overlapping by 8
+    assert engine._windows(50, 4) == [(0, 24), (16, 40), (32, 50)]
+    assert engine._windows(24, 4) == [(0, 24)]
+    assert engine._windows(0, 4) == []
+    with pytest.raises(ValueError):
+        engine._windows(50, 20)
+
+
+@pytest.mark.slow
+@pytest.mark.integration
+def test_answers_match_the_transformers_pipeline():
+    pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    from app.services.ai_service import AIService
+    from app.services.context_loader import load_base_context
+    from app.services.retrieval_service import chunk_text
+
+    qa = transformers.pipeline("question-answering", model=Config.AI_MODEL_QA, tokenizer=Config.AI_MODEL_QA)
+    engine = CachedQAEngine(qa.model, qa.tokenizer)
+    service = AIService()
+    passages = chunk_text(load_base_context())[:6] or ["I studied computer science at the university."]
+    history = [("Where did you study?", "At the university"), ("What do you do?", "I build software")]
+    questions = ["Where did you study?", "What are your hobbies?", "What languages do you speak?",
+                 "What did you build during your internship?"]
+
+    for conversation in ([], history):
+        segments = service._build_context_segments(passages, conversation)
+        for question in questions:
+            expected = qa(question=question, context="".join(segments), top_k=3, max_answer_len=Config.AI_MAX_ANSWER_LEN,
+                          max_seq_len=engine.max_seq_len, doc_stride=engine.doc_stride)
+            expected = expected if isinstance(expected, list) else [expected]
+            answers = engine.answer(question, segments, top_k=3, max_answer_len=Config.AI_MAX_ANSWER_LEN)
+            assert [(a["answer"], a["start"], a["end"]) for a in answers] == \
+                [(e["answer"], e["start"], e["end"]) for e in expected]
+            assert [a["score"] for a in answers] == pytest.approx([e["score"] for e in expected], rel=1e-3)
@@ -0,0 +1,49 @@
+"""Reduced-precision QA models are only served when they agree with fp32"""
+import pytest
+from app.config import Config
+from app.services import qa_precision
+
+
+class FakePipeline:
+    """Answers the first word of the context, or what `answers` says for a question"""
+    device = None
+
+    def __init__(self, answers=None):
+        self.answers = answers or {}
+
+    def __call__(self, question, context):
+        return {"answer": self.answers.get(question, context.split()[0])}
+
+
+@pytest.fixture
+def check_on(monkeypatch):
+    monkeypatch.setattr(Config, "QA_PRECISION_CHECK", True)
+    monkeypatch.setattr(Config, "QA_PRECISION_MIN_AGREEMENT", 0.8)
+
+
+def test_agreeing_variant_is_used(check_on, monkeypatch):
+    fp32, reduced = FakePipeline(), FakePipeline({"Who plays Neo?": " IT "})
+    monkeypatch.setattr(qa_precision, "build_reduced_precision_pipeline", lambda pipeline, mode: reduced)
+    # Differences in case and surrounding whitespace still count as agreement
+    assert qa_precision.answer_agreement(fp32, reduced) == 1.0
+    assert qa_precision.apply_qa_precision(fp32, "int8") == (reduced, "int8")
+
+
+def test_disagreeing_variant_falls_back_to_fp32(check_on, monkeypatch):
+    questions = [question for question, _ in qa_precision.CHECK_QUESTIONS]
+    fp32, reduced = FakePipeline(), FakePipeline({question: "wrong" for question in questions[:2]})
+    monkeypatch.setattr(qa_precision, "build_reduced_precision_pipeline", lambda pipeline, mode: reduced)
+    assert qa_precision.answer_agreement(fp32, reduced) == pytest.approx(4 / 6)
+    assert qa_precision.apply_qa_precision(fp32, "bf16") == (fp32, "fp32")
+
+
+def test_unknown_or_unbuildable_modes_keep_fp32(monkeypatch):
+    fp32 = FakePipeline()
+    assert qa_precision.apply_qa_precision(fp32, "fp32") == (fp32, "fp32")
+    assert qa_precision.apply_qa_precision(fp32, "fp4") == (fp32, "fp32")
+
+    def unavailable(pipeline, mode):
+        raise RuntimeError("CPU has no native bfloat16 support")
+
+    monkeypatch.setattr(qa_precision, "build_reduced_precision_pipeline", unavailable)
+    assert qa_precision.apply_qa_precision(fp32, "bf16") == (fp32, "fp32")
@@ -0,0 +1,80 @@
+"""Query log: rotation by size, summaries, and keys shared with the answer cache"""
+import os
+import sys
+import json
+import time
+import subprocess
+from app.services import query_log
+from app.services.query_log import QueryLogWriter, summarize, translation_path
+from app.services.text_utils import question_hash
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "query log writer did not catch up"
+        time.sleep(0.01)
+
+
+def _lines(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line)["n"] for line in f]
+    except FileNotFoundError:
+        return []
+
+
+def test_writer_rotates_and_keeps_the_configured_backups(tmp_path):
+    path = str(tmp_path / "queries.jsonl")
+    writer = QueryLogWriter(path=path, max_bytes=1, backups=2, queue_size=10)
+    for n in range(4):
+        writer.write({"n": n})
+        # Every write exceeds max_bytes, so the file is rotated right after it
+        _wait_for(lambda: _lines(f"{path}.1") == [n])
+
+    assert _lines(f"{path}.2") == [2]
+    assert not os.path.exists(f"{path}.3")
+    assert _lines(path) == []
+
+
+def _record(question, total, language="eng_Latn", src_lang=None, tgt_lang=None, ok=True, **stages):
+    return {
+        "question_hash": question_hash(question), "question": question, "language": language,
+        "src_lang": src_lang, "tgt_lang": tgt_lang, "ok": ok,
+        "timings_ms": dict(stages, total=total), "cache": {"answer_cache": "miss" if stages.get("qa") else "hit"},
+    }
+
+
+def test_summarize_counts_questions_pairs_and_tail_causes():
+    records = [_record("Where did you study?", 10.0) for _ in range(18)]
+    records.append(_record("  where did you study?", 12.0, language="fra_Latn", src_lang="eng_Latn", tgt_lang="fra_Latn"))
+    records.append(_record("What are your hobbies?", 900.0, ok=False, answer=850.0, retrieve=50.0, qa=780.0))
+
+    summary = summarize(records, top=1)
+    assert summary["requests"] == 20 and summary["errors"] == 1
+    # Questions are keyed like the answer cache: case and surrounding space do not matter
+    assert summary["top_questions"] == [
+        {"question_hash": question_hash("where did you study?"), "count": 19, "question": "Where did you study?"}]
+    assert summary["distinct_questions"] == 2
+    assert summary["language_pairs"] == {"eng_Latn": 19, "eng_Latn->fra_Latn": 1}
+    assert summary["latency_ms"]["max"] == 900.0
+    # p95 of 20 requests is the second slowest; a turn without stage timings is attributed to "other"
+    assert summary["tail"]["threshold_ms"] == 12.0
+    assert summary["tail"]["dominant_stage"] == {"qa (answer cache miss)": 1, "other": 1}
+
+
+def test_translation_path_leaves_out_skipped_legs():
+    assert translation_path({"language": "fra_Latn"}) == "fra_Latn->eng_Latn->fra_Latn"
+    assert translation_path({"language": "fra_Latn", "src_lang": "eng_Latn", "tgt_lang": "fra_Latn"}) == "eng_Latn->fra_Latn"
+    assert translation_path({"language": "fra_Latn", "src_lang": "fra_Latn", "tgt_lang": "eng_Latn"}) == "fra_Latn->eng_Latn"
+    assert translation_path({}) == "eng_Latn"
+
+
+def test_importing_the_query_log_does_not_load_the_model_stack():
+    code = ("import sys, app.services.query_log; "
+            "print(sorted(m for m in ('app.services.ai_service', 'transformers', 'torch') if m in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+    assert query_log.question_hash is question_hash
@@ -0,0 +1,30 @@
+"""BM25 retrieval over knowledge base passages"""
+from app.services.retrieval_service import BM25Index
+
+PASSAGES = [
+    "I studied computer science at the university and graduated in 2020.",
+    "My hobbies are hiking and photography; hiking in the mountains every weekend.",
+    "I worked as a backend engineer building Python services.",
+    "Photography started as a hobby when I bought my first camera.",
+]
+
+
+def test_ranks_passages_by_term_relevance():
+    index = BM25Index(k1=1.5, b=0.75)
+    index.add_passages(PASSAGES)
+    results = index.search("hiking mountains", top_k=4)
+    # Only the passage that mentions hiking matches at all
+    assert [passage_id for passage_id, _ in results] == [1]
+
+    results = index.search("photography hobby camera", top_k=4)
+    ids = [passage_id for passage_id, _ in results]
+    assert ids == [3, 1]
+    assert results[0][1] > results[1][1]
+
+
+def test_top_k_limits_results_and_empty_index_returns_nothing():
+    index = BM25Index()
+    assert index.search("python") == []
+    index.add_passages(PASSAGES)
+    assert len(index.search("hiking photography python", top_k=2)) == 2
+    assert index.search("python services", top_k=1)[0][0] == 2
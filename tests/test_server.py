@@ -0,0 +1,57 @@
+"""Preforking server: what is loaded before fork() and whether a forked worker can run the models"""
+import pytest
+from flask import Flask
+from app import server
+from app.config import Config
+
+ALL_MODELS = ["context", "qa", "translation", "whisper"]
+
+
+def test_thread_starting_models_load_after_fork(monkeypatch):
+    monkeypatch.setattr(Config, "QA_PRECISION", "fp32")
+    master, workers = server.split_preload(ALL_MODELS)
+    assert master == ["context", "qa"]
+    # QA is warmed up in the workers; whisper and translation are loaded there
+    assert workers == ["qa", "translation", "whisper"]
+
+
+def test_reduced_precision_qa_loads_after_fork(monkeypatch):
+    monkeypatch.setattr(Config, "QA_PRECISION", "int8")
+    master, workers = server.split_preload(ALL_MODELS)
+    assert master == ["context"]
+    assert "qa" in workers
+
+
+@pytest.mark.slow
+@pytest.mark.integration
+def test_forked_worker_transcribes_and_translates():
+    pytest.importorskip("transformers")
+    pytest.importorskip("faster_whisper")
+    result = server.smoke_check(timeout=900)
+    assert result["translation"]
+
+
+def test_respawn_delay_backs_off_exponentially(monkeypatch):
+    monkeypatch.setattr(Config, "SERVER_RESPAWN_BACKOFF", 1.0)
+    monkeypatch.setattr(Config, "SERVER_RESPAWN_BACKOFF_MAX", 5.0)
+    assert [server.respawn_delay(n) for n in range(6)] == [0.0, 1.0, 2.0, 4.0, 5.0, 5.0]
+
+
+def test_master_gives_up_on_a_crash_loop(monkeypatch):
+    def crash(app, listener, threads, preload):
+        raise RuntimeError("broken model")
+
+    monkeypatch.setattr(server, "_prepare_master", lambda preload: Flask(__name__))
+    monkeypatch.setattr(server, "_run_worker", crash)
+    monkeypatch.setattr(server, "_set_torch_threads", lambda threads: None)
+    monkeypatch.setattr(Config, "SERVER_MEMORY_REPORT_INTERVAL", 0)
+    monkeypatch.setattr(Config, "SERVER_RESPAWN_BACKOFF", 0.01)
+    monkeypatch.setattr(Config, "SERVER_MAX_FAST_FAILURES", 3)
+    handlers = {signum: server.signal.getsignal(signum) for signum in (server.signal.SIGTERM, server.signal.SIGINT)}
+    try:
+        with pytest.raises(RuntimeError, match="3 times in a row"):
+            server.serve(host="127.0.0.1", port=0, workers=1, preload=False)
+    finally:
+        server.gc.unfreeze()
+        for signum, handler in handlers.items():
+            server.signal.signal(signum, handler)
@@ -0,0 +1,37 @@
+"""Cold start: the app and its request path import no model stack"""
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded behind explicit model initialization, never by importing the app
+HEAVY_MODULES = ("transformers", "torch", "faster_whisper", "ctranslate2", "onnxruntime", "optimum")
+
+# Records import attempts too, so a guarded import of a package missing here is still caught
+_CHILD = """
+import sys, json
+attempted = set()
+
+class Recorder:
+    def find_spec(self, name, path=None, target=None):
+        if name.split(".")[0] in %r:
+            attempted.add(name.split(".")[0])
+        return None
+
+sys.meta_path.insert(0, Recorder())
+from app import create_app
+app = create_app()
+status = app.test_client().get("/api/v1/health").status_code
+print(json.dumps({"status": status, "attempted": sorted(attempted)}))
+""" % (HEAVY_MODULES,)
+
+
+def test_create_app_and_health_do_not_import_models(tmp_path):
+    env = dict(os.environ, PRELOAD_MODELS="False", LOG_LEVEL="WARNING", LOG_FILE=str(tmp_path / "app.log"))
+    output = subprocess.run([sys.executable, "-c", _CHILD], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    assert result["attempted"] == []
+    assert result["status"] in (200, 503)
@@ -0,0 +1,59 @@
+"""CTranslate2 conversion when several workers start at once"""
+import os
+import sys
+import time
+import types
+import threading
+from app.services.translation_backends import convert_to_ctranslate2
+
+
+class FakeConverter:
+    calls = []
+
+    def __init__(self, model_id):
+        self.model_id = model_id
+
+    def convert(self, output_dir, quantization=None, force=False):
+        if os.path.exists(output_dir) and not force:
+            raise RuntimeError(f"{output_dir} already exists")
+        FakeConverter.calls.append(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
+        with open(os.path.join(output_dir, "model.bin"), "w") as f:
+            f.write("partial")
+            f.flush()
+            time.sleep(0.2)
+            f.write(" and complete")
+        return output_dir
+
+
+def test_concurrent_conversions_convert_once_and_publish_a_complete_model(tmp_path, monkeypatch):
+    FakeConverter.calls = []
+    fake = types.SimpleNamespace(converters=types.SimpleNamespace(TransformersConverter=FakeConverter))
+    monkeypatch.setitem(sys.modules, "ctranslate2", fake)
+    output_dir = str(tmp_path / "models" / "ct2-nllb-int8")
+    seen = []
+    errors = []
+
+    def convert():
+        try:
+            path = convert_to_ctranslate2("nllb", output_dir, "int8")
+            with open(os.path.join(path, "model.bin")) as f:
+                seen.append(f.read())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=convert) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert errors == []
+    assert len(FakeConverter.calls) == 1 and FakeConverter.calls[0] != output_dir
+    assert seen == ["partial and complete"] * 4
+    assert sorted(os.listdir(tmp_path / "models")) == ["ct2-nllb-int8", "ct2-nllb-int8.lock"]
+
+    # force converts again and replaces the previous model
+    convert_to_ctranslate2("nllb", output_dir, "int8", force=True)
+    assert len(FakeConverter.calls) == 2
+    assert sorted(os.listdir(tmp_path / "models")) == ["ct2-nllb-int8", "ct2-nllb-int8.lock"]
@@ -0,0 +1,59 @@
+"""Translations from concurrent requests batched by language pair"""
+import threading
+from app.config import Config
+from app.services.ai_service import AIService
+
+
+class RecordingBackend:
+    name = "recording"
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def translate_batch(self, texts, src_lang, tgt_lang):
+        self.release.wait(5)
+        self.calls.append((src_lang, tgt_lang, list(texts)))
+        return [f"{tgt_lang}:{text}" for text in texts]
+
+
+def test_concurrent_translations_are_batched_per_language_pair(monkeypatch):
+    monkeypatch.setattr(Config, "TRANSLATION_CACHE_ENABLED", False)
+    monkeypatch.setattr(Config, "TRANSLATION_BATCH_ENABLED", True)
+    monkeypatch.setattr(Config, "TRANSLATION_BATCH_MAX_WAIT_MS", 200)
+    service = AIService()
+    backend = service._translation_backend = RecordingBackend()
+
+    requests = [("hello", "eng_Latn", "fra_Latn"), ("bonjour", "fra_Latn", "eng_Latn"),
+                ("thanks", "eng_Latn", "fra_Latn"), ("merci", "fra_Latn", "eng_Latn"),
+                ("bye", "eng_Latn", "fra_Latn")]
+    results = [None] * len(requests)
+
+    def translate(index):
+        text, src_lang, tgt_lang = requests[index]
+        results[index] = service.translate(text, src_lang, tgt_lang)
+
+    threads = [threading.Thread(target=translate, args=(index,)) for index in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    backend.release.set()
+    for thread in threads:
+        thread.join(10)
+
+    assert results == [f"{tgt}:{text}" for text, _, tgt in requests]
+    # Each backend call covers one language pair, and the pairs were coalesced
+    assert sorted(text for _, _, texts in backend.calls for text in texts) == sorted(text for text, _, _ in requests)
+    assert len(backend.calls) < len(requests)
+    for src_lang, tgt_lang, texts in backend.calls:
+        assert all((text, src_lang, tgt_lang) in requests for text in texts)
+    service.translation_batcher.close()
+
+
+def test_without_batching_each_translation_calls_the_backend(monkeypatch):
+    monkeypatch.setattr(Config, "TRANSLATION_CACHE_ENABLED", False)
+    monkeypatch.setattr(Config, "TRANSLATION_BATCH_ENABLED", False)
+    service = AIService()
+    backend = service._translation_backend = RecordingBackend()
+    backend.release.set()
+    assert service.translate("hello", "eng_Latn", "fra_Latn") == "fra_Latn:hello"
+    assert backend.calls == [("eng_Latn", "fra_Latn", ["hello"])]
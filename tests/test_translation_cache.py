@@ -0,0 +1,79 @@
+"""Two-tier translation cache: byte-bounded memory LRU in front of SQLite"""
+from app.services.translation_backends import ct2_cache_tag, transformers_cache_tag
+from app.services.translation_cache import ByteLRUCache, TranslationCache
+
+
+def test_byte_lru_evicts_least_recently_used_by_size():
+    cache = ByteLRUCache(max_bytes=30)
+    cache.put("a", "x" * 9)   # 10 bytes
+    cache.put("b", "y" * 9)
+    cache.put("c", "z" * 9)
+    assert cache.current_bytes == 30
+
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("d", "w" * 9)
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 9
+    assert cache.current_bytes == 30
+
+    # One large value evicts as many entries as it needs
+    cache.put("e", "v" * 19)
+    assert cache.current_bytes == 30
+    # "a" was read after "c" and "d" were stored, so those two go
+    assert cache.get("c") is None and cache.get("d") is None
+    assert cache.get("a") == "x" * 9 and cache.get("e") == "v" * 19
+
+
+def test_byte_lru_skips_values_larger_than_the_budget_and_replaces_in_place():
+    cache = ByteLRUCache(max_bytes=10)
+    cache.put("big", "x" * 20)
+    assert cache.get("big") is None
+    cache.put("k", "abc")
+    cache.put("k", "abcdef")
+    assert cache.current_bytes == 7
+    # Multi-byte characters count by their UTF-8 size
+    cache.put("k", "é" * 4)
+    assert cache.current_bytes == 9
+
+
+def test_translation_cache_survives_a_new_process_through_sqlite(tmp_path):
+    db_path = str(tmp_path / "translations.db")
+    cache = TranslationCache(max_bytes=1024, db_path=db_path, backend_tag="transformers|nllb")
+    cache.put("Hello  world", "eng_Latn", "fra_Latn", "Bonjour le monde")
+
+    restarted = TranslationCache(max_bytes=1024, db_path=db_path, backend_tag="transformers|nllb")
+    # Whitespace differences share the entry; language pair and backend are part of the key
+    assert restarted.get("Hello world", "eng_Latn", "fra_Latn") == "Bonjour le monde"
+    assert restarted.get("Hello world", "eng_Latn", "deu_Latn") is None
+    assert TranslationCache(db_path=db_path, backend_tag="transformers|m2m").get("Hello world", "eng_Latn", "fra_Latn") is None
+    stats = restarted.stats()
+    assert (stats["disk_hits"], stats["misses"]) == (1, 1)
+
+
+def test_backends_and_decoding_settings_do_not_share_entries(tmp_path):
+    db_path = str(tmp_path / "translations.db")
+    ct2 = TranslationCache(db_path=db_path, backend_tag=ct2_cache_tag("nllb", "int8", 2))
+    ct2.put("Hello", "eng_Latn", "fra_Latn", "Salut")
+
+    assert TranslationCache(db_path=db_path, backend_tag=transformers_cache_tag("nllb")).get(
+        "Hello", "eng_Latn", "fra_Latn") is None
+    assert TranslationCache(db_path=db_path, backend_tag=ct2_cache_tag("nllb", "int8", 4)).get(
+        "Hello", "eng_Latn", "fra_Latn") is None
+
+    # A backend that fell back to transformers stops serving the CTranslate2 entries
+    ct2.use_backend(transformers_cache_tag("nllb"))
+    assert ct2.get("Hello", "eng_Latn", "fra_Latn") is None
+
+
+def test_store_is_pruned_to_max_rows_oldest_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(TranslationCache, "PRUNE_INTERVAL", 4)
+    cache = TranslationCache(db_path=str(tmp_path / "translations.db"), backend_tag="t", max_rows=5)
+    for index in range(12):
+        cache.put(f"text {index}", "eng_Latn", "fra_Latn", f"texte {index}")
+    cache.memory.clear()
+
+    # Pruned after the 1st, 5th and 9th puts, then three more were added
+    assert cache._connection().execute("SELECT COUNT(*) FROM translations").fetchone()[0] == 8
+    assert cache.prune() == 3
+    assert cache.get("text 0", "eng_Latn", "fra_Latn") is None
+    assert cache.get("text 11", "eng_Latn", "fra_Latn") == "texte 11"
@@ -0,0 +1,113 @@
+"""Shared Whisper engine: one pooled model per configuration, LRU eviction"""
+import sys
+import time
+import types
+import threading
+import pytest
+from app.config import Config
+from app.services import model_status, whisper_engine
+from app.services.whisper_engine import WhisperEnginePool, engine_key
+
+
+class FakeWhisperModel:
+    loads = []
+
+    def __init__(self, size, device=None, compute_type=None, cpu_threads=0, num_workers=1):
+        time.sleep(0.05)  # long enough for concurrent requests to overlap the load
+        self.size = size
+        self.compute_type = compute_type
+        FakeWhisperModel.loads.append((size, compute_type))
+
+    def transcribe(self, audio, **options):
+        return iter([]), types.SimpleNamespace(duration=0.0, options=options)
+
+
+@pytest.fixture(autouse=True)
+def fresh_status(monkeypatch):
+    monkeypatch.setattr(model_status, "_status", {})
+
+
+@pytest.fixture
+def faster_whisper(monkeypatch):
+    """A faster_whisper stand-in that records model loads"""
+    module = types.ModuleType("faster_whisper")
+    module.WhisperModel = FakeWhisperModel
+    FakeWhisperModel.loads = []
+    monkeypatch.setitem(sys.modules, "faster_whisper", module)
+    monkeypatch.setattr(Config, "WHISPER_MODEL", "tiny")
+    monkeypatch.setattr(Config, "WHISPER_COMPUTE_TYPE", "int8")
+    return module
+
+
+def test_concurrent_requests_load_a_configuration_once(faster_whisper):
+    pool = WhisperEnginePool(max_models=2)
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(pool.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert FakeWhisperModel.loads == [("tiny", "int8")]
+    assert len({id(model) for model in models}) == 1
+    assert pool.loaded() == [engine_key()]
+    # The configured default is tracked as the "whisper" model of /api/v1/health
+    assert model_status.snapshot()["whisper"]["state"] == "ready"
+
+
+def test_least_recently_used_model_is_evicted(faster_whisper):
+    pool = WhisperEnginePool(max_models=2)
+    tiny = pool.get()
+    pool.get(size="base")
+    assert pool.get() is tiny  # tiny becomes the most recently used
+    pool.get(size="small", compute_type="int8_float32")
+
+    assert [key.size for key in pool.loaded()] == ["tiny", "small"]
+    pool.get(size="base")
+    assert FakeWhisperModel.loads == [("tiny", "int8"), ("base", "int8"), ("small", "int8_float32"), ("base", "int8")]
+
+
+def test_missing_faster_whisper_is_reported(monkeypatch):
+    monkeypatch.setitem(sys.modules, "faster_whisper", None)
+    with pytest.raises(RuntimeError, match="faster_whisper is not installed"):
+        WhisperEnginePool().get()
+
+
+class FakeBatchedPipeline:
+    def __init__(self, model):
+        self.model = model
+        self.calls = []
+
+    def transcribe(self, audio, **options):
+        self.calls.append(options)
+        return iter([]), types.SimpleNamespace(duration=0.0, options=options)
+
+
+def test_batched_mode_decodes_vad_chunks_in_batches(faster_whisper, monkeypatch):
+    faster_whisper.BatchedInferencePipeline = FakeBatchedPipeline
+    monkeypatch.setattr(whisper_engine, "whisper_pool", WhisperEnginePool())
+    monkeypatch.setattr(Config, "WHISPER_BATCH_SIZE", 4)
+
+    _, info, mode = whisper_engine.transcribe("lecture.wav", mode="batched")
+    assert mode == "batched"
+    assert info.options["batch_size"] == 4 and info.options["vad_filter"] is True
+    # One pipeline per pooled model
+    assert whisper_engine.whisper_pool.get_batched() is whisper_engine.whisper_pool.get_batched()
+
+
+def test_batched_mode_falls_back_to_sequential_vad(faster_whisper, monkeypatch, caplog):
+    # faster-whisper older than 1.1 has no BatchedInferencePipeline
+    monkeypatch.setattr(whisper_engine, "whisper_pool", WhisperEnginePool())
+    with caplog.at_level("ERROR", logger=whisper_engine.__name__):
+        _, info, mode = whisper_engine.transcribe("lecture.wav", mode="batched")
+
+    assert mode == "sequential+vad"
+    assert info.options["vad_filter"] is True and "batch_size" not in info.options
+    assert "faster-whisper>=1.1" in caplog.text
+
+
+def test_unknown_modes_use_the_configured_default(monkeypatch):
+    monkeypatch.setattr(Config, "WHISPER_TRANSCRIBE_MODE", "sequential")
+    assert whisper_engine.resolve_mode(" Batched ") == "batched"
+    assert whisper_engine.resolve_mode("turbo") == "sequential"
+    assert whisper_engine.resolve_mode(None) == "sequential"